@@ -0,0 +1 @@
+# Micro-benchmarks de la telemetría (ejecutar desde src/: python -m benchmarks.<modulo>)
@@ -0,0 +1,79 @@
+# bench_parser.py
+"""
+Compara paquetes/segundo del decodificador precompilado de TelemetryDataParser
+frente al decodificador original (io.BytesIO + struct.unpack por campo), y
+la decodificación por lotes de parse_many.
+
+Uso (desde src/):  python -m benchmarks.bench_parser [num_paquetes]
+"""
+import io
+import random
+import struct
+import sys
+import time
+
+from forza_telemetry_data import ForzaTelemetryData, PACKET_FIELDS
+from telemetry_parser import TelemetryDataParser, FM8_STRUCT
+
+
+def make_packet(rng: random.Random) -> bytes:
+    values = []
+    for _, fmt in PACKET_FIELDS:
+        if fmt == "f":
+            values.append(rng.uniform(-100.0, 100.0))
+        elif fmt == "b":
+            values.append(rng.randint(-127, 127))
+        elif fmt == "B":
+            values.append(rng.randint(0, 255))
+        elif fmt == "H":
+            values.append(rng.randint(0, 50))
+        else:
+            values.append(rng.randint(0, 1000))
+    return FM8_STRUCT.pack(*values)
+
+
+def legacy_parse(packet: bytes) -> ForzaTelemetryData:
+    # Réplica del parser anterior: un struct.unpack por campo sobre io.BytesIO
+    stream = io.BytesIO(packet)
+    data = ForzaTelemetryData()
+    for name, fmt in PACKET_FIELDS:
+        fmt = "<" + fmt
+        size = struct.calcsize(fmt)
+        setattr(data, name, struct.unpack(fmt, stream.read(size))[0])
+    return data
+
+
+def packets_per_second(parse, packets) -> float:
+    start = time.perf_counter()
+    for packet in packets:
+        parse(packet)
+    elapsed = time.perf_counter() - start
+    return len(packets) / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(1234)
+    packets = [make_packet(rng) for _ in range(min(count, 1000))]
+    packets = (packets * (count // len(packets) + 1))[:count]
+
+    # Ambos decodificadores deben producir exactamente el mismo resultado
+    assert legacy_parse(packets[0]) == TelemetryDataParser.parse(packets[0])
+
+    before = packets_per_second(legacy_parse, packets)
+    after = packets_per_second(TelemetryDataParser.parse, packets)
+    print(f"Paquetes: {count}")
+    print(f"Antes   (BytesIO + unpack por campo): {before:12.0f} paquetes/s")
+    print(f"Después (Struct.unpack_from):         {after:12.0f} paquetes/s")
+    print(f"Mejora: x{after / before:.1f}")
+
+    # Decodificación por lotes con parse_many sobre un único buffer contiguo
+    buffer = b"".join(packets)
+    start = time.perf_counter()
+    TelemetryDataParser.parse_many(buffer)
+    elapsed = time.perf_counter() - start
+    print(f"Lote    (parse_many / np.frombuffer): {count / elapsed:12.0f} paquetes/s ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# bench_suite.py
+"""
+Suite de benchmarks reproducible de la telemetría: parser, registro
+ForzaTelemetryData, estadísticas, escritor de CSV, carga del CSV por bloques
+tipados (como el CsvLoader del visor) y rendimiento UDP por loopback de listen_loop.
+
+Cada caso informa operaciones/s, latencias p50/p99 por operación y memoria
+pico (tracemalloc, en una pasada aparte para no alterar los tiempos). El
+resultado es JSON para poder comparar ejecuciones entre versiones.
+
+Uso (desde src/):
+    python -m benchmarks.bench_suite [--packets N] [--output resultados.json] [--skip-udp]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from forza_telemetry_data import CATEGORY_COLUMNS
+from load_generator import SyntheticRig, run as run_load_generator
+from session_store import read_csv_chunks
+from telemetry_parser import TelemetryDataParser
+from telemetry_statistics import TelemetryStatistics
+from udp_receiver import UdpReceiver
+
+
+VIEWER_CHUNK_ROWS = 20000  # CsvLoader.CHUNK_ROWS (telemetry_gui necesita PyQt5)
+
+
+def load_csv_like_viewer(csv_path: str) -> pd.DataFrame:
+    # Lo mismo que CsvLoader.run, sin las señales de Qt
+    df = pd.concat([chunk for chunk, _ in read_csv_chunks(csv_path, VIEWER_CHUNK_ROWS)], ignore_index=True)
+    for name in CATEGORY_COLUMNS:
+        if df[name].dtype != "category":
+            df[name] = df[name].astype("category")
+    return df
+
+
+def _summary(latencies_ns, total_s, ops, peak_bytes):
+    latencies_us = np.asarray(latencies_ns, dtype=np.float64) / 1000.0
+    return {
+        "ops": ops,
+        "total_s": total_s,
+        "ops_per_s": ops / total_s if total_s > 0 else None,
+        "p50_us": float(np.percentile(latencies_us, 50)) if len(latencies_us) else None,
+        "p99_us": float(np.percentile(latencies_us, 99)) if len(latencies_us) else None,
+        "peak_mem_kb": peak_bytes / 1024.0,
+    }
+
+
+def _peak_memory(run_once):
+    tracemalloc.start()
+    try:
+        run_once()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_per_item(func, items, setup=None):
+    """Mide func(item) para cada item; setup() devuelve el estado que recibe func (opcional)."""
+    def run_once(collect):
+        state = setup() if setup else None
+        perf_counter_ns = time.perf_counter_ns
+        for item in items:
+            t0 = perf_counter_ns()
+            func(state, item)
+            collect.append(perf_counter_ns() - t0)
+
+    latencies = []
+    start = time.perf_counter()
+    run_once(latencies)
+    total = time.perf_counter() - start
+    peak = _peak_memory(lambda: run_once([]))
+    return _summary(latencies, total, len(items), peak)
+
+
+def bench_single(func, ops):
+    """Mide una única llamada que procesa `ops` elementos."""
+    start = time.perf_counter_ns()
+    func()
+    elapsed_ns = time.perf_counter_ns() - start
+    peak = _peak_memory(func)
+    result = _summary([elapsed_ns], elapsed_ns / 1e9, ops, peak)
+    result["p50_us"] = result["p99_us"] = None
+    return result
+
+
+def make_packets(count: int, rigs: int = 1):
+    synthetic = [SyntheticRig(i) for i in range(rigs)]
+    return [synthetic[i % rigs].packet(i / 60.0) for i in range(count)]
+
+
+def bench_loopback(packets_per_second: float, duration_s: float, rigs: int, tmp_dir: str):
+    """Arranca UdpReceiver en un event-loop propio y le envía tráfico por loopback."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    receiver = UdpReceiver({}, {}, telemetry_dir=tmp_dir, port=port)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    loop.call_soon_threadsafe(receiver.start_listening, False)
+    while not receiver.is_listening:
+        time.sleep(0.01)
+
+    sent = run_load_generator("127.0.0.1", port, packets_per_second / rigs, rigs, duration_s)
+    time.sleep(0.5)  # margen para drenar el socket
+    received = receiver.packets_received
+    done = threading.Event()
+    loop.call_soon_threadsafe(lambda: (receiver.stop_listening(), done.set()))
+    done.wait()
+    receiver.finalizing.result()  # el cierre de la sesión sigue en segundo plano
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+    return {
+        "target_pps": packets_per_second,
+        "sent": sent["sent"],
+        "received": received,
+        "received_pps": received / sent["elapsed_s"] if sent["elapsed_s"] > 0 else None,
+        "drop_rate": 1.0 - received / sent["sent"] if sent["sent"] else None,
+        "reader_wakeups": receiver.reader_wakeups,
+        "max_batch": receiver.max_batch,
+        "kernel_drops": receiver.kernel_drops,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(count: int, skip_udp: bool = False) -> dict:
+    packets = make_packets(count)
+    records = [TelemetryDataParser.parse(p) for p in packets]
+    for record in records:
+        record.CarName = "Bench Car"
+        record.TrackName = "Bench Track"
+    results = {}
+
+    results["parser.parse"] = bench_per_item(lambda _, p: TelemetryDataParser.parse(p), packets)
+    buffer = b"".join(packets)
+    results["parser.parse_many"] = bench_single(lambda: TelemetryDataParser.parse_many(buffer), count)
+    results["record.to_csv_line"] = bench_per_item(lambda _, r: r.to_csv_line(), records)
+
+    results["statistics.update"] = bench_per_item(lambda stats, r: stats.update(r), records,
+                                                  setup=TelemetryStatistics)
+    filled = TelemetryStatistics()
+    for record in records:
+        filled.update(record)
+    results["statistics.get_statistics"] = bench_single(filled.get_statistics, count)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        receivers = []
+
+        def make_receiver():
+            receiver = UdpReceiver({}, {}, telemetry_dir=tmp_dir)
+            receiver.begin_session(receiver.generate_csv_filename(), False)
+            receivers.append(receiver)
+            return receiver
+
+        results["receiver.save_to_csv"] = bench_per_item(lambda receiver, r: receiver.save_to_csv(r), records,
+                                                         setup=make_receiver)
+        for receiver in receivers:
+            receiver.end_session()
+
+        csv_path = os.path.join(tmp_dir, "bench.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write(records[0].get_csv_header() + "\n")
+            f.writelines(r.to_csv_line() + "\n" for r in records)
+        results["viewer.load_csv"] = bench_single(lambda: load_csv_like_viewer(csv_path), count)
+
+        if not skip_udp:
+            results["receiver.listen_loop"] = {
+                f"{rate}pps": bench_loopback(rate, 2.0, 4, tmp_dir) for rate in (240, 2000, 10000)
+            }
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "packets": count,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la telemetría Forza (salida JSON).")
+    parser.add_argument("--packets", type=int, default=20000)
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto, stdout)")
+    parser.add_argument("--skip-udp", action="store_true", help="Omitir la prueba UDP por loopback")
+    args = parser.parse_args()
+
+    # Los mensajes del receptor no deben mezclarse con el JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = run_suite(args.packets, args.skip_udp)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
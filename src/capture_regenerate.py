@@ -0,0 +1,55 @@
+# capture_regenerate.py
+"""
+Regenera el CSV y el JSON de estadísticas de una sesión a partir de su captura
+de paquetes sin procesar (.fzcap), con la decimación que se quiera.
+
+Uso (desde src/):
+    python capture_regenerate.py Telemetry/forza_telemetry_XXXX.fzcap --interval-ms 0
+"""
+import argparse
+import os
+from raw_capture import read_capture
+from reference_data_repository import ReferenceDataRepository
+from udp_receiver import UdpReceiver
+
+
+def regenerate_from_capture(capture_path: str, csv_filename: str, car_names: dict, track_names: dict,
+                            write_interval_ms: float = UdpReceiver.WRITE_INTERVAL_MS,
+                            wait_for_lap_zero: bool = False):
+    """
+    Reprocesa la captura con los mismos filtros que la recepción en vivo,
+    usando los tiempos de llegada grabados en lugar del reloj actual.
+    """
+    receiver = UdpReceiver(car_names, track_names)
+    receiver.begin_session(csv_filename, wait_for_lap_zero, write_interval_ms, offline=True)
+    for arrival_ns, _addr, packet in read_capture(capture_path):
+        receiver.process_datagram(packet, arrival_ns / 1e9)
+    receiver.end_session()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenera CSV/JSON desde una captura de paquetes.")
+    parser.add_argument("capture", help="Fichero .fzcap grabado por UdpReceiver")
+    parser.add_argument("--interval-ms", type=float, default=UdpReceiver.WRITE_INTERVAL_MS,
+                        help="Intervalo mínimo entre muestras guardadas (0 = todas)")
+    parser.add_argument("--wait-lap-zero", action="store_true",
+                        help="Empezar a grabar al detectar la vuelta 0 (modo Race)")
+    parser.add_argument("--output", help="CSV de salida (por defecto junto a la captura)")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    db_path = os.path.join(base_dir, "Data", "referenceData.db")
+    car_names = ReferenceDataRepository.load_car_names(db_path)
+    track_names = ReferenceDataRepository.load_track_names(db_path)
+
+    csv_filename = args.output
+    if not csv_filename:
+        root, _ = os.path.splitext(args.capture)
+        csv_filename = f"{root}_{args.interval_ms:g}ms.csv"
+
+    regenerate_from_capture(args.capture, csv_filename, car_names, track_names,
+                            args.interval_ms, args.wait_lap_zero)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# csv_telemetry_writer.py
+import os
+import queue
+import threading
+import time
+from forza_telemetry_data import ForzaTelemetryData
+
+
+class _AfterFlush:
+    # Elemento de la cola que no es una fila: una llamada a hacer tras volcar las anteriores
+    __slots__ = ("callback",)
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+class CsvTelemetryWriter:
+    """
+    Escritor de CSV en un hilo dedicado.
+
+    El hilo del event-loop solo encola las muestras (sin bloquear); el hilo
+    escritor mantiene el fichero abierto, convierte las muestras a texto y las
+    escribe por lotes cuando se acumulan FLUSH_ROWS filas o pasan
+    FLUSH_INTERVAL_S segundos, y al cerrar.
+    """
+    MAX_QUEUE_SIZE = 10000
+    FLUSH_ROWS = 256
+    FLUSH_INTERVAL_S = 1.0
+    PUT_TIMEOUT_S = 0.5  # espera máxima entre comprobaciones de que el hilo sigue vivo
+
+    _STOP = object()  # centinela para terminar el hilo
+
+    def __init__(self, filename: str, max_queue_size: int = MAX_QUEUE_SIZE,
+                 flush_rows: int = FLUSH_ROWS, flush_interval_s: float = FLUSH_INTERVAL_S,
+                 drop_when_full: bool = True, append: bool = False):
+        self.filename = filename
+        self._append = append  # continuar un CSV existente (sesión reanudada)
+        self._drop_when_full = drop_when_full
+        self._flush_rows = flush_rows
+        self._flush_interval_s = flush_interval_s
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._file = None
+        self.error = None  # excepción que terminó el hilo escritor, si la hubo
+
+        # Métricas
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.max_queue_depth = 0
+        self.total_write_latency_s = 0.0
+        self.max_write_latency_s = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def write(self, data: ForzaTelemetryData):
+        """
+        Encola una muestra. Si la cola está llena se descarta y se contabiliza,
+        salvo con drop_when_full=False (procesado offline), donde se espera.
+        Si el hilo escritor ha terminado por un error, en vivo las muestras se
+        descartan y offline se relanza el error.
+        """
+        if self.error is not None:
+            if not self._drop_when_full:
+                raise self.error
+            self.rows_dropped += 1
+            return
+        if self._drop_when_full:
+            try:
+                self._queue.put_nowait(data)
+            except queue.Full:
+                self.rows_dropped += 1
+                return
+        elif not self._put(data):
+            if self.error is not None:
+                raise self.error
+            self.rows_dropped += 1
+            return
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def call_after_flush(self, callback) -> bool:
+        """
+        Encola callback(rows_written) para que el hilo escritor lo llame justo
+        después de volcar todas las filas encoladas antes; rows_written es
+        entonces exactamente el número de esas filas que están en el fichero.
+        Devuelve False si no se puede encolar (cola llena o hilo terminado).
+        """
+        if self.error is not None or self._thread is None or not self._thread.is_alive():
+            return False
+        try:
+            self._queue.put_nowait(_AfterFlush(callback))
+        except queue.Full:
+            return False
+        return True
+
+    def close(self):
+        """
+        Vacía la cola, escribe lo pendiente y cierra el fichero. Relanza el
+        error del hilo escritor, si terminó por uno.
+        """
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._put(CsvTelemetryWriter._STOP)
+        self._thread.join()
+        self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def _put(self, item) -> bool:
+        # put bloqueante que deja de esperar si el hilo escritor termina (la cola ya no se vaciaría)
+        while True:
+            try:
+                self._queue.put(item, timeout=self.PUT_TIMEOUT_S)
+                return True
+            except queue.Full:
+                if not self._thread.is_alive():
+                    return False
+
+    def get_metrics(self) -> dict:
+        return {
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "flushes": self.flushes,
+            "avg_write_latency_ms": (self.total_write_latency_s / self.flushes * 1000) if self.flushes else 0.0,
+            "max_write_latency_ms": self.max_write_latency_s * 1000,
+        }
+
+    def _run(self):
+        pending = []
+        last_flush = time.monotonic()
+        try:
+            while True:
+                timeout = max(0.0, self._flush_interval_s - (time.monotonic() - last_flush))
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is CsvTelemetryWriter._STOP:
+                    break
+                if type(item) is _AfterFlush:
+                    if pending:
+                        self._flush(pending)
+                        pending = []
+                        last_flush = time.monotonic()
+                    self._call(item.callback)
+                    continue
+                if item is not None:
+                    pending.append(self._format_row(item))
+
+                if pending and (len(pending) >= self._flush_rows
+                                or time.monotonic() - last_flush >= self._flush_interval_s):
+                    self._flush(pending)
+                    pending = []
+                    last_flush = time.monotonic()
+                elif not pending:
+                    last_flush = time.monotonic()
+
+            # Muestras que llegaron antes del centinela
+            if pending:
+                self._flush(pending)
+        except Exception as e:
+            # Se guarda para close()/write(); las muestras encoladas se pierden
+            self.error = e
+            print(f"Error en el escritor de {self.filename}: {e}")
+        finally:
+            self._close_output()
+
+    def _call(self, callback):
+        # Un fallo de la llamada (p. ej. un checkpoint) no detiene la escritura de filas
+        try:
+            callback(self.rows_written)
+        except Exception as e:
+            print(f"Error en el escritor de {self.filename} tras volcar: {e}")
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        self._write_rows(rows)
+        latency = time.perf_counter() - start
+
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self.total_write_latency_s += latency
+        if latency > self.max_write_latency_s:
+            self.max_write_latency_s = latency
+
+    # Salida concreta (las subclases pueden escribir en otro destino con el mismo hilo y métricas)
+    def _format_row(self, data: ForzaTelemetryData):
+        return data.to_csv_line()
+
+    def _close_output(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _ends_mid_line(self) -> bool:
+        with open(self.filename, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _write_rows(self, lines):
+        if self._file is None:
+            # El fichero se crea con la primera fila, como antes
+            has_rows = self._append and os.path.exists(self.filename) and os.path.getsize(self.filename) > 0
+            self._file = open(self.filename, "a" if self._append else "w", newline='', encoding='utf-8')
+            if not has_rows:
+                self._file.write(ForzaTelemetryData.get_csv_header() + "\n")
+            elif self._ends_mid_line():
+                # Sesión interrumpida a mitad de una fila: esa fila queda sola en su línea
+                self._file.write("\n")
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
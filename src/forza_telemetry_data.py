@@ -1,151 +1,202 @@
 # forza_telemetry_data.py
-from dataclasses import dataclass, field, fields
-
-@dataclass
-class ForzaTelemetryData:
-    # --- Sección "Sled" ---
-    IsRaceOn: int = field(default=0)
-    TimestampMS: int = 0
-    EngineMaxRpm: float = 0.0
-    EngineIdleRpm: float = 0.0
-    CurrentEngineRpm: float = 0.0
-
-    AccelerationX: float = 0.0
-    AccelerationY: float = 0.0
-    AccelerationZ: float = 0.0
-
-    VelocityX: float = 0.0
-    VelocityY: float = 0.0
-    VelocityZ: float = 0.0
-
-    AngularVelocityX: float = 0.0
-    AngularVelocityY: float = 0.0
-    AngularVelocityZ: float = 0.0
-
-    Yaw: float = 0.0
-    Pitch: float = 0.0
-    Roll: float = 0.0
-
-    NormalizedSuspensionTravelFrontLeft: float = 0.0
-    NormalizedSuspensionTravelFrontRight: float = 0.0
-    NormalizedSuspensionTravelRearLeft: float = 0.0
-    NormalizedSuspensionTravelRearRight: float = 0.0
-
-    TireSlipRatioFrontLeft: float = 0.0
-    TireSlipRatioFrontRight: float = 0.0
-    TireSlipRatioRearLeft: float = 0.0
-    TireSlipRatioRearRight: float = 0.0
-
-    WheelRotationSpeedFrontLeft: float = 0.0
-    WheelRotationSpeedFrontRight: float = 0.0
-    WheelRotationSpeedRearLeft: float = 0.0
-    WheelRotationSpeedRearRight: float = 0.0
-
-    WheelOnRumbleStripFrontLeft: int = 0
-    WheelOnRumbleStripFrontRight: int = 0
-    WheelOnRumbleStripRearLeft: int = 0
-    WheelOnRumbleStripRearRight: int = 0
-
-    WheelInPuddleDepthFrontLeft: float = 0.0
-    WheelInPuddleDepthFrontRight: float = 0.0
-    WheelInPuddleDepthRearLeft: float = 0.0
-    WheelInPuddleDepthRearRight: float = 0.0
-
-    SurfaceRumbleFrontLeft: float = 0.0
-    SurfaceRumbleFrontRight: float = 0.0
-    SurfaceRumbleRearLeft: float = 0.0
-    SurfaceRumbleRearRight: float = 0.0
-
-    TireSlipAngleFrontLeft: float = 0.0
-    TireSlipAngleFrontRight: float = 0.0
-    TireSlipAngleRearLeft: float = 0.0
-    TireSlipAngleRearRight: float = 0.0
-
-    TireCombinedSlipFrontLeft: float = 0.0
-    TireCombinedSlipFrontRight: float = 0.0
-    TireCombinedSlipRearLeft: float = 0.0
-    TireCombinedSlipRearRight: float = 0.0
-
-    SuspensionTravelMetersFrontLeft: float = 0.0
-    SuspensionTravelMetersFrontRight: float = 0.0
-    SuspensionTravelMetersRearLeft: float = 0.0
-    SuspensionTravelMetersRearRight: float = 0.0
-
-    CarOrdinal: int = 0
-    CarClass: int = field(default=0)
-    CarPerformanceIndex: int = 0
-    DrivetrainType: int = field(default=0)
-    NumCylinders: int = 0
-
-    # --- Sección "Dash" ---
-    PositionX: float = 0.0
-    PositionY: float = 0.0
-    PositionZ: float = 0.0
-
-    Speed: float = field(default=0.0)
-    Power: float = 0.0
-    Torque: float = 0.0
-
-    # Ahora se incluyen las temperaturas en Fahrenheit (original)
-    TireTempFrontLeft: float = field(default=0.0)
-    TireTempFrontRight: float = field(default=0.0)
-    TireTempRearLeft: float = field(default=0.0)
-    TireTempRearRight: float = field(default=0.0)
-
-    Boost: float = 0.0
-    Fuel: float = 0.0
-    DistanceTraveled: float = 0.0
-    BestLap: float = field(default=0.0)
-    LastLap: float = field(default=0.0)
-    CurrentLap: float = field(default=0.0)
-    CurrentRaceTime: float = field(default=0.0)
-
-    LapNumber: int = 0
-    RacePosition: int = 0
-    Accel: int = 0
-    Brake: int = 0
-    Clutch: int = 0
-    HandBrake: int = 0
-    Gear: int = 0
-    Steer: int = 0
-    NormalizedDrivingLine: int = 0
-    NormalizedAIBrakeDifference: int = 0
-
-    TireWearFrontLeft: float = 0.0
-    TireWearFrontRight: float = 0.0
-    TireWearRearLeft: float = 0.0
-    TireWearRearRight: float = 0.0
-
-    TrackOrdinal: int = field(default=0)
-    CarName: str = field(default="")
-    TrackName: str = field(default="")
-
-    # Nuevos campos calculados (para exportar en CSV)
-    TireTempFrontLeftCelsius: float = 0.0
-    TireTempFrontRightCelsius: float = 0.0
-    TireTempRearLeftCelsius: float = 0.0
-    TireTempRearRightCelsius: float = 0.0
-
-    SpeedKph: float = 0.0
-
-    def convert_fahrenheit_to_celsius(self, valueF):
-        return (valueF - 32) * (5.0 / 9.0)
-
-    @classmethod
-    def get_csv_header(cls):
-        hdrs = []
-        for f in fields(cls):
-            if f.metadata.get("csv_ignore", False):
-                continue
-            col_name = f.metadata.get("csv_column", f.name)
-            hdrs.append(col_name)
-        return ",".join(hdrs)
-
-    def to_csv_line(self):
-        values = []
-        for f in fields(self):
-            if f.metadata.get("csv_ignore", False):
-                continue
-            val = getattr(self, f.name)
-            values.append(str(val) if val is not None else "")
-        return ",".join(values)
+import operator
+from dataclasses import field, make_dataclass
+import numpy as np
+
+# Tabla única de campos del paquete "Data Out" de FM8: (nombre, formato struct).
+# El orden es el del datagrama; de aquí salen tanto el layout binario que usa
+# TelemetryDataParser como los atributos de ForzaTelemetryData.
+SLED_FIELDS = (
+    ("IsRaceOn", "i"),
+    ("TimestampMS", "I"),
+    ("EngineMaxRpm", "f"),
+    ("EngineIdleRpm", "f"),
+    ("CurrentEngineRpm", "f"),
+
+    ("AccelerationX", "f"),
+    ("AccelerationY", "f"),
+    ("AccelerationZ", "f"),
+
+    ("VelocityX", "f"),
+    ("VelocityY", "f"),
+    ("VelocityZ", "f"),
+
+    ("AngularVelocityX", "f"),
+    ("AngularVelocityY", "f"),
+    ("AngularVelocityZ", "f"),
+
+    ("Yaw", "f"),
+    ("Pitch", "f"),
+    ("Roll", "f"),
+
+    ("NormalizedSuspensionTravelFrontLeft", "f"),
+    ("NormalizedSuspensionTravelFrontRight", "f"),
+    ("NormalizedSuspensionTravelRearLeft", "f"),
+    ("NormalizedSuspensionTravelRearRight", "f"),
+
+    ("TireSlipRatioFrontLeft", "f"),
+    ("TireSlipRatioFrontRight", "f"),
+    ("TireSlipRatioRearLeft", "f"),
+    ("TireSlipRatioRearRight", "f"),
+
+    ("WheelRotationSpeedFrontLeft", "f"),
+    ("WheelRotationSpeedFrontRight", "f"),
+    ("WheelRotationSpeedRearLeft", "f"),
+    ("WheelRotationSpeedRearRight", "f"),
+
+    ("WheelOnRumbleStripFrontLeft", "i"),
+    ("WheelOnRumbleStripFrontRight", "i"),
+    ("WheelOnRumbleStripRearLeft", "i"),
+    ("WheelOnRumbleStripRearRight", "i"),
+
+    ("WheelInPuddleDepthFrontLeft", "f"),
+    ("WheelInPuddleDepthFrontRight", "f"),
+    ("WheelInPuddleDepthRearLeft", "f"),
+    ("WheelInPuddleDepthRearRight", "f"),
+
+    ("SurfaceRumbleFrontLeft", "f"),
+    ("SurfaceRumbleFrontRight", "f"),
+    ("SurfaceRumbleRearLeft", "f"),
+    ("SurfaceRumbleRearRight", "f"),
+
+    ("TireSlipAngleFrontLeft", "f"),
+    ("TireSlipAngleFrontRight", "f"),
+    ("TireSlipAngleRearLeft", "f"),
+    ("TireSlipAngleRearRight", "f"),
+
+    ("TireCombinedSlipFrontLeft", "f"),
+    ("TireCombinedSlipFrontRight", "f"),
+    ("TireCombinedSlipRearLeft", "f"),
+    ("TireCombinedSlipRearRight", "f"),
+
+    ("SuspensionTravelMetersFrontLeft", "f"),
+    ("SuspensionTravelMetersFrontRight", "f"),
+    ("SuspensionTravelMetersRearLeft", "f"),
+    ("SuspensionTravelMetersRearRight", "f"),
+
+    ("CarOrdinal", "i"),
+    ("CarClass", "i"),
+    ("CarPerformanceIndex", "i"),
+    ("DrivetrainType", "i"),
+    ("NumCylinders", "i"),
+)
+
+DASH_FIELDS = (
+    ("PositionX", "f"),
+    ("PositionY", "f"),
+    ("PositionZ", "f"),
+
+    ("Speed", "f"),
+    ("Power", "f"),
+    ("Torque", "f"),
+
+    # Temperaturas en Fahrenheit (original)
+    ("TireTempFrontLeft", "f"),
+    ("TireTempFrontRight", "f"),
+    ("TireTempRearLeft", "f"),
+    ("TireTempRearRight", "f"),
+
+    ("Boost", "f"),
+    ("Fuel", "f"),
+    ("DistanceTraveled", "f"),
+    ("BestLap", "f"),
+    ("LastLap", "f"),
+    ("CurrentLap", "f"),
+    ("CurrentRaceTime", "f"),
+
+    ("LapNumber", "H"),
+    ("RacePosition", "B"),
+    ("Accel", "B"),
+    ("Brake", "B"),
+    ("Clutch", "B"),
+    ("HandBrake", "B"),
+    ("Gear", "B"),
+    ("Steer", "b"),
+    ("NormalizedDrivingLine", "b"),
+    ("NormalizedAIBrakeDifference", "b"),
+)
+
+# Campos que FM8 añade al final del bloque Dash
+FM8_EXTRA_FIELDS = (
+    ("TireWearFrontLeft", "f"),
+    ("TireWearFrontRight", "f"),
+    ("TireWearRearLeft", "f"),
+    ("TireWearRearRight", "f"),
+
+    ("TrackOrdinal", "i"),
+)
+
+PACKET_FIELDS = SLED_FIELDS + DASH_FIELDS + FM8_EXTRA_FIELDS
+
+
+# Columnas calculadas: no se almacenan, se derivan bajo demanda de los campos del paquete
+DERIVED_COLUMNS = (
+    "TireTempFrontLeftCelsius",
+    "TireTempFrontRightCelsius",
+    "TireTempRearLeftCelsius",
+    "TireTempRearRightCelsius",
+    "SpeedKph",
+)
+
+# Orden de columnas del CSV (idéntico al de las versiones anteriores)
+CSV_COLUMNS = tuple(name for name, _ in PACKET_FIELDS) + ("CarName", "TrackName") + DERIVED_COLUMNS
+
+# Tipos de cada columna del CSV al leerlo con pandas: el tipo exacto del campo en
+# el paquete (float32, uint8, int16...), float32 para las columnas calculadas y
+# categorías para los nombres de coche y circuito, que se repiten en cada fila
+CSV_DTYPES = {name: np.dtype("<" + fmt) for name, fmt in PACKET_FIELDS}
+CSV_DTYPES.update({name: np.dtype(np.float32) for name in DERIVED_COLUMNS})
+CSV_DTYPES.update({"CarName": "category", "TrackName": "category"})
+CATEGORY_COLUMNS = [name for name, dtype in CSV_DTYPES.items() if isinstance(dtype, str)]
+
+_csv_values = operator.attrgetter(*CSV_COLUMNS)
+
+
+def _packet_field_spec(name, fmt):
+    if fmt == "f":
+        return (name, float, field(default=0.0))
+    return (name, int, field(default=0))
+
+
+def _convert_fahrenheit_to_celsius(self, valueF):
+    return (valueF - 32) * (5.0 / 9.0)
+
+
+def _get_csv_header(cls):
+    return ",".join(CSV_COLUMNS)
+
+
+def _to_csv_line(self):
+    return ",".join(map(str, _csv_values(self)))
+
+
+def _to_csv_values(self):
+    return _csv_values(self)
+
+
+# Los campos del paquete van primero y en el mismo orden que el datagrama,
+# de modo que el parser puede construir la instancia posicionalmente con la
+# tupla que devuelve struct.unpack_from. Con slots=True cada instancia ocupa
+# solo sus ~100 referencias, sin __dict__ por paquete.
+ForzaTelemetryData = make_dataclass(
+    "ForzaTelemetryData",
+    [_packet_field_spec(name, fmt) for name, fmt in PACKET_FIELDS] + [
+        ("CarName", str, field(default="")),
+        ("TrackName", str, field(default="")),
+    ],
+    namespace={
+        "convert_fahrenheit_to_celsius": _convert_fahrenheit_to_celsius,
+        "get_csv_header": classmethod(_get_csv_header),
+        "to_csv_line": _to_csv_line,
+        "to_csv_values": _to_csv_values,  # tupla en el orden de CSV_COLUMNS
+
+        # Campos calculados (para exportar en CSV)
+        "TireTempFrontLeftCelsius": property(lambda self: (self.TireTempFrontLeft - 32) * (5.0 / 9.0)),
+        "TireTempFrontRightCelsius": property(lambda self: (self.TireTempFrontRight - 32) * (5.0 / 9.0)),
+        "TireTempRearLeftCelsius": property(lambda self: (self.TireTempRearLeft - 32) * (5.0 / 9.0)),
+        "TireTempRearRightCelsius": property(lambda self: (self.TireTempRearRight - 32) * (5.0 / 9.0)),
+        "SpeedKph": property(lambda self: self.Speed * 3.6),
+    },
+    slots=True,
+)
+ForzaTelemetryData.__module__ = __name__
@@ -0,0 +1,190 @@
+# load_generator.py
+"""
+Envía telemetría FM8 a un puerto UDP local sin necesidad del juego: reproduce
+una captura (.fzcap) o genera paquetes sintéticos con el layout de
+TelemetryDataParser. Sirve para medir la tasa máxima sostenible y las pérdidas
+de UdpReceiver.
+
+Uso (desde src/):
+    python load_generator.py --rate 60 --rigs 4 --duration 30
+    python load_generator.py --capture Telemetry/forza_telemetry_XXXX.fzcap --speed 10
+    python load_generator.py --rate 5000 --loss 0.01 --reorder 0.02
+"""
+import argparse
+import math
+import random
+import socket
+import time
+from forza_telemetry_data import PACKET_FIELDS
+from raw_capture import read_capture
+from telemetry_parser import FM8_STRUCT
+from udp_receiver import UdpReceiver
+
+_FIELD_INDEX = {name: i for i, (name, _) in enumerate(PACKET_FIELDS)}
+
+
+class SyntheticRig:
+    """
+    Coche simulado que recorre un circuito circular y genera paquetes FM8
+    coherentes (vuelta, tiempo, velocidad, marcha, temperaturas...).
+    """
+
+    def __init__(self, rig_id: int, lap_time_s: float = 90.0, track_radius_m: float = 500.0):
+        self.rig_id = rig_id
+        self.lap_time_s = lap_time_s
+        self.track_radius_m = track_radius_m
+        self._values = [0.0 if fmt == "f" else 0 for _, fmt in PACKET_FIELDS]
+        self._set("IsRaceOn", 1)
+        self._set("EngineMaxRpm", 8000.0)
+        self._set("EngineIdleRpm", 900.0)
+        self._set("CarOrdinal", 1000 + rig_id)
+        self._set("CarClass", 5)
+        self._set("CarPerformanceIndex", 800)
+        self._set("DrivetrainType", 1)
+        self._set("NumCylinders", 8)
+        self._set("TrackOrdinal", 100 + rig_id)
+
+    def _set(self, name, value):
+        self._values[_FIELD_INDEX[name]] = value
+
+    def packet(self, t: float) -> bytes:
+        """Paquete del instante t (segundos desde el inicio de la sesión)."""
+        lap, lap_t = divmod(t, self.lap_time_s)
+        angle = 2 * math.pi * lap_t / self.lap_time_s
+        speed = 40.0 + 20.0 * math.sin(3 * angle)
+        gear = min(6, 1 + int(speed // 10))
+        tire_temp_f = 180.0 + 10.0 * math.sin(angle)
+
+        self._set("TimestampMS", int(t * 1000) & 0xFFFFFFFF)
+        self._set("CurrentEngineRpm", 3000.0 + 4000.0 * ((speed % 10) / 10))
+        self._set("PositionX", self.track_radius_m * math.cos(angle))
+        self._set("PositionZ", self.track_radius_m * math.sin(angle))
+        self._set("Yaw", angle)
+        self._set("Speed", speed)
+        for wheel in ("FrontLeft", "FrontRight", "RearLeft", "RearRight"):
+            self._set("TireTemp" + wheel, tire_temp_f)
+            self._set("SuspensionTravelMeters" + wheel, 0.05 + 0.01 * math.sin(5 * angle))
+        self._set("DistanceTraveled", speed * t)
+        self._set("LastLap", self.lap_time_s if lap > 0 else 0.0)
+        self._set("BestLap", self.lap_time_s if lap > 0 else 0.0)
+        self._set("CurrentLap", lap_t)
+        self._set("CurrentRaceTime", t)
+        self._set("LapNumber", int(lap) & 0xFFFF)
+        self._set("Accel", 255 if math.sin(3 * angle) > -0.5 else 0)
+        self._set("Brake", 0 if math.sin(3 * angle) > -0.5 else 200)
+        self._set("Gear", gear)
+        return FM8_STRUCT.pack(*self._values)
+
+
+def _capture_packets(path: str):
+    return [(arrival_ns, bytes(packet)) for arrival_ns, _addr, packet in read_capture(path)]
+
+
+def run(host: str, port: int, rate: float, rigs: int, duration: float, capture: str = None,
+        speed: float = 1.0, loss: float = 0.0, reorder: float = 0.0, seed: int = 0) -> dict:
+    """
+    Envía paquetes durante `duration` segundos (o hasta agotar la captura) y
+    devuelve un resumen con lo enviado, perdido y reordenado a propósito.
+
+    Cada rig usa su propio socket (puerto de origen distinto), como un equipo
+    real. En modo captura, la cadencia sale de los tiempos de llegada grabados
+    divididos por `speed`, salvo que se indique `rate`.
+    """
+    rng = random.Random(seed)
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(rigs)]
+    target = (host, port)
+    sent = lost = reordered = 0
+    held = [None] * rigs  # paquete retenido por rig para simular reordenación
+
+    if capture:
+        recorded = _capture_packets(capture)
+        if not recorded:
+            return {"sent": 0, "lost": 0, "reordered": 0, "elapsed_s": 0.0, "rate_pps": 0.0}
+        first_ns = recorded[0][0]
+        if rate:
+            schedule = [(i / rate, pkt) for i, (_, pkt) in enumerate(recorded)]
+        else:
+            schedule = [((arrival_ns - first_ns) / 1e9 / speed, pkt) for arrival_ns, pkt in recorded]
+    else:
+        synthetic = [SyntheticRig(i) for i in range(rigs)]
+        schedule = None
+
+    start = time.perf_counter()
+    tick = 0
+    while True:
+        if schedule is not None:
+            if tick >= len(schedule):
+                break
+            offset_s, shared_packet = schedule[tick]
+            packets = [shared_packet] * rigs
+        else:
+            offset_s = tick / rate
+            if offset_s >= duration:
+                break
+            packets = [rig.packet(offset_s) for rig in synthetic]
+
+        delay = start + offset_s - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        for i, packet in enumerate(packets):
+            if loss and rng.random() < loss:
+                lost += 1
+                continue
+            if held[i] is not None:
+                # El retenido sale después del actual: llegan en orden invertido
+                sockets[i].sendto(packet, target)
+                sockets[i].sendto(held[i], target)
+                held[i] = None
+                sent += 2
+                continue
+            if reorder and rng.random() < reorder:
+                held[i] = packet
+                reordered += 1
+                continue
+            sockets[i].sendto(packet, target)
+            sent += 1
+        tick += 1
+
+    for i, packet in enumerate(held):
+        if packet is not None:
+            sockets[i].sendto(packet, target)
+            sent += 1
+    elapsed = time.perf_counter() - start
+    for sock in sockets:
+        sock.close()
+
+    return {
+        "sent": sent,
+        "lost": lost,
+        "reordered": reordered,
+        "elapsed_s": elapsed,
+        "rate_pps": sent / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga UDP para UdpReceiver.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=UdpReceiver.DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Paquetes/s por rig (por defecto 60; en modo captura, la cadencia grabada)")
+    parser.add_argument("--rigs", type=int, default=1, help="Número de equipos simulados")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de tráfico sintético")
+    parser.add_argument("--capture", help="Reproducir un fichero .fzcap en lugar de generar paquetes")
+    parser.add_argument("--speed", type=float, default=1.0, help="Factor de velocidad al reproducir una captura")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probabilidad de perder cada paquete")
+    parser.add_argument("--reorder", type=float, default=0.0, help="Probabilidad de reordenar cada paquete")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rate = args.rate if args.rate is not None else (None if args.capture else 60.0)
+    summary = run(args.host, args.port, rate, args.rigs, args.duration, args.capture,
+                  args.speed, args.loss, args.reorder, args.seed)
+    print(f"Enviados {summary['sent']} paquetes en {summary['elapsed_s']:.2f} s "
+          f"({summary['rate_pps']:.0f} paquetes/s), perdidos a propósito {summary['lost']}, "
+          f"reordenados {summary['reordered']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ import os
 import asyncio
 import threading
 import time
+import multiprocessing
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QLabel
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QLabel, QCheckBox, QComboBox
 )
+from PyQt5.QtCore import pyqtSignal
 from udp_receiver import UdpReceiver
 from reference_data_repository import ReferenceDataRepository
+from session_catalog import SessionCatalog, CATALOG_FILENAME
 from telemetry_gui.gui_main import TelemetryViewer
 
 
@@ -27,12 +30,35 @@ class AsyncRunner(threading.Thread):
 
 
 class TelemetryGUI(QWidget):
+    # Se emite desde el hilo de cierre de sesión; Qt lo entrega en el hilo de la GUI
+    session_finalized = pyqtSignal(str)
+
+    # (texto, formato de UdpReceiver.columnar_store)
+    COLUMNAR_STORE_OPTIONS = [
+        ("Ninguna", None),
+        (".npz (comprimido)", "npz"),
+        (".fzses (memmap, grabaciones largas)", "fzses"),
+    ]
+    # (texto, valor de UdpReceiver.sqlite_sink)
+    SQLITE_SINK_OPTIONS = [
+        ("Ninguna", None),
+        ("Una base por sesión", "session"),
+        ("Base compartida (Telemetry/telemetry.db)", "shared"),
+    ]
+
     def __init__(self, receiver, async_runner):
         super().__init__()
         self.receiver = receiver
         self.async_runner = async_runner
         self._viewer = None            # se creará al primer uso
         self.init_ui()
+        self.session_finalized.connect(self.log_message)
+        self.receiver.on_session_finalized = self._on_session_finalized
+        # Sesiones que quedaron a medias (cierre inesperado): se cierran desde su checkpoint
+        self.receiver.recover_interrupted_sessions().add_done_callback(self._on_sessions_recovered)
+        # Catálogo de sesiones: se añaden las que aún no estén (en su propio hilo)
+        if self.receiver.catalog is not None:
+            self.receiver.refresh_catalog().add_done_callback(self._on_catalog_refreshed)
 
     # ---------- UI ----------
     def init_ui(self):
@@ -70,6 +96,33 @@ class TelemetryGUI(QWidget):
 
         layout.addLayout(btn_layout)
 
+        # Grabación opcional de todos los datagramas sin procesar (.fzcap)
+        self.chk_raw_capture = QCheckBox("Grabar paquetes sin procesar (captura completa)")
+        layout.addWidget(self.chk_raw_capture)
+
+        # Copia columnar de cada sesión al cerrarla, más rápida de abrir en el visor
+        store_layout = QHBoxLayout()
+        store_layout.addWidget(QLabel("Copia columnar al cerrar la sesión:"))
+        self.combo_columnar_store = QComboBox()
+        for label, store_format in self.COLUMNAR_STORE_OPTIONS:
+            self.combo_columnar_store.addItem(label, store_format)
+        self.combo_columnar_store.setCurrentIndex(
+            max(self.combo_columnar_store.findData(self.receiver.columnar_store), 0))
+        self.combo_columnar_store.currentIndexChanged.connect(self.set_columnar_store)
+        store_layout.addWidget(self.combo_columnar_store)
+        layout.addLayout(store_layout)
+
+        # Copia de las muestras en SQLite mientras se graba (se aplica al empezar la sesión)
+        sqlite_layout = QHBoxLayout()
+        sqlite_layout.addWidget(QLabel("Copia en SQLite:"))
+        self.combo_sqlite_sink = QComboBox()
+        for label, sink in self.SQLITE_SINK_OPTIONS:
+            self.combo_sqlite_sink.addItem(label, sink)
+        self.combo_sqlite_sink.setCurrentIndex(max(self.combo_sqlite_sink.findData(self.receiver.sqlite_sink), 0))
+        self.combo_sqlite_sink.currentIndexChanged.connect(self.set_sqlite_sink)
+        sqlite_layout.addWidget(self.combo_sqlite_sink)
+        layout.addLayout(sqlite_layout)
+
         # Área de log
         self.log = QTextEdit()
         self.log.setReadOnly(True)
@@ -83,16 +136,26 @@ class TelemetryGUI(QWidget):
         self.log.append(f"{timestamp} - {msg}")
 
     # ---------- handlers ----------
+    def set_columnar_store(self, index: int):
+        self.receiver.columnar_store = self.combo_columnar_store.itemData(index)
+
+    def set_sqlite_sink(self, index: int):
+        self.receiver.sqlite_sink = self.combo_sqlite_sink.itemData(index)
+
     def start_race(self):
         if not self.receiver.is_listening:
-            self.async_runner.loop.call_soon_threadsafe(self.receiver.start_listening, True)
+            self.async_runner.loop.call_soon_threadsafe(
+                self.receiver.start_listening, True, self.chk_raw_capture.isChecked()
+            )
             self.log_message("Race mode started")
         else:
             self.log_message("Receiver already running")
 
     def start_practice(self):
         if not self.receiver.is_listening:
-            self.async_runner.loop.call_soon_threadsafe(self.receiver.start_listening, False)
+            self.async_runner.loop.call_soon_threadsafe(
+                self.receiver.start_listening, False, self.chk_raw_capture.isChecked()
+            )
             self.log_message("Practice mode started")
         else:
             self.log_message("Receiver already running")
@@ -104,6 +167,25 @@ class TelemetryGUI(QWidget):
         else:
             self.log_message("Receiver is not running")
 
+    def _on_session_finalized(self, future):
+        if future.exception() is not None:
+            self.session_finalized.emit(f"Error saving statistics: {future.exception()}")
+        else:
+            self.session_finalized.emit(f"Statistics saved: {future.result()}")
+
+    def _on_sessions_recovered(self, future):
+        if future.exception() is not None:
+            self.session_finalized.emit(f"Error recovering interrupted sessions: {future.exception()}")
+            return
+        for json_filename in future.result():
+            self.session_finalized.emit(f"Recovered interrupted session: {json_filename}")
+
+    def _on_catalog_refreshed(self, future):
+        if future.exception() is not None:
+            self.session_finalized.emit(f"Error updating session catalog: {future.exception()}")
+        elif future.result():
+            self.session_finalized.emit(f"Session catalog updated: {future.result()} sessions")
+
     # ---------- visor de gráficas ----------
     def open_viewer(self):
         """
@@ -111,7 +193,7 @@ class TelemetryGUI(QWidget):
         de gráficas. El usuario elige el CSV que quiere analizar allí.
         """
         if self._viewer is None:
-            self._viewer = TelemetryViewer()
+            self._viewer = TelemetryViewer(self.receiver.catalog)
         self._viewer.show()
         self._viewer.raise_()
         self._viewer.activateWindow()
@@ -140,8 +222,11 @@ def main():
     car_names = ReferenceDataRepository.load_car_names(db_path)
     track_names = ReferenceDataRepository.load_track_names(db_path)
 
+    # --- catálogo de sesiones (junto a referenceData.db) ---
+    catalog = SessionCatalog(os.path.join(base_dir, "Data", CATALOG_FILENAME), car_names, track_names)
+
     # --- receptor UDP ---
-    receiver = UdpReceiver(car_names, track_names)
+    receiver = UdpReceiver(car_names, track_names, catalog=catalog)
 
     # --- hilo para el event-loop async ---
     async_runner = AsyncRunner()
@@ -156,4 +241,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # el catálogo se reconstruye con un pool de procesos
     main()
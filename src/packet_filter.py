@@ -0,0 +1,87 @@
+# packet_filter.py
+import struct
+from telemetry_parser import PACKET_FORMATS
+
+
+class FieldRule:
+    """Descarta el paquete si `predicate(valor del campo)` es verdadero."""
+
+    def __init__(self, name: str, field_name: str, predicate):
+        self.name = name
+        self.field_name = field_name
+        self.predicate = predicate
+
+    def rejects(self, value) -> bool:
+        return self.predicate(value)
+
+
+class LapZeroGate:
+    """
+    Descarta todo hasta ver la vuelta 0 (modo Race); a partir de ahí deja pasar
+    todos los paquetes. Es la única regla con estado.
+    """
+    name = "waiting_lap_zero"
+    field_name = "LapNumber"
+
+    def __init__(self):
+        self.started = False
+
+    def rejects(self, value) -> bool:
+        if self.started:
+            return False
+        if value == 0:
+            self.started = True
+            print("Lap 0 detectada, iniciando grabación de telemetría...")
+            return False
+        return True
+
+
+def default_rules(wait_for_lap_zero: bool) -> list:
+    """Reglas equivalentes a los filtros históricos de UdpReceiver, en el mismo orden."""
+    rules = [FieldRule("race_off", "IsRaceOn", lambda v: v == 0)]
+    if wait_for_lap_zero:
+        rules.append(LapZeroGate())
+    rules.append(FieldRule("stopped", "Speed", lambda v: v < 0.5))
+    rules.append(FieldRule("gear_11", "Gear", lambda v: v == 11))
+    return rules
+
+
+class PacketFilter:
+    """
+    Evalúa las reglas leyendo solo los campos necesarios en su offset fijo
+    dentro del datagrama, antes de decodificarlo entero. Lleva un contador de
+    paquetes rechazados por regla.
+
+    Las reglas sobre campos que el formato no trae no se aplican a ese formato
+    (p. ej. "stopped" en FM7 Sled, que no lleva Speed).
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.rejections = {rule.name: 0 for rule in self.rules}
+        self._compiled = {}  # longitud de datagrama -> [(regla, struct, offset)]
+
+    def _compile(self, length: int):
+        packet_format = PACKET_FORMATS[length]
+        compiled = []
+        for rule in self.rules:
+            location = packet_format.field_offsets.get(rule.field_name)
+            if location is None:
+                # El formato no trae el campo: leerlo como 0 haría que "stopped"
+                # rechazara todos los paquetes de FM7 Sled
+                continue
+            offset, fmt = location
+            compiled.append((rule, struct.Struct("<" + fmt), offset))
+        self._compiled[length] = compiled
+        return compiled
+
+    def check(self, packet) -> str:
+        """Devuelve el nombre de la primera regla que rechaza el paquete, o None si pasa."""
+        compiled = self._compiled.get(len(packet))
+        if compiled is None:
+            compiled = self._compile(len(packet))
+        for rule, field_struct, offset in compiled:
+            if rule.rejects(field_struct.unpack_from(packet, offset)[0]):
+                self.rejections[rule.name] += 1
+                return rule.name
+        return None
@@ -0,0 +1,108 @@
+# quantile_sketch.py
+import math
+import random
+import numpy as np
+
+
+class KllSketch:
+    """
+    Sketch KLL de cuantiles en streaming (Karnin, Lang, Liberty 2016).
+
+    Guarda como mucho ~3·k valores sea cual sea el número de muestras, se
+    puede consultar en cualquier momento y dos sketches se pueden fusionar.
+    El error de rango normalizado es del orden de 1.7/k; mientras no se ha
+    compactado nada (menos de ~k muestras) los cuantiles son exactos.
+    """
+    DEFAULT_K = 200
+    _C = 2.0 / 3.0
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self._levels = [[]]  # nivel h: valores con peso 2**h
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = self._total_capacity()
+
+    @staticmethod
+    def k_for_error(error: float) -> int:
+        """k necesario para un error de rango normalizado aproximado `error`."""
+        return max(8, int(math.ceil(1.7 / error)))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * KllSketch._C ** depth)))
+
+    def _total_capacity(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def update(self, x: float):
+        self._levels[0].append(x)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel().tolist()
+        self._levels[0].extend(values)
+        self.n += len(values)
+        self._size += len(values)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: "KllSketch"):
+        """Incorpora las muestras de otro sketch (no lo modifica)."""
+        while len(self._levels) < len(other._levels):
+            self._levels.append([])
+        for h, items in enumerate(other._levels):
+            self._levels[h].extend(items)
+        self.n += other.n
+        self._size = sum(len(items) for items in self._levels)
+        self._max_size = self._total_capacity()
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self._levels)):
+            if len(self._levels[h]) >= self._capacity(h):
+                if h + 1 == len(self._levels):
+                    self._levels.append([])
+                items = sorted(self._levels[h])
+                # Con un número impar de valores el menor se queda en este nivel
+                leftover = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                self._levels[h + 1].extend(pairs[self._rng.getrandbits(1)::2])
+                self._levels[h] = leftover
+                break
+        self._size = sum(len(items) for items in self._levels)
+        self._max_size = self._total_capacity()
+
+    def quantile(self, q: float):
+        """Cuantil q en [0, 1], o None si no hay muestras."""
+        if self.n == 0:
+            return None
+        if all(not items for items in self._levels[1:]):
+            # Sin compactar: valor exacto, con la misma interpolación que np.percentile
+            return float(np.percentile(self._levels[0], q * 100))
+
+        values = np.concatenate([np.asarray(items, dtype=np.float64) for items in self._levels])
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype=np.float64)
+                                  for h, items in enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side="left"))
+        return float(values[order][min(index, len(values) - 1)])
+
+    def to_dict(self) -> dict:
+        """Estado serializable (JSON) del sketch."""
+        return {"k": self.k, "n": self.n, "levels": [list(items) for items in self._levels]}
+
+    @classmethod
+    def from_dict(cls, state: dict, seed: int = 0) -> "KllSketch":
+        sketch = cls(state["k"], seed)
+        sketch.n = state["n"]
+        sketch._levels = [list(items) for items in state["levels"]] or [[]]
+        sketch._size = sum(len(items) for items in sketch._levels)
+        sketch._max_size = sketch._total_capacity()
+        return sketch
@@ -0,0 +1,121 @@
+# raw_capture.py
+import socket
+import struct
+import threading
+
+RAW_CAPTURE_EXTENSION = ".fzcap"
+# Formato de captura: cabecera de fichero + registros [cabecera de registro][datagrama tal cual]
+CAPTURE_MAGIC = b"FZCAPT01"
+# arrival_ns (tiempo de llegada en ns), longitud, IPv4 de origen, puerto de origen
+RECORD_HEADER = struct.Struct("<QH4sH")
+
+
+class RawCaptureWriter:
+    """
+    Graba cada datagrama recibido, sin decodificar, en un fichero binario.
+
+    En el camino caliente solo se empaqueta una cabecera de 16 bytes y se
+    añade a un buffer en memoria; un hilo escritor lo vuelca a disco cuando
+    acumula FLUSH_BYTES bytes o pasan FLUSH_INTERVAL_S segundos, así que el
+    event-loop no escribe nunca en el fichero y un cierre inesperado pierde
+    como mucho ese intervalo de captura.
+    """
+    FLUSH_BYTES = 256 * 1024
+    FLUSH_INTERVAL_S = 1.0
+    MAX_PENDING_BYTES = 64 << 20  # si el disco no da abasto, a partir de aquí se descartan paquetes
+
+    def __init__(self, filename: str, flush_bytes: int = FLUSH_BYTES, flush_interval_s: float = FLUSH_INTERVAL_S):
+        self.filename = filename
+        self.packets_written = 0
+        self.packets_dropped = 0
+        self.flushes = 0
+        self.error = None  # excepción que terminó el hilo escritor, si la hubo
+        self._flush_bytes = flush_bytes
+        self._flush_interval_s = flush_interval_s
+        self._addr_cache = {}
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._file = open(filename, "wb")
+        self._file.write(CAPTURE_MAGIC)
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def write(self, packet: bytes, addr, arrival_ns: int):
+        packed_addr = self._addr_cache.get(addr)
+        if packed_addr is None:
+            packed_addr = (socket.inet_aton(addr[0]), addr[1])
+            self._addr_cache[addr] = packed_addr
+        with self._lock:
+            if self.error is not None or len(self._pending) >= RawCaptureWriter.MAX_PENDING_BYTES:
+                self.packets_dropped += 1
+                return
+            self._pending += RECORD_HEADER.pack(arrival_ns, len(packet), packed_addr[0], packed_addr[1])
+            self._pending += packet
+            full = len(self._pending) >= self._flush_bytes
+        self.packets_written += 1
+        if full:
+            self._wake.set()
+
+    def close(self):
+        """Vuelca lo pendiente y cierra el fichero. Relanza el error del hilo escritor, si lo hubo."""
+        if self._thread is None:
+            return
+        self._closing = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def _take_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = bytearray()
+        return pending
+
+    def _run(self):
+        try:
+            while True:
+                self._wake.wait(self._flush_interval_s)
+                self._wake.clear()
+                # Se lee antes de tomar el buffer: lo escrito antes de close() entra en este volcado
+                closing = self._closing
+                pending = self._take_pending()
+                if pending:
+                    self._file.write(pending)
+                    self._file.flush()
+                    self.flushes += 1
+                if closing:
+                    break
+        except Exception as e:
+            # Los paquetes siguientes se descartan (ver write)
+            self.error = e
+            print(f"Error en la captura de {self.filename}: {e}")
+        finally:
+            self._file.close()
+
+
+def read_capture(filename: str):
+    """
+    Recorre un fichero de captura y devuelve (arrival_ns, (ip, puerto), datagrama)
+    por cada registro. Los datagramas son memoryviews sobre el contenido leído.
+    """
+    with open(filename, "rb") as f:
+        content = f.read()
+    if content[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+        raise ValueError(f"{filename} no es un fichero de captura de telemetría.")
+
+    view = memoryview(content)
+    offset = len(CAPTURE_MAGIC)
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= len(content):
+        arrival_ns, length, ip, port = RECORD_HEADER.unpack_from(content, offset)
+        offset += header_size
+        if offset + length > len(content):
+            # Registro truncado (p. ej. la aplicación se cerró a mitad de escritura)
+            break
+        yield arrival_ns, (socket.inet_ntoa(ip), port), view[offset:offset + length]
+        offset += length
@@ -0,0 +1,347 @@
+# session_catalog.py
+"""
+Catálogo de sesiones: una base SQLite (Data/sessionCatalog.db, junto a
+referenceData.db) con una fila por sesión de Telemetry/: coche, circuito,
+clase/PI, número de vueltas, mejor vuelta, duración y rutas de sus ficheros.
+Sirve para buscar sesiones sin abrir ningún CSV.
+
+El resumen de una sesión sale de su .state.json (min/max de la sesión y de
+cada vuelta) y, si no lo tiene, de unas pocas columnas del CSV. UdpReceiver
+añade cada sesión al cerrarla; rebuild() resume en paralelo las que falten o
+hayan cambiado.
+
+Uso (desde src/):
+    python session_catalog.py rebuild [--telemetry-dir Telemetry] [--workers N]
+    python session_catalog.py search [--car Supra] [--track Maple] [--car-class 5]
+"""
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from telemetry_statistics import NUMERIC_COLUMNS, STATE_EXTENSION
+from session_store import SESSION_STORE_EXTENSION, MAPPED_SESSION_EXTENSION
+from raw_capture import RAW_CAPTURE_EXTENSION
+
+CATALOG_FILENAME = "sessionCatalog.db"
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data", CATALOG_FILENAME)
+DEFAULT_TELEMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Telemetry")
+
+# Columnas del CSV necesarias para resumir una sesión sin .state.json
+SUMMARY_COLUMNS = ["CarOrdinal", "CarClass", "CarPerformanceIndex", "TrackOrdinal",
+                   "LapNumber", "BestLap", "TimestampMS"]
+SUMMARY_CHUNK_ROWS = 200000
+
+_FILENAME_TIMESTAMP = re.compile(r"(\d{8}_\d{6})")
+
+
+def _start_time(csv_path: str) -> str:
+    # Fecha de inicio del nombre que pone UdpReceiver.generate_csv_filename, o la del fichero
+    match = _FILENAME_TIMESTAMP.search(os.path.basename(csv_path))
+    if match:
+        try:
+            return datetime.datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat(sep=" ")
+        except ValueError:
+            pass
+    return datetime.datetime.fromtimestamp(os.path.getmtime(csv_path)).isoformat(sep=" ", timespec="seconds")
+
+
+def _summary_from_state(state: dict) -> dict:
+    # Los ordinales se toman como máximos: en menús y pausas el juego envía 0
+    column = {name: i for i, name in enumerate(state["fields"])}
+    session_min, session_max = state["min"], state["max"]
+    best_lap = None
+    for lap_state in state["laps"].values():
+        if not lap_state["count"]:
+            continue
+        # BestLap apenas cambia dentro de una vuelta: sus valores son el min o el max de alguna vuelta
+        for value in (lap_state["min"][column["BestLap"]], lap_state["max"][column["BestLap"]]):
+            if value > 0 and (best_lap is None or value < best_lap):
+                best_lap = value
+    rows = state["count"]
+    timestamp = column["TimestampMS"]
+    return {
+        "CarOrdinal": int(session_max[column["CarOrdinal"]]) if rows else None,
+        "CarClass": int(session_max[column["CarClass"]]) if rows else None,
+        "CarPerformanceIndex": int(session_max[column["CarPerformanceIndex"]]) if rows else None,
+        "TrackOrdinal": int(session_max[column["TrackOrdinal"]]) if rows else None,
+        "LapCount": len(state["laps"]),
+        "BestLap": best_lap,
+        "DurationSec": (session_max[timestamp] - session_min[timestamp]) / 1000.0 if rows else 0.0,
+        "Rows": rows,
+    }
+
+
+def _summary_from_csv(csv_path: str) -> dict:
+    rows = 0
+    maxima = {}
+    laps = set()
+    best_lap = None
+    first_time = last_time = None
+    # Sin tipos fijos: una última línea a medias solo deja NaN, que min/max ignoran
+    for chunk in pd.read_csv(csv_path, usecols=SUMMARY_COLUMNS, chunksize=SUMMARY_CHUNK_ROWS):
+        chunk = chunk.apply(pd.to_numeric, errors="coerce").dropna()
+        if chunk.empty:
+            continue
+        rows += len(chunk)
+        for name in ("CarOrdinal", "CarClass", "CarPerformanceIndex", "TrackOrdinal"):
+            maxima[name] = max(maxima.get(name, chunk[name].max()), chunk[name].max())
+        laps.update(chunk["LapNumber"].astype(int).unique().tolist())
+        valid_bestlaps = chunk["BestLap"][chunk["BestLap"] > 0]
+        if not valid_bestlaps.empty:
+            best_time = float(valid_bestlaps.min())
+            best_lap = best_time if best_lap is None else min(best_lap, best_time)
+        chunk_first, chunk_last = chunk["TimestampMS"].min(), chunk["TimestampMS"].max()
+        first_time = chunk_first if first_time is None else min(first_time, chunk_first)
+        last_time = chunk_last if last_time is None else max(last_time, chunk_last)
+    return {
+        "CarOrdinal": int(maxima["CarOrdinal"]) if rows else None,
+        "CarClass": int(maxima["CarClass"]) if rows else None,
+        "CarPerformanceIndex": int(maxima["CarPerformanceIndex"]) if rows else None,
+        "TrackOrdinal": int(maxima["TrackOrdinal"]) if rows else None,
+        "LapCount": len(laps),
+        "BestLap": best_lap,
+        "DurationSec": float(last_time - first_time) / 1000.0 if rows else 0.0,
+        "Rows": rows,
+    }
+
+
+def summarize_session(csv_path: str) -> dict:
+    """Fila del catálogo para un CSV de sesión (sin los nombres de coche y circuito)."""
+    csv_path = os.path.abspath(csv_path)
+    base = os.path.splitext(csv_path)[0]
+    summary = None
+    state_path = base + STATE_EXTENSION
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        # Los estados anteriores a las estadísticas por vuelta no sirven para contar vueltas
+        if state.get("fields") == list(NUMERIC_COLUMNS) and "laps" in state:
+            summary = _summary_from_state(state)
+    if summary is None:
+        summary = _summary_from_csv(csv_path)
+
+    def existing(*paths):
+        return next((path for path in paths if os.path.exists(path)), None)
+
+    stat = os.stat(csv_path)
+    summary.update({
+        "CsvPath": csv_path,
+        "JsonPath": existing(base + ".json"),
+        "ColumnarPath": existing(base + MAPPED_SESSION_EXTENSION, base + SESSION_STORE_EXTENSION),
+        "RawPath": existing(base + RAW_CAPTURE_EXTENSION),
+        "StartTime": _start_time(csv_path),
+        "CsvSize": stat.st_size,
+        "CsvMtime": stat.st_mtime,
+    })
+    return summary
+
+
+class SessionCatalog:
+    """
+    Acceso al catálogo. Cada operación abre y cierra su propia conexión, así
+    que se puede usar desde el hilo de cierre de sesiones y desde la GUI.
+    car_names/track_names (ordinal -> nombre) completan los nombres al guardar.
+    """
+    COLUMNS = ["CsvPath", "JsonPath", "ColumnarPath", "RawPath", "StartTime",
+               "CarOrdinal", "CarName", "CarClass", "CarPerformanceIndex", "TrackOrdinal", "TrackName",
+               "LapCount", "BestLap", "DurationSec", "Rows", "CsvSize", "CsvMtime"]
+
+    def __init__(self, db_path: str = DEFAULT_CATALOG_PATH, car_names: dict = None, track_names: dict = None):
+        self.db_path = db_path
+        self.car_names = car_names or {}
+        self.track_names = track_names or {}
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        try:
+            self.create_sessions_table(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def create_sessions_table(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS Sessions(
+                CsvPath TEXT PRIMARY KEY,
+                JsonPath TEXT,
+                ColumnarPath TEXT,
+                RawPath TEXT,
+                StartTime TEXT,
+                CarOrdinal INTEGER,
+                CarName TEXT,
+                CarClass INTEGER,
+                CarPerformanceIndex INTEGER,
+                TrackOrdinal INTEGER,
+                TrackName TEXT,
+                LapCount INTEGER,
+                BestLap REAL,
+                DurationSec REAL,
+                Rows INTEGER,
+                CsvSize INTEGER,
+                CsvMtime REAL
+            );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS SessionsByTrackCar ON Sessions(TrackOrdinal, CarOrdinal)")
+        conn.execute("CREATE INDEX IF NOT EXISTS SessionsByCar ON Sessions(CarOrdinal)")
+        conn.execute("CREATE INDEX IF NOT EXISTS SessionsByStart ON Sessions(StartTime)")
+
+    def _insert(self, conn, summaries):
+        rows = []
+        for summary in summaries:
+            summary = dict(summary)
+            summary["CarName"] = self.car_names.get(summary["CarOrdinal"])
+            summary["TrackName"] = self.track_names.get(summary["TrackOrdinal"])
+            rows.append(tuple(summary[name] for name in self.COLUMNS))
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        conn.executemany(f"INSERT OR REPLACE INTO Sessions ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                         rows)
+
+    def record_session(self, csv_path: str) -> dict:
+        """Añade (o actualiza) una sesión ya cerrada. Devuelve su resumen."""
+        summary = summarize_session(csv_path)
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            self._insert(conn, [summary])
+            conn.commit()
+        finally:
+            conn.close()
+        return summary
+
+    def rebuild(self, telemetry_dir: str = DEFAULT_TELEMETRY_DIR, workers: int = None) -> int:
+        """
+        Pone el catálogo al día con los CSV de telemetry_dir: resume en un pool
+        de procesos los nuevos o modificados (tamaño o fecha distintos) y quita
+        los que ya no existen. Devuelve el número de sesiones resumidas.
+        """
+        csv_paths = {os.path.abspath(path) for path in glob.glob(os.path.join(telemetry_dir, "*.csv"))}
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            known = {row[0]: (row[1], row[2])
+                     for row in conn.execute("SELECT CsvPath, CsvSize, CsvMtime FROM Sessions")}
+        finally:
+            conn.close()
+        removed = [(path,) for path in known if path not in csv_paths and not os.path.exists(path)]
+        pending = []
+        for path in sorted(csv_paths):
+            stat = os.stat(path)
+            if known.get(path) != (stat.st_size, stat.st_mtime):
+                pending.append(path)
+
+        # Los CSV se resumen sin ninguna transacción abierta: record_session puede
+        # escribir mientras tanto desde el hilo de cierre de sesiones
+        summaries = []
+        if pending:
+            # "spawn": quien llama puede ser un hilo de un proceso con Qt y asyncio,
+            # donde hacer fork (lo predeterminado en Linux) no es seguro
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                for path, summary in zip(pending, pool.map(_try_summarize_session, pending)):
+                    if summary is None:
+                        print(f"No se pudo resumir la sesión {path}")
+                    else:
+                        summaries.append(summary)
+
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Una sesión que record_session haya guardado entretanto tiene prioridad
+            current = {row[0]: (row[1], row[2])
+                       for row in conn.execute("SELECT CsvPath, CsvSize, CsvMtime FROM Sessions")}
+            summaries = [summary for summary in summaries
+                         if current.get(summary["CsvPath"]) == known.get(summary["CsvPath"])]
+            conn.executemany("DELETE FROM Sessions WHERE CsvPath = ?", removed)
+            self._insert(conn, summaries)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(summaries)
+
+    def find_sessions(self, car=None, track=None, car_class: int = None, limit: int = None) -> list:
+        """
+        Sesiones (dicts con las columnas del catálogo), de la más reciente a la
+        más antigua. car/track: ordinal (int) o parte del nombre (str).
+        """
+        conditions = []
+        params = []
+        for value, ordinal_column, name_column in ((car, "CarOrdinal", "CarName"),
+                                                   (track, "TrackOrdinal", "TrackName")):
+            if isinstance(value, int):
+                conditions.append(f"{ordinal_column} = ?")
+                params.append(value)
+            elif value:
+                conditions.append(f"{name_column} LIKE ?")
+                params.append(f"%{value}%")
+        if car_class is not None:
+            conditions.append("CarClass = ?")
+            params.append(car_class)
+        query = "SELECT * FROM Sessions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY StartTime DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+
+def _try_summarize_session(csv_path: str):
+    # En el pool: un CSV ilegible no debe detener la reconstrucción del resto
+    try:
+        return summarize_session(csv_path)
+    except Exception:
+        return None
+
+
+def main():
+    from reference_data_repository import ReferenceDataRepository
+
+    parser = argparse.ArgumentParser(description="Catálogo de sesiones de telemetría.")
+    parser.add_argument("--db", default=DEFAULT_CATALOG_PATH, help="Base SQLite del catálogo")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Resume las sesiones nuevas o modificadas")
+    rebuild_parser.add_argument("--telemetry-dir", default=DEFAULT_TELEMETRY_DIR)
+    rebuild_parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por CPU)")
+    search_parser = subparsers.add_parser("search", help="Busca sesiones")
+    search_parser.add_argument("--car", help="Ordinal o parte del nombre del coche")
+    search_parser.add_argument("--track", help="Ordinal o parte del nombre del circuito")
+    search_parser.add_argument("--car-class", type=int)
+    search_parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    reference_db = os.path.join(os.path.dirname(os.path.abspath(args.db)), "referenceData.db")
+    car_names, track_names = {}, {}
+    if os.path.exists(reference_db):
+        car_names = ReferenceDataRepository.load_car_names(reference_db)
+        track_names = ReferenceDataRepository.load_track_names(reference_db)
+    catalog = SessionCatalog(args.db, car_names, track_names)
+
+    if args.command == "rebuild":
+        updated = catalog.rebuild(args.telemetry_dir, args.workers)
+        print(f"{updated} sesiones resumidas en {args.db}")
+        return
+
+    def ordinal_or_name(value):
+        return int(value) if value is not None and value.isdigit() else value
+
+    for session in catalog.find_sessions(ordinal_or_name(args.car), ordinal_or_name(args.track),
+                                         args.car_class, args.limit):
+        best_lap = f"{session['BestLap']:.3f}" if session["BestLap"] else "-"
+        print(f"{session['StartTime']}  {session['CarName'] or session['CarOrdinal']}  "
+              f"{session['TrackName'] or session['TrackOrdinal']}  clase {session['CarClass']} "
+              f"PI {session['CarPerformanceIndex']}  {session['LapCount']} vueltas  mejor {best_lap}  "
+              f"{session['DurationSec']:.0f} s  {session['CsvPath']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# session_checkpoint.py
+"""
+Checkpoints periódicos del estado de las estadísticas de una sesión en curso,
+para no perderlas si la aplicación se cierra de golpe.
+
+El checkpoint (<csv>.checkpoint.json) guarda el estado compacto de los
+acumuladores (momentos, min/max y sketches), no las muestras, y solo de la
+sesión completa y la vuelta actual: el de cada vuelta terminada se añade una
+sola vez al registro de vueltas (<csv>.checkpoint-laps.jsonl). Así cada
+checkpoint cuesta lo mismo al principio que al final de una sesión larga.
+
+El checkpoint se escribe en un fichero temporal y se renombra, de modo que en
+disco siempre hay uno completo, y guarda cuántos bytes del registro de vueltas
+incluye: lo añadido después (un cierre a mitad de escritura) se ignora. Al
+recuperar, las filas que llegaron al CSV después del último checkpoint se
+vuelven a sumar leyéndolas del propio CSV.
+"""
+import glob
+import json
+import os
+import pandas as pd
+from telemetry_statistics import SessionStatistics, NUMERIC_COLUMNS
+
+CHECKPOINT_EXTENSION = ".checkpoint.json"
+CHECKPOINT_LAPS_EXTENSION = ".checkpoint-laps.jsonl"
+
+
+def checkpoint_filename(csv_filename: str) -> str:
+    return csv_filename.replace(".csv", CHECKPOINT_EXTENSION)
+
+
+def checkpoint_laps_filename(csv_filename: str) -> str:
+    return csv_filename.replace(".csv", CHECKPOINT_LAPS_EXTENSION)
+
+
+def write_checkpoint(state: dict, csv_filename: str, csv_rows: int, laps_bytes: int = 0):
+    """
+    Escribe de forma atómica el estado `state` de la sesión. csv_rows es el
+    número de filas del CSV que ya están incluidas en ese estado y laps_bytes
+    los bytes del registro de vueltas que lo completan.
+    """
+    filename = checkpoint_filename(csv_filename)
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump({"csv_rows": csv_rows, "laps_bytes": laps_bytes, "statistics": state}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+class CheckpointWriter:
+    """
+    Escribe los checkpoints de una sesión a partir de
+    SessionStatistics.checkpoint_state: añade al registro las vueltas
+    terminadas y después reescribe el checkpoint. Si una escritura falla, sus
+    vueltas se vuelven a intentar con el siguiente checkpoint.
+    """
+
+    def __init__(self, csv_filename: str, laps_bytes: int = 0):
+        self.csv_filename = csv_filename
+        self._laps_filename = checkpoint_laps_filename(csv_filename)
+        self._laps_bytes = laps_bytes  # bytes del registro incluidos en el último checkpoint
+        self._unwritten_laps = {}
+
+    def write(self, state: dict, finished_laps: dict, csv_rows: int):
+        laps = dict(self._unwritten_laps)
+        laps.update(finished_laps)
+        laps_bytes = self._laps_bytes
+        try:
+            if laps:
+                lines = "".join(json.dumps({"lap": lap, "statistics": lap_state, "sectors": sectors_state}) + "\n"
+                                for lap, (lap_state, sectors_state) in laps.items())
+                with open(self._laps_filename, "r+b" if os.path.exists(self._laps_filename) else "wb") as f:
+                    # Lo que quedase tras el último checkpoint no pertenece a ninguno
+                    f.seek(laps_bytes)
+                    f.truncate()
+                    f.write(lines.encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    laps_bytes = f.tell()
+            write_checkpoint(state, self.csv_filename, csv_rows, laps_bytes)
+        except OSError as e:
+            self._unwritten_laps = laps
+            print(f"No se pudo guardar el checkpoint de {self.csv_filename}: {e}")
+            return
+        self._laps_bytes = laps_bytes
+        self._unwritten_laps = {}
+
+
+def remove_checkpoint(csv_filename: str):
+    for filename in (checkpoint_filename(csv_filename), checkpoint_laps_filename(csv_filename)):
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+
+def _read_checkpoint_laps(csv_filename: str, laps_bytes: int) -> dict:
+    # Registro de vueltas hasta donde lo incluye el checkpoint; si una vuelta aparece
+    # varias veces (se volvió a entrar en ella), vale el último registro
+    if not laps_bytes:
+        return {}
+    with open(checkpoint_laps_filename(csv_filename), "rb") as f:
+        content = f.read(laps_bytes)
+    laps = {}
+    for line in content.splitlines():
+        record = json.loads(line)
+        laps[str(record["lap"])] = record
+    return laps
+
+
+def recover_session(csv_filename: str):
+    """
+    Estadísticas de la sesión a partir de su último checkpoint, más las filas
+    del CSV escritas después (sin sectores). Devuelve (estadísticas, filas
+    que tiene el CSV contando una última línea a medias, bytes del registro
+    de vueltas incluidos en el checkpoint), lo necesario para seguir
+    guardando checkpoints si se reanuda, o None si no hay checkpoint.
+    """
+    filename = checkpoint_filename(csv_filename)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    state = checkpoint["statistics"]
+    laps_bytes = checkpoint.get("laps_bytes", 0)
+    # La vuelta actual del checkpoint es más reciente que su registro, si lo tiene
+    current_laps = set(state["laps"])
+    for lap, record in _read_checkpoint_laps(csv_filename, laps_bytes).items():
+        if lap not in current_laps:
+            state["laps"][lap] = record["statistics"]
+            if record["sectors"]:
+                state["lap_sectors"][lap] = record["sectors"]
+    statistics = SessionStatistics.from_state(state)
+
+    csv_rows = checkpoint["csv_rows"]
+    if os.path.exists(csv_filename):
+        tail = pd.read_csv(csv_filename, skiprows=range(1, csv_rows + 1), usecols=list(NUMERIC_COLUMNS))
+        csv_rows += len(tail)
+        # La última línea puede haber quedado a medias
+        tail = tail.apply(pd.to_numeric, errors="coerce").dropna()
+        if len(tail):
+            statistics.update_columns(tail)
+            print(f"Recuperadas {len(tail)} filas del CSV posteriores al checkpoint.")
+    return statistics, csv_rows, laps_bytes
+
+
+def recover_statistics(csv_filename: str) -> SessionStatistics:
+    """Como recover_session, pero solo las estadísticas (o None si no hay checkpoint)."""
+    recovered = recover_session(csv_filename)
+    return recovered[0] if recovered is not None else None
+
+
+def find_interrupted_sessions(telemetry_dir: str) -> list:
+    """CSV de sesiones que tienen checkpoint pero no llegaron a cerrarse."""
+    pattern = os.path.join(glob.escape(telemetry_dir), "*" + CHECKPOINT_EXTENSION)
+    return sorted(path[:-len(CHECKPOINT_EXTENSION)] + ".csv" for path in glob.glob(pattern))
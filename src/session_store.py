@@ -0,0 +1,499 @@
+# session_store.py
+"""
+Formatos columnares de una sesión, como alternativa al CSV. En ambos cada
+columna se guarda con su tipo (CSV_DTYPES) y los nombres de coche y circuito
+como códigos enteros con su diccionario en los metadatos.
+
+- .npz (NumPy, comprimido): un miembro "lap_<n>/<columna>" por vuelta y
+  columna. np.load solo lee un miembro cuando se pide, así que el visor carga
+  únicamente las vueltas y columnas que dibuja. Ocupa poco.
+- .fzses (sin comprimir, para np.memmap): cada columna es un único array
+  contiguo en el orden de llegada de las filas, y al final del fichero va un
+  índice (JSON) con los tramos de filas de cada vuelta y el TimestampMS de
+  cada TIME_INDEX_STRIDE filas. Abrirlo solo lee ese índice; de cada columna
+  solo se tocan las páginas de las filas que se piden. Pensado para
+  grabaciones de horas; se escribe por bloques, sin cargar el CSV en memoria.
+
+      cabecera (MAPPED_MAGIC) | columna 0 | columna 1 | ... | índice JSON |
+      longitud del índice (8 bytes, little-endian) | FOOTER_MAGIC
+
+Uso (desde src/), para convertir sesiones existentes:
+    python session_store.py Telemetry/*.csv [--format npz|fzses] [--no-compress]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from forza_telemetry_data import CSV_DTYPES, CATEGORY_COLUMNS
+
+SESSION_STORE_EXTENSION = ".npz"
+STORE_VERSION = 1
+
+MAPPED_SESSION_EXTENSION = ".fzses"
+MAPPED_MAGIC = b"FZSES001"
+FOOTER_MAGIC = b"FZSESIDX"
+MAPPED_ALIGNMENT = 64  # cada columna empieza alineada a 64 bytes
+TIME_INDEX_STRIDE = 4096  # filas entre entradas del índice de tiempo
+CONVERT_CHUNK_ROWS = 100000
+
+
+def read_csv_chunks(csv_path: str, chunk_rows: int, cancel_event: threading.Event = None):
+    """
+    Lee el CSV de una sesión por bloques de chunk_rows filas con los tipos de
+    CSV_DTYPES. Genera (bloque, progreso 0-100) y se detiene entre bloques si
+    se activa cancel_event.
+    """
+    size = os.path.getsize(csv_path) or 1
+    rows = 0
+    with open(csv_path, "rb") as f:
+        reader = pd.read_csv(f, dtype=CSV_DTYPES, chunksize=chunk_rows)
+        try:
+            for chunk in reader:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                rows += len(chunk)
+                yield chunk, min(99, int(f.tell() * 100 / size))
+            return
+        except ValueError:
+            pass
+        finally:
+            reader.close()
+
+    # Una última línea a medias (sesión interrumpida) deja huecos en columnas enteras:
+    # desde el bloque que falló se sigue leyendo por bloques sin tipos, se descartan
+    # las filas incompletas y se convierte cada bloque después
+    with open(csv_path, "rb") as f:
+        columns = f.readline().decode("utf-8").strip().split(",")
+        numeric = [name for name in columns if name not in CATEGORY_COLUMNS]
+        dtypes = {name: dtype for name, dtype in CSV_DTYPES.items() if name in columns}
+        reader = pd.read_csv(f, header=None, names=columns, skiprows=rows, chunksize=chunk_rows)
+        try:
+            for rest in reader:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                rest = rest.dropna(subset=numeric)
+                if len(rest):
+                    yield rest.astype(dtypes), min(99, int(f.tell() * 100 / size))
+        finally:
+            reader.close()
+
+
+def _member(lap, column: str) -> str:
+    return f"lap_{lap}/{column}"
+
+
+def write_session_store(df: pd.DataFrame, path: str, compress: bool = True):
+    """Guarda un DataFrame de sesión (columnas del CSV) en formato columnar por vueltas."""
+    lap_numbers = df["LapNumber"].to_numpy()
+    order = np.argsort(lap_numbers, kind="stable")
+    sorted_laps = lap_numbers[order]
+    laps, starts, counts = np.unique(sorted_laps, return_index=True, return_counts=True)
+
+    arrays = {}
+    categories = {}
+    for column in df.columns:
+        values = df[column]
+        if column in CATEGORY_COLUMNS:
+            # Codificación por diccionario: un entero por fila y los nombres una sola vez
+            codes, uniques = pd.factorize(values.astype(str))
+            categories[column] = [str(u) for u in uniques]
+            values = codes.astype(np.uint8 if len(uniques) < 256 else np.uint16)
+        else:
+            dtype = CSV_DTYPES.get(column)
+            values = values.to_numpy(dtype=dtype) if dtype is not None else values.to_numpy()
+        values = values[order]
+        for lap, start, count in zip(laps.tolist(), starts, counts):
+            arrays[_member(lap, column)] = values[start:start + count]
+
+    last_lap_times = None
+    if "LastLap" in df.columns:
+        last_rows = order[starts + counts - 1]
+        last_lap_times = df["LastLap"].to_numpy()[last_rows].astype(float).tolist()
+    best_lap_time = None
+    if "BestLap" in df.columns:
+        valid_bestlaps = df["BestLap"][df["BestLap"] > 0]
+        if not valid_bestlaps.empty:
+            best_lap_time = float(valid_bestlaps.min())
+
+    meta = {
+        "version": STORE_VERSION,
+        "columns": list(df.columns),
+        "laps": laps.tolist(),
+        "rows": counts.tolist(),
+        "last_lap_times": last_lap_times,
+        "best_lap_time": best_lap_time,
+        "categories": categories,
+    }
+    arrays["meta"] = np.array(json.dumps(meta))
+    save = np.savez_compressed if compress else np.savez
+    with open(path, "wb") as f:
+        save(f, **arrays)
+
+
+def convert_csv(csv_path: str, store_path: str = None, compress: bool = True) -> str:
+    """Convierte el CSV de una sesión al almacén columnar. Devuelve la ruta del .npz."""
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + SESSION_STORE_EXTENSION
+    # Por bloques, como el visor: tolera la última línea a medias de una sesión interrumpida
+    chunks = [chunk for chunk, _ in read_csv_chunks(csv_path, CONVERT_CHUNK_ROWS)]
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.read_csv(csv_path, dtype=CSV_DTYPES)
+    write_session_store(df, store_path, compress)
+    return store_path
+
+
+class _LapColumnsReader:
+    """
+    Lo común a los lectores columnares. Ofrecen lo mismo que LapIndex para el
+    visor (laps, sample_counts, last_lap_times, best_lap_time, lap_frame), pero
+    lap_frame solo lee de disco las columnas pedidas de esa vuelta, y se
+    guardan las de las últimas LAP_CACHE_SIZE vueltas leídas.
+    Las subclases rellenan los atributos y definen _load_column.
+    """
+    LAP_CACHE_SIZE = 8
+    columns = []
+    laps = None
+    sample_counts = None
+    last_lap_times = None
+    best_lap_time = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self._categories = {}  # columna -> nombres, por código
+        self._lap_set = set()
+        self._cache = OrderedDict()  # vuelta -> {columna: array}, de la menos a la más reciente
+
+    def __len__(self):
+        return len(self.laps)
+
+    def __contains__(self, lap_number):
+        return lap_number in self._lap_set
+
+    def _load_column(self, lap_number, column: str):
+        raise NotImplementedError
+
+    def _load_columns(self, lap_number, columns: list) -> dict:
+        # Las subclases que leen varias columnas de una vez (SQL) lo sustituyen
+        return {column: self._load_column(lap_number, column) for column in columns}
+
+    def read_columns(self, lap_number, columns: list) -> dict:
+        lap_columns = self._cache.get(lap_number)
+        if lap_columns is None:
+            lap_columns = self._cache[lap_number] = {}
+            if len(self._cache) > self.LAP_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(lap_number)
+        missing = [column for column in columns if column not in lap_columns]
+        if missing:
+            for column, values in self._load_columns(lap_number, missing).items():
+                if column in self._categories:
+                    values = pd.Categorical.from_codes(values, self._categories[column])
+                lap_columns[column] = values
+        return {column: lap_columns[column] for column in columns}
+
+    def read_column(self, lap_number, column: str):
+        return self.read_columns(lap_number, [column])[column]
+
+    def lap_frame(self, lap_number, columns=None):
+        """
+        DataFrame de la vuelta con RelativeTime y solo las columnas pedidas
+        (todas si columns es None), o None si la vuelta no existe.
+        """
+        if lap_number not in self._lap_set:
+            return None
+        if columns is None:
+            columns = self.columns
+        wanted = [name for name in columns if name in self.columns]
+        has_time = "TimestampMS" in self.columns
+        if has_time and "TimestampMS" not in wanted:
+            wanted.append("TimestampMS")
+        lap_df = pd.DataFrame(self.read_columns(lap_number, wanted))
+
+        # Creamos la columna de tiempo relativo, como LapIndex.lap_frame
+        if has_time:
+            lap_df["TimeSec"] = lap_df["TimestampMS"] / 1000.0
+            lap_df["RelativeTime"] = lap_df["TimeSec"] - lap_df["TimeSec"].iloc[0]
+        else:
+            lap_df["RelativeTime"] = range(len(lap_df))
+        return lap_df
+
+
+class SessionStore(_LapColumnsReader):
+    """Lectura de un .npz: cada vuelta y columna es un miembro que se lee al pedirlo."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._npz = np.load(path, allow_pickle=False)
+        meta = json.loads(str(self._npz["meta"]))
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Versión de almacén de sesión no soportada: {meta.get('version')}")
+        self.columns = meta["columns"]
+        self.laps = np.array(meta["laps"])
+        self.sample_counts = np.array(meta["rows"])
+        self.last_lap_times = np.array(meta["last_lap_times"]) if meta["last_lap_times"] is not None else None
+        self.best_lap_time = meta["best_lap_time"]
+        self._categories = meta["categories"]
+        self._lap_set = set(meta["laps"])
+
+    def close(self):
+        self._npz.close()
+
+    def _load_column(self, lap_number, column: str):
+        return self._npz[_member(lap_number, column)]
+
+
+class MappedSessionWriter:
+    """
+    Escribe un .fzses por bloques de filas (append), sin tener la sesión
+    entera en memoria: cada columna va primero a su propio fichero temporal y
+    close() las une, alineadas, y añade el índice. El fichero final aparece
+    de una vez (os.replace); discard() abandona la escritura.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_dir = tempfile.mkdtemp(prefix=".fzses-", dir=os.path.dirname(os.path.abspath(path)))
+        self._columns = None  # columna -> (dtype, fichero temporal)
+        self._categories = {}  # columna -> {nombre: código}
+        self._rows = 0
+        self._lap_runs = []  # [vuelta, fila inicial, fila final) de cada tramo contiguo
+        self._last_lap_times = {}  # vuelta -> LastLap en su última fila
+        self._best_lap_time = None
+        self._time_index = []  # [TimestampMS, fila] cada TIME_INDEX_STRIDE filas
+
+    def _open_columns(self, chunk: pd.DataFrame):
+        self._columns = {}
+        for i, name in enumerate(chunk.columns):
+            if name in CATEGORY_COLUMNS or not pd.api.types.is_numeric_dtype(chunk[name]):
+                dtype = np.dtype("<u2")
+                self._categories[name] = {}
+            else:
+                dtype = np.dtype(CSV_DTYPES.get(name, chunk[name].dtype))
+            self._columns[name] = (dtype, open(os.path.join(self._tmp_dir, f"{i}.bin"), "wb"))
+
+    def append(self, chunk: pd.DataFrame):
+        if chunk.empty:
+            return
+        if self._columns is None:
+            self._open_columns(chunk)
+        for name, (dtype, f) in self._columns.items():
+            if name in self._categories:
+                # Códigos estables para toda la sesión: los nombres nuevos se añaden al diccionario
+                codes = self._categories[name]
+                names = chunk[name].astype(str)
+                for value in names.unique():
+                    codes.setdefault(value, len(codes))
+                values = names.map(codes).to_numpy(dtype)
+            else:
+                values = chunk[name].to_numpy(dtype)
+            values.tofile(f)
+
+        n = len(chunk)
+        laps = chunk["LapNumber"].to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(laps[1:] != laps[:-1]) + 1))
+        ends = np.append(starts[1:], n)
+        last_lap = chunk["LastLap"].to_numpy() if "LastLap" in chunk.columns else None
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            lap = int(laps[start])
+            if self._lap_runs and self._lap_runs[-1][0] == lap and self._lap_runs[-1][2] == self._rows + start:
+                self._lap_runs[-1][2] = self._rows + end  # la vuelta sigue desde el bloque anterior
+            else:
+                self._lap_runs.append([lap, self._rows + start, self._rows + end])
+            if last_lap is not None:
+                self._last_lap_times[lap] = float(last_lap[end - 1])
+
+        if "BestLap" in chunk.columns:
+            valid_bestlaps = chunk["BestLap"][chunk["BestLap"] > 0]
+            if not valid_bestlaps.empty:
+                best_time = float(valid_bestlaps.min())
+                if self._best_lap_time is None or best_time < self._best_lap_time:
+                    self._best_lap_time = best_time
+
+        if "TimestampMS" in chunk.columns:
+            timestamps = chunk["TimestampMS"].to_numpy()
+            for i in range(-self._rows % TIME_INDEX_STRIDE, n, TIME_INDEX_STRIDE):
+                self._time_index.append([int(timestamps[i]), self._rows + i])
+        self._rows += n
+
+    def close(self):
+        columns = []
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                out.write(MAPPED_MAGIC)
+                for name, (dtype, f) in (self._columns or {}).items():
+                    f.close()
+                    out.write(b"\0" * (-out.tell() % MAPPED_ALIGNMENT))
+                    columns.append({"name": name, "dtype": dtype.str, "offset": out.tell()})
+                    with open(f.name, "rb") as column_file:
+                        shutil.copyfileobj(column_file, out, 1024 * 1024)
+                meta = {
+                    "version": STORE_VERSION,
+                    "rows": self._rows,
+                    "columns": columns,
+                    "lap_runs": self._lap_runs,
+                    "last_lap_times": {str(lap): t for lap, t in self._last_lap_times.items()},
+                    "best_lap_time": self._best_lap_time,
+                    "categories": {name: list(codes) for name, codes in self._categories.items()},
+                    "time_index_stride": TIME_INDEX_STRIDE,
+                    "time_index": self._time_index,
+                }
+                footer = json.dumps(meta).encode("utf-8")
+                out.write(footer)
+                out.write(len(footer).to_bytes(8, "little"))
+                out.write(FOOTER_MAGIC)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def discard(self):
+        for _, f in (self._columns or {}).values():
+            f.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def convert_csv_mapped(csv_path: str, store_path: str = None, chunk_rows: int = CONVERT_CHUNK_ROWS) -> str:
+    """Convierte el CSV de una sesión a .fzses leyéndolo por bloques. Devuelve la ruta del .fzses."""
+    if store_path is None:
+        store_path = os.path.splitext(csv_path)[0] + MAPPED_SESSION_EXTENSION
+    writer = MappedSessionWriter(store_path)
+    try:
+        for chunk, _ in read_csv_chunks(csv_path, chunk_rows):
+            writer.append(chunk)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+    return store_path
+
+
+class MappedSession(_LapColumnsReader):
+    """
+    Lectura de un .fzses con np.memmap. Al abrirlo solo se lee el índice del
+    final; las columnas son vistas del fichero mapeado y de cada una solo se
+    copian (y por tanto se leen de disco) las filas de la vuelta pedida.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with open(path, "rb") as f:
+            magic = f.read(len(MAPPED_MAGIC))
+            f.seek(-16, os.SEEK_END)
+            tail = f.read(16)
+            if magic != MAPPED_MAGIC or tail[8:] != FOOTER_MAGIC:
+                raise ValueError(f"{os.path.basename(path)} no es una sesión .fzses completa")
+            footer_length = int.from_bytes(tail[:8], "little")
+            f.seek(-16 - footer_length, os.SEEK_END)
+            meta = json.loads(f.read(footer_length).decode("utf-8"))
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Versión de almacén de sesión no soportada: {meta.get('version')}")
+
+        self.rows = meta["rows"]
+        self._raw = np.memmap(path, dtype=np.uint8, mode="r")
+        self._arrays = {}
+        for column in meta["columns"]:
+            dtype = np.dtype(column["dtype"])
+            start = column["offset"]
+            self._arrays[column["name"]] = self._raw[start:start + self.rows * dtype.itemsize].view(dtype)
+        self.columns = [column["name"] for column in meta["columns"]]
+        self._categories = meta["categories"]
+
+        self._lap_runs = {}  # vuelta -> [(fila inicial, fila final), ...]
+        for lap, start, end in meta["lap_runs"]:
+            self._lap_runs.setdefault(lap, []).append((start, end))
+        self.laps = np.array(sorted(self._lap_runs))
+        self.sample_counts = np.array([sum(end - start for start, end in self._lap_runs[lap])
+                                       for lap in self.laps.tolist()])
+        last_lap_times = meta["last_lap_times"]
+        self.last_lap_times = (np.array([last_lap_times[str(lap)] for lap in self.laps.tolist()])
+                               if last_lap_times else None)
+        self.best_lap_time = meta["best_lap_time"]
+        self._lap_set = set(self._lap_runs)
+
+        time_index = np.array(meta["time_index"], dtype=np.int64).reshape(-1, 2)
+        self._index_times = time_index[:, 0]
+        self._index_rows = time_index[:, 1]
+
+    def close(self):
+        # Los arrays ya devueltos son copias: basta con soltar el mapeo
+        self._arrays = {}
+        self._raw = None
+
+    def _load_column(self, lap_number, column: str):
+        values = self._arrays[column]
+        return np.concatenate([values[start:end] for start, end in self._lap_runs[lap_number]])
+
+    def row_at_time(self, timestamp_ms: int) -> int:
+        """
+        Primera fila con TimestampMS >= timestamp_ms (TimestampMS crece dentro
+        de la sesión). El índice acota el bloque de TIME_INDEX_STRIDE filas y
+        solo ese tramo de la columna se busca en el fichero.
+        """
+        i = int(np.searchsorted(self._index_times, timestamp_ms, side="right")) - 1
+        if i < 0:
+            return 0
+        start = int(self._index_rows[i])
+        end = int(self._index_rows[i + 1]) if i + 1 < len(self._index_rows) else self.rows
+        block = self._arrays["TimestampMS"][start:end]
+        return start + int(np.searchsorted(block, timestamp_ms, side="left"))
+
+    def time_frame(self, start_ms: int, end_ms: int, columns=None):
+        """Filas con start_ms <= TimestampMS < end_ms (solo las columnas pedidas)."""
+        rows = slice(self.row_at_time(start_ms), self.row_at_time(end_ms))
+        if columns is None:
+            columns = self.columns
+        data = {}
+        for name in columns:
+            if name in self._arrays:
+                values = np.array(self._arrays[name][rows])
+                if name in self._categories:
+                    values = pd.Categorical.from_codes(values, self._categories[name])
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+# Conversores por formato (extensión sin el punto)
+STORE_FORMATS = {
+    "npz": convert_csv,
+    "fzses": convert_csv_mapped,
+}
+
+
+def open_session_store(path: str):
+    """Lector del formato columnar de path según su extensión."""
+    if path.endswith(MAPPED_SESSION_EXTENSION):
+        return MappedSession(path)
+    return SessionStore(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte CSV de sesión a un formato columnar.")
+    parser.add_argument("csv", nargs="+", help="CSV de sesión (se admiten comodines)")
+    parser.add_argument("--format", choices=sorted(STORE_FORMATS), default="npz",
+                        help="npz: comprimido; fzses: sin comprimir, para abrir con memmap")
+    parser.add_argument("--no-compress", action="store_true", help="Guardar el .npz sin comprimir")
+    args = parser.parse_args()
+
+    for pattern in args.csv:
+        for csv_path in sorted(glob.glob(pattern)) or [pattern]:
+            if args.format == "npz":
+                store_path = convert_csv(csv_path, compress=not args.no_compress)
+            else:
+                store_path = STORE_FORMATS[args.format](csv_path)
+            csv_size = os.path.getsize(csv_path)
+            store_size = os.path.getsize(store_path)
+            print(f"{csv_path} -> {store_path} ({csv_size / 1e6:.1f} MB -> {store_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# statistics_aggregate.py
+"""
+Agrega las estadísticas de muchas sesiones (p. ej. un coche en un circuito)
+fusionando el estado de cada una en lugar de releer todos los CSV en serie.
+
+Para cada CSV se usa su fichero .state.json si existe; si no, el estado se
+calcula desde el CSV. Las sesiones se procesan en un pool de procesos y los
+resultados se reducen con TelemetryStatistics.merge.
+
+Uso (desde src/):
+    python statistics_aggregate.py Telemetry/*.csv --car-ordinal 1234 --track-ordinal 110 --output agg.json
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from telemetry_statistics import TelemetryStatistics, NUMERIC_COLUMNS, STATE_EXTENSION
+
+
+def session_state(csv_path: str) -> dict:
+    """Estado serializable de las estadísticas de una sesión."""
+    state_path = csv_path[:-len(".csv")] + STATE_EXTENSION
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    df = pd.read_csv(csv_path, usecols=list(NUMERIC_COLUMNS))
+    stats = TelemetryStatistics()
+    stats.update_columns(df)
+    return stats.to_state()
+
+
+def _matches(stats: TelemetryStatistics, field_name: str, ordinal) -> bool:
+    # Una sesión pertenece a un coche/circuito si todas sus muestras tienen ese ordinal
+    if ordinal is None:
+        return True
+    i = NUMERIC_COLUMNS.index(field_name)
+    return stats.count > 0 and stats.min[i] == ordinal and stats.max[i] == ordinal
+
+
+def aggregate(csv_paths, car_ordinal: int = None, track_ordinal: int = None, workers: int = None):
+    """Devuelve (TelemetryStatistics fusionado, número de sesiones incluidas)."""
+    total = TelemetryStatistics()
+    included = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for state in pool.map(session_state, csv_paths):
+            stats = TelemetryStatistics.from_state(state)
+            if _matches(stats, "CarOrdinal", car_ordinal) and _matches(stats, "TrackOrdinal", track_ordinal):
+                total.merge(stats)
+                included += 1
+    return total, included
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusiona las estadísticas de varias sesiones.")
+    parser.add_argument("csv", nargs="+", help="CSV de sesión generados por UdpReceiver")
+    parser.add_argument("--car-ordinal", type=int)
+    parser.add_argument("--track-ordinal", type=int)
+    parser.add_argument("--workers", type=int, help="Procesos (por defecto, uno por CPU)")
+    parser.add_argument("--output", help="JSON de salida (por defecto, stdout)")
+    args = parser.parse_args()
+
+    total, included = aggregate(args.csv, args.car_ordinal, args.track_ordinal, args.workers)
+    text = json.dumps(total.get_statistics(), indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{included} sesiones agregadas en {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# csv_loader.py
+import threading
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+from forza_telemetry_data import CATEGORY_COLUMNS
+from session_store import read_csv_chunks
+
+
+class CsvLoader(QThread):
+    """
+    Carga un CSV de sesión en un hilo aparte para no bloquear la interfaz.
+    Emite cada bloque según se lee (para ir mostrando las vueltas), el
+    progreso y, al terminar, el DataFrame completo. cancel() detiene la
+    lectura entre bloques.
+    """
+    CHUNK_ROWS = 20000
+
+    chunk_loaded = pyqtSignal(object)
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, csv_path: str, chunk_rows: int = CHUNK_ROWS, parent=None):
+        super().__init__(parent)
+        self.csv_path = csv_path
+        self._chunk_rows = chunk_rows
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        chunks = []
+        try:
+            for chunk, percent in read_csv_chunks(self.csv_path, self._chunk_rows, self._cancel_event):
+                chunks.append(chunk)
+                self.chunk_loaded.emit(chunk)
+                self.progress.emit(percent)
+            if self._cancel_event.is_set():
+                self.cancelled.emit()
+                return
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.read_csv(self.csv_path)
+            # Si el coche o el circuito cambian entre bloques, concat deja texto: se vuelve a categorizar
+            for name in CATEGORY_COLUMNS:
+                if name in df.columns and df[name].dtype != "category":
+                    df[name] = df[name].astype("category")
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.progress.emit(100)
+        self.loaded.emit(df)
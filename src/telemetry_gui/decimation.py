@@ -0,0 +1,87 @@
+# decimation.py
+"""
+Reducción de series para dibujarlas: como mucho unos pocos puntos por píxel
+del eje, sin perder los picos.
+
+- minmax_decimate: para cada grupo de muestras consecutivas se quedan su
+  mínimo y su máximo (envolvente), así ningún pico desaparece.
+- lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013), elige en cada
+  grupo el punto que forma el triángulo de mayor área con el punto elegido
+  antes y la media del grupo siguiente; conserva la forma de la curva.
+
+Ambas devuelven puntos de la serie original, en su orden (las variantes
+*_indices devuelven sus posiciones).
+"""
+import numpy as np
+
+
+def minmax_indices(y, n_buckets: int):
+    """
+    Posiciones del mínimo y el máximo de cada uno de n_buckets grupos, más la
+    primera y la última: como mucho 2 * n_buckets + 2 puntos.
+    """
+    n = len(y)
+    if n_buckets < 1 or n <= 2 * n_buckets:
+        return np.arange(n)
+    # Grupos de ceil(n / n_buckets) muestras; el último se completa repitiendo el
+    # último valor, así que una posición de relleno equivale a la última muestra
+    bucket = -(-n // n_buckets)
+    groups = -(-n // bucket)
+    padded = np.empty(groups * bucket, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    blocks = padded.reshape(groups, bucket)
+    offsets = np.arange(groups) * bucket
+    indices = [blocks.argmin(axis=1) + offsets, blocks.argmax(axis=1) + offsets, [0, n - 1]]
+    return np.unique(np.minimum(np.concatenate(indices), n - 1))
+
+
+def lttb_indices(x, y, n_out: int):
+    """Posiciones de los n_out puntos elegidos por LTTB."""
+    n = len(y)
+    if n_out < 3 or n <= n_out:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 grupos entre el primer y el último punto, que se conservan siempre
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    widths = np.diff(edges)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / widths
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / widths
+    # Para cada grupo, la media del siguiente (o el último punto para el último grupo)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_decimate(x, y, n_buckets: int):
+    selected = minmax_indices(y, n_buckets)
+    return x[selected], y[selected]
+
+
+def lttb(x, y, n_out: int):
+    selected = lttb_indices(x, y, n_out)
+    return x[selected], y[selected]
+
+
+# Posiciones a dibujar para una serie y un ancho de eje en píxeles: como mucho
+# dos por píxel. minmax devuelve dos puntos por grupo más la primera y la última
+# muestra, así que se le pide un grupo menos que píxeles.
+DECIMATORS = {
+    "minmax": lambda x, y, pixels: minmax_indices(y, pixels - 1),
+    "lttb": lambda x, y, pixels: lttb_indices(x, y, 2 * pixels),
+}
@@ -1,52 +1,40 @@
 # gui_attitude.py
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
 import mplcursors  # Importamos mplcursors
+from .gui_plot_base import LapPlot, time_values, column_values
 
-def format_time_m_ss(x, pos):
-    minutes = int(x // 60)
-    seconds = int(x % 60)
-    if minutes == 0:
-        return f"{seconds}"
-    else:
-        return f"{minutes}.{seconds:02d}"
+ATTITUDE = [
+    ("Yaw", "Yaw (rad)", "blue"),
+    ("Pitch", "Pitch (rad)", "green"),
+    ("Roll", "Roll (rad)", "red"),
+]
 
-def plot_attitude(lap_df, lap_number):
-    fig, axes = plt.subplots(nrows=3, ncols=1, sharex=True, figsize=(8,6))
-    fig.suptitle(f"Attitude (Yaw, Pitch, Roll) - Lap {lap_number}")
 
-    # Gráfico de Yaw
-    if "Yaw" in lap_df.columns:
-        line_yaw, = axes[0].plot(lap_df["RelativeTime"], lap_df["Yaw"], color="blue", label="Yaw (rad)")
-        axes[0].set_ylabel("Yaw (rad)")
-        axes[0].legend(loc="upper left")
-        axes[0].grid(True)
-        # Agregamos cursor interactivo para Yaw
-        mplcursors.cursor(line_yaw, hover=True)
-    else:
-        axes[0].text(0.5, 0.5, "No hay datos de Yaw", ha="center", va="center")
+class AttitudePlot(LapPlot):
+    figsize = (8, 6)
+    tight_layout = [0, 0, 1, 0.95]
+    COLUMNS = [col for col, _, _ in ATTITUDE]
+
+    def setup(self):
+        self.axes = self.figure.subplots(nrows=3, ncols=1, sharex=True)
+        for ax, (col, label, color) in zip(self.axes, ATTITUDE):
+            line = self.add_series(ax, col, f"No hay datos de {col}", color=color, label=label)
+            ax.set_ylabel(label)
+            ax.legend(loc="upper left")
+            ax.grid(True)
+            # Cursor interactivo: se crea una vez y sigue a los datos de la línea
+            mplcursors.cursor(line, hover=True)
+        self.axes[-1].set_xlabel("Tiempo (s)")
+        self.format_time_axis(self.axes[-1])
 
-    # Gráfico de Pitch
-    if "Pitch" in lap_df.columns:
-        line_pitch, = axes[1].plot(lap_df["RelativeTime"], lap_df["Pitch"], color="green", label="Pitch (rad)")
-        axes[1].set_ylabel("Pitch (rad)")
-        axes[1].legend(loc="upper left")
-        axes[1].grid(True)
-        mplcursors.cursor(line_pitch, hover=True)
-    else:
-        axes[1].text(0.5, 0.5, "No hay datos de Pitch", ha="center", va="center")
+    def update(self, lap_df, lap_number):
+        time = time_values(lap_df)
+        for col, _, _ in ATTITUDE:
+            self.set_series(col, time, column_values(lap_df, col))
+        self.figure.suptitle(f"Attitude (Yaw, Pitch, Roll) - Lap {lap_number}")
+        self.rescale()
 
-    # Gráfico de Roll
-    if "Roll" in lap_df.columns:
-        line_roll, = axes[2].plot(lap_df["RelativeTime"], lap_df["Roll"], color="red", label="Roll (rad)")
-        axes[2].set_ylabel("Roll (rad)")
-        axes[2].set_xlabel("Tiempo (s)")
-        axes[2].legend(loc="upper left")
-        axes[2].grid(True)
-        mplcursors.cursor(line_roll, hover=True)
-    else:
-        axes[2].text(0.5, 0.5, "No hay datos de Roll", ha="center", va="center")
 
-    axes[-1].xaxis.set_major_formatter(ticker.FuncFormatter(format_time_m_ss))
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    return fig
+def plot_attitude(lap_df, lap_number):
+    plot = AttitudePlot()
+    plot.update(lap_df, lap_number)
+    return plot.figure
@@ -7,29 +7,47 @@ import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use("Qt5Agg")
-import matplotlib.pyplot as plt
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QComboBox, QFileDialog, QTextEdit, QTabWidget
+    QPushButton, QComboBox, QFileDialog, QTextEdit, QTabWidget, QProgressBar, QInputDialog
 )
 from PyQt5.QtCore import Qt
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-
-# Importamos nuestras funciones de graficado
-from .gui_basic_plots import plot_speed_vs_time, plot_rpm_vs_time
-from .gui_motec_plot import plot_motec_style_figure
-from .gui_tire_temps import plot_tire_temperatures
-from .gui_suspension import plot_suspension_behavior
-from .gui_track import plot_track
-from .gui_attitude import plot_attitude
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+
+# Importamos nuestros gráficos (figuras reutilizables entre vueltas)
+from .gui_basic_plots import SpeedPlot, RpmPlot
+from .gui_motec_plot import MotecPlot
+from .gui_tire_temps import TireTemperaturesPlot
+from .gui_suspension import SuspensionPlot
+from .gui_track import TrackPlot
+from .gui_attitude import AttitudePlot
+from .lap_index import LapIndex
+from .csv_loader import CsvLoader
+from .session_browser import SessionBrowser
+from session_store import open_session_store, SESSION_STORE_EXTENSION, MAPPED_SESSION_EXTENSION
+from session_catalog import SessionCatalog
+from telemetry_sqlite import SqliteSession, list_sessions, SQLITE_EXTENSION
 
 
 class TelemetryViewer(QWidget):
-    def __init__(self):
+    # Pestañas de gráficos, en orden: (título, clase LapPlot)
+    PLOTS = (
+        ("Speed", SpeedPlot),
+        ("RPM", RpmPlot),
+        ("MoTec Style", MotecPlot),
+        ("Tire Temps", TireTemperaturesPlot),
+        ("Suspension", SuspensionPlot),
+        ("Track", TrackPlot),
+        ("Attitude", AttitudePlot),
+    )
+
+    def __init__(self, catalog: SessionCatalog = None):
         super().__init__()
         self.setWindowTitle("Forza Telemetry Viewer")
+        self.catalog = catalog  # si es None, se abre el catálogo por defecto al buscar sesiones
 
         main_layout = QVBoxLayout()
 
@@ -44,11 +62,25 @@ class TelemetryViewer(QWidget):
         btn_json = QPushButton("Abrir JSON")
         btn_json.clicked.connect(self.load_json)
 
+        btn_sessions = QPushButton("Sesiones...")
+        btn_sessions.clicked.connect(self.browse_sessions)
+
+        file_layout.addWidget(btn_sessions)
         file_layout.addWidget(btn_csv)
         file_layout.addWidget(self.csv_label)
         file_layout.addWidget(btn_json)
         file_layout.addWidget(self.json_label)
 
+        # Progreso de la carga del CSV (en segundo plano) y botón para cancelarla
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.hide()
+        self.btn_cancel_load = QPushButton("Cancelar")
+        self.btn_cancel_load.clicked.connect(self.cancel_loading)
+        self.btn_cancel_load.hide()
+        file_layout.addWidget(self.load_progress)
+        file_layout.addWidget(self.btn_cancel_load)
+
         main_layout.addLayout(file_layout)
 
         # Etiqueta para mostrar el mejor tiempo global
@@ -72,6 +104,7 @@ class TelemetryViewer(QWidget):
 
         # Pestañas para los gráficos
         self.tab_widget = QTabWidget()
+        self.tab_widget.currentChanged.connect(self.render_tab)
         main_layout.addWidget(self.tab_widget)
 
         # Texto para estadísticas
@@ -80,8 +113,32 @@ class TelemetryViewer(QWidget):
         main_layout.addWidget(self.stats_text)
 
         self.df = None
+        self.lap_index = None
         self.stats_json = None
 
+        # Carga en curso: bloques recibidos y, por vuelta, en qué bloques aparece
+        self._loader = None
+        self._chunks = []
+        self._chunk_laps = {}
+        self._lap_last_times = {}
+        self._listed_laps = set()  # vueltas ya añadidas al combo
+        self._best_lap_time = None
+
+        # Una página, figura y lienzo por gráfico, creados una sola vez: al cambiar
+        # de vuelta solo se actualizan sus datos, y cada pestaña al activarse
+        self._pages = []
+        for _ in self.PLOTS:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self._pages.append(page)
+        self._plots = [None] * len(self.PLOTS)
+        self._canvases = [None] * len(self.PLOTS)
+        self._plot_laps = [None] * len(self.PLOTS)  # vuelta que muestra cada figura
+        self._tabs_lap = None
+        self._tabs_lap_df = None
+        self._last_tab = 0  # al cambiar de vuelta se vuelve a la pestaña que se estaba viendo
+
         self.setLayout(main_layout)
 
     def format_time(self, seconds: float) -> str:
@@ -94,62 +151,284 @@ class TelemetryViewer(QWidget):
         return f"{minutes}:{secs:02d}.{millis:03d}"
 
     def load_csv(self):
-        csv_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar CSV", "", "CSV Files (*.csv)")
+        csv_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar sesión", "",
+                                                  "Sesiones (*.csv *.npz *.fzses *.db);;CSV Files (*.csv);;"
+                                                  "NPZ Files (*.npz);;FZSES Files (*.fzses);;SQLite (*.db)")
         if csv_path:
-            self.csv_label.setText(os.path.basename(csv_path))
-            try:
-                self.df = pd.read_csv(csv_path)
-                self.populate_laps()
-            except Exception as e:
-                self.df = None
-                self.lap_combo.clear()
-                self.csv_label.setText(f"Error al leer CSV: {e}")
+            self.open_session(csv_path)
+
+    def open_session(self, csv_path):
+        """Abre un CSV (en segundo plano) o su copia columnar (.npz / .fzses)."""
+        self.cancel_loading()
+        self.csv_label.setText(os.path.basename(csv_path))
+        self.reset_plots()
+        self.df = None
+        self.close_lap_index()
+        self._chunks = []
+        self._chunk_laps = {}
+        self._lap_last_times = {}
+        self._listed_laps = set()
+        self._best_lap_time = None
+        self.lap_combo.clear()
+        self.best_lap_label.setText("Best Lap: --:--.---")
+
+        if csv_path.endswith((SESSION_STORE_EXTENSION, MAPPED_SESSION_EXTENSION)):
+            self.load_session_store(csv_path)
+            return
+        if csv_path.endswith(SQLITE_EXTENSION):
+            self.load_sqlite_session(csv_path)
+            return
+
+        # La lectura va en otro hilo; las vueltas aparecen según llegan los bloques
+        self._loader = CsvLoader(csv_path, parent=self)
+        self._loader.finished.connect(self._loader.deleteLater)
+        self._loader.chunk_loaded.connect(self.on_chunk_loaded)
+        self._loader.progress.connect(self.load_progress.setValue)
+        self._loader.loaded.connect(self.on_csv_loaded)
+        self._loader.failed.connect(self.on_csv_failed)
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.btn_cancel_load.show()
+        self._loader.start()
+
+    def close_lap_index(self):
+        # Los lectores columnares tienen abierto su fichero (zip del .npz, memmap, conexión SQLite)
+        if self.lap_index is not None and hasattr(self.lap_index, "close"):
+            self.lap_index.close()
+        self.lap_index = None
+
+    def load_session_store(self, store_path):
+        # Almacén columnar: solo se leen los metadatos (o el índice del .fzses mapeado);
+        # cada gráfico lee después las columnas que usa de la vuelta elegida
+        self.close_lap_index()
+        try:
+            self.lap_index = open_session_store(store_path)
+        except Exception as e:
+            self.csv_label.setText(f"Error al leer sesión: {e}")
+            return
+        self.list_laps()
+
+    def load_sqlite_session(self, db_path):
+        # Base SQLite: si guarda varias sesiones se elige una; las vueltas salen de la tabla Laps
+        try:
+            sessions = list_sessions(db_path)
+        except Exception as e:
+            self.csv_label.setText(f"Error al leer sesión: {e}")
+            return
+        if not sessions:
+            self.csv_label.setText("La base no tiene sesiones")
+            return
+        session = sessions[0]
+        if len(sessions) > 1:
+            items = [f"{s['StartTime']} - {os.path.basename(s['CsvPath'])} ({s['Laps']} vueltas)" for s in sessions]
+            item, ok = QInputDialog.getItem(self, "Seleccionar sesión", "Sesión:", items, 0, False)
+            if not ok:
+                return
+            session = sessions[items.index(item)]
+        self.csv_label.setText(f"{os.path.basename(db_path)}: {os.path.basename(session['CsvPath'])}")
+        self.close_lap_index()
+        try:
+            self.lap_index = SqliteSession(db_path, session["SessionId"])
+        except Exception as e:
+            self.csv_label.setText(f"Error al leer sesión: {e}")
+            return
+        self.list_laps()
+
+    def cancel_loading(self):
+        # Sin esperar al hilo (bloquearía la interfaz): se le pide que pare entre bloques,
+        # sus señales se ignoran porque ya no es self._loader y se destruye al terminar
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+            self.df = None
+            self.lap_index = None
+            self._chunks = []
+            self._chunk_laps = {}
+            self.lap_combo.clear()
+            self.csv_label.setText("CSV: (carga cancelada)")
+        self.load_progress.hide()
+        self.btn_cancel_load.hide()
+
+    def closeEvent(self, event):
+        self.cancel_loading()
+        super().closeEvent(event)
+
+    def _from_current_loader(self):
+        # Las señales de una carga cancelada (o de un hilo ya destruido) se descartan
+        return self._loader is not None and self.sender() is self._loader
+
+    def on_chunk_loaded(self, chunk):
+        if not self._from_current_loader() or "LapNumber" not in chunk.columns:
+            return  # bloque de una carga anterior ya cancelada
+        self._chunks.append(chunk)
+        chunk_index = LapIndex(chunk)
+        for i, lap in enumerate(chunk_index.laps.tolist()):
+            self._chunk_laps.setdefault(lap, []).append(len(self._chunks) - 1)
+            if chunk_index.last_lap_times is not None:
+                self._lap_last_times[lap] = chunk_index.last_lap_times[i]
+
+        if "BestLap" in chunk.columns:
+            valid_bestlaps = chunk["BestLap"][chunk["BestLap"] > 0]
+            if not valid_bestlaps.empty:
+                best_time = valid_bestlaps.min()
+                if self._best_lap_time is None or best_time < self._best_lap_time:
+                    self._best_lap_time = best_time
+                    self.best_lap_label.setText(f"Best Lap: {self.format_time(best_time)}")
+
+        # Una vuelta está completa cuando ya han llegado filas de una vuelta posterior
+        newest_lap = max(self._chunk_laps)
+        for lap in sorted(self._chunk_laps):
+            if lap < newest_lap and lap not in self._listed_laps:
+                self.add_lap_item(lap, self._lap_last_times.get(lap))
+
+    def on_csv_loaded(self, df):
+        if not self._from_current_loader():
+            return
+        self._loader = None
+        self.load_progress.hide()
+        self.btn_cancel_load.hide()
+        self.df = df
+        self._chunks = []
+        self._chunk_laps = {}
+        self.populate_laps()
+
+    def on_csv_failed(self, message):
+        if not self._from_current_loader():
+            return
+        self._loader = None
+        self.load_progress.hide()
+        self.btn_cancel_load.hide()
+        self.df = None
+        self.lap_index = None
+        self._chunks = []
+        self._chunk_laps = {}
+        self.lap_combo.clear()
+        self.csv_label.setText(f"Error al leer CSV: {message}")
 
     def load_json(self):
         json_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar JSON", "", "JSON Files (*.json)")
         if json_path:
-            self.json_label.setText(os.path.basename(json_path))
-            try:
-                with open(json_path, "r", encoding="utf-8") as f:
-                    self.stats_json = json.load(f)
-            except Exception as e:
-                self.stats_json = None
-                self.json_label.setText(f"Error al leer JSON: {e}")
+            self.open_json(json_path)
+
+    def open_json(self, json_path):
+        self.json_label.setText(os.path.basename(json_path))
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                self.stats_json = json.load(f)
+        except Exception as e:
+            self.stats_json = None
+            self.json_label.setText(f"Error al leer JSON: {e}")
+
+    def browse_sessions(self):
+        # Búsqueda en el catálogo; se abre la copia columnar si existe (más rápida) y el JSON
+        if self.catalog is None:
+            self.catalog = SessionCatalog()
+        browser = SessionBrowser(self.catalog, self)
+        if not browser.exec_():
+            return
+        session = browser.selected_session
+        session_path = session["ColumnarPath"] or session["CsvPath"]
+        if not os.path.exists(session_path):
+            self.csv_label.setText(f"No existe: {session_path}")
+            return
+        self.open_session(session_path)
+        if session["JsonPath"] and os.path.exists(session["JsonPath"]):
+            self.open_json(session["JsonPath"])
+
+    def add_lap_item(self, lap, last_lap_time=None):
+        # Vuelta al combo, concatenando el tiempo de LastLap si existe
+        if last_lap_time is not None:
+            self.lap_combo.addItem(f"{lap} - {self.format_time(last_lap_time)}")
+        else:
+            self.lap_combo.addItem(str(lap))
+        self._listed_laps.add(lap)
 
     def populate_laps(self):
-        self.lap_combo.clear()
+        # Con el CSV completo: índice de vueltas y las vueltas que aún no estén en el combo
         if self.df is not None and "LapNumber" in self.df.columns:
-            # Si existe 'BestLap', obtenemos el mejor tiempo válido (>0)
-            if "BestLap" in self.df.columns:
-                valid_bestlaps = self.df[self.df["BestLap"] > 0]["BestLap"]
-                if not valid_bestlaps.empty:
-                    best_time = valid_bestlaps.min()
-                    self.best_lap_label.setText(f"Best Lap: {self.format_time(best_time)}")
-                else:
-                    self.best_lap_label.setText("Best Lap: N/A")
-            else:
-                self.best_lap_label.setText("Best Lap: N/A")
-
-            # Agregamos las vueltas únicas al combo, concatenando el tiempo de LastLap
-            laps = sorted(self.df["LapNumber"].unique())
-            for lap in laps:
-                lap_df = self.df[self.df["LapNumber"] == lap]
-                if "LastLap" in lap_df.columns:
-                    last_lap_time = lap_df["LastLap"].iloc[-1]
-                    time_str = self.format_time(last_lap_time)
-                    self.lap_combo.addItem(f"{lap} - {time_str}")
-                else:
-                    self.lap_combo.addItem(str(lap))
+            # Índice de vueltas (una sola pasada)
+            self.lap_index = LapIndex(self.df)
+            self.list_laps()
         else:
+            self.lap_index = None
+            self.lap_combo.clear()
             self.lap_combo.addItem("No LapNumber column")
             self.best_lap_label.setText("Best Lap: N/A")
 
+    def list_laps(self):
+        # Mejor tiempo válido (BestLap > 0) y vueltas del índice que aún no estén en el combo
+        best_time = self.lap_index.best_lap_time
+        if best_time is not None:
+            self.best_lap_label.setText(f"Best Lap: {self.format_time(best_time)}")
+        else:
+            self.best_lap_label.setText("Best Lap: N/A")
+        last_lap_times = self.lap_index.last_lap_times
+        for i, lap in enumerate(self.lap_index.laps.tolist()):
+            if lap not in self._listed_laps:
+                self.add_lap_item(lap, last_lap_times[i] if last_lap_times is not None else None)
+
+    def get_lap_frame(self, lap_number, columns=None):
+        """
+        Datos de la vuelta con RelativeTime, también mientras el CSV se sigue
+        cargando. columns limita lo que se lee de un almacén columnar.
+        """
+        if self.lap_index is not None:
+            return self.lap_index.lap_frame(lap_number, columns)
+        chunk_ids = self._chunk_laps.get(lap_number)
+        if not chunk_ids:
+            return None
+        lap_rows = pd.concat([self._chunks[i] for i in chunk_ids], ignore_index=True)
+        return LapIndex(lap_rows).lap_frame(lap_number)
+
     def on_lap_changed(self):
-        self.tab_widget.clear()
+        self.clear_tabs()
         self.stats_text.clear()
 
+    def clear_tabs(self):
+        # Las páginas no se destruyen: se vuelven a añadir en el siguiente "Graficar"
+        self.tab_widget.blockSignals(True)
+        self.tab_widget.clear()
+        self.tab_widget.blockSignals(False)
+        self._tabs_lap = None
+        self._tabs_lap_df = None
+
+    def reset_plots(self):
+        # Con otro CSV los números de vuelta se repiten: ninguna figura ni caché está al día
+        self.clear_tabs()
+        self._plot_laps = [None] * len(self.PLOTS)
+        for plot in self._plots:
+            if plot is not None:
+                plot.clear_cache()
+
+    def render_tab(self, index):
+        if self._tabs_lap is None or index < 0:
+            return
+        self._last_tab = index
+        if self._plot_laps[index] == self._tabs_lap:
+            return  # ya muestra esta vuelta
+
+        plot = self._plots[index]
+        if plot is None:
+            _, plot_class = self.PLOTS[index]
+            plot = self._plots[index] = plot_class()
+            self._canvases[index] = FigureCanvas(plot.figure)
+            # Barra de zoom/desplazamiento: al hacer zoom las series se vuelven a reducir
+            self._pages[index].layout().addWidget(NavigationToolbar(self._canvases[index], self._pages[index]))
+            self._pages[index].layout().addWidget(self._canvases[index])
+        lap_number = self._tabs_lap
+
+        def load_lap_df():
+            # Solo si la vuelta no está en la caché del gráfico
+            if self.lap_index is not None:
+                return self.lap_index.lap_frame(lap_number, plot.COLUMNS)
+            return self._tabs_lap_df
+
+        plot.show_lap(lap_number, load_lap_df)
+        self._canvases[index].draw_idle()
+        self._plot_laps[index] = self._tabs_lap
+
     def plot_telemetry(self):
-        if self.df is None:
+        if self.lap_index is None and not self._chunk_laps:
             return
 
         lap_str = self.lap_combo.currentText()
@@ -164,60 +443,24 @@ class TelemetryViewer(QWidget):
             return
 
         lap_number = int(lap_number_str)
-        lap_df = self.df[self.df["LapNumber"] == lap_number].copy()
-        if lap_df.empty:
+        # Recorte de la vuelta desde el índice (con RelativeTime), cacheado tras el primer uso;
+        # de un almacén columnar solo se lee aquí el tiempo, cada pestaña lee sus columnas
+        lap_df = self.get_lap_frame(lap_number, columns=[])
+        if lap_df is None or lap_df.empty:
             return
 
-        # Creamos la columna de tiempo relativo si no existe
-        if "TimestampMS" in lap_df.columns:
-            lap_df["TimeSec"] = lap_df["TimestampMS"] / 1000.0
-            lap_df["RelativeTime"] = lap_df["TimeSec"] - lap_df["TimeSec"].iloc[0]
-        else:
-            lap_df["RelativeTime"] = range(len(lap_df))
-
-        self.tab_widget.clear()
-
-        # 1) Gráfico básico de Speed
-        fig_speed = plot_speed_vs_time(lap_df, lap_number)
-        speed_canvas = FigureCanvas(fig_speed)
-        self.tab_widget.addTab(speed_canvas, "Speed")
-        speed_canvas.draw()
-
-        # 2) Gráfico básico de RPM
-        fig_rpm = plot_rpm_vs_time(lap_df, lap_number)
-        rpm_canvas = FigureCanvas(fig_rpm)
-        self.tab_widget.addTab(rpm_canvas, "RPM")
-        rpm_canvas.draw()
-
-        # 3) Gráfico estilo MoTec
-        fig_motec = plot_motec_style_figure(lap_df, lap_number)
-        motec_canvas = FigureCanvas(fig_motec)
-        self.tab_widget.addTab(motec_canvas, "MoTec Style")
-        motec_canvas.draw()
-
-        # 4) Gráfico: Temperatura de neumáticos
-        fig_tires = plot_tire_temperatures(lap_df, lap_number)
-        tire_canvas = FigureCanvas(fig_tires)
-        self.tab_widget.addTab(tire_canvas, "Tire Temps")
-        tire_canvas.draw()
-
-        # 5) Gráfico: Comportamiento de la suspensión
-        fig_suspension = plot_suspension_behavior(lap_df, lap_number)
-        susp_canvas = FigureCanvas(fig_suspension)
-        self.tab_widget.addTab(susp_canvas, "Suspension")
-        susp_canvas.draw()
-
-        # 6) Nueva gráfica: Trazada en el Circuito
-        fig_track = plot_track(lap_df, lap_number)
-        track_canvas = FigureCanvas(fig_track)
-        self.tab_widget.addTab(track_canvas, "Track")
-        track_canvas.draw()
-
-        # 7) Gráfico: Actitud (Yaw, Pitch, Roll)
-        fig_attitude = plot_attitude(lap_df, lap_number)
-        attitude_canvas = FigureCanvas(fig_attitude)
-        self.tab_widget.addTab(attitude_canvas, "Attitude")
-        attitude_canvas.draw()
+        # Se añaden las pestañas y solo se actualiza la visible; las demás
+        # se actualizan al activarse (si no muestran ya esta vuelta)
+        current_tab = self._last_tab
+        self.clear_tabs()
+        self._tabs_lap = lap_number
+        self._tabs_lap_df = lap_df
+        self.tab_widget.blockSignals(True)
+        for page, (title, _) in zip(self._pages, self.PLOTS):
+            self.tab_widget.addTab(page, title)
+        self.tab_widget.setCurrentIndex(current_tab)
+        self.tab_widget.blockSignals(False)
+        self.render_tab(current_tab)
 
         # Mostramos estadísticas si hay JSON
         self.display_stats_for_lap(lap_number)
@@ -227,10 +470,17 @@ class TelemetryViewer(QWidget):
             self.stats_text.setText("No hay JSON de estadísticas cargado.")
             return
 
-        msg = "=== Estadísticas Globales (JSON) ===\n"
+        # Los JSON nuevos traen las estadísticas de cada vuelta ya calculadas en "Laps"
+        lap_stats = self.stats_json.get("Laps", {}).get(str(lap_number))
+        if lap_stats is not None:
+            stats = lap_stats
+            msg = f"=== Estadísticas de la vuelta {lap_number} (JSON) ===\n"
+        else:
+            stats = self.stats_json
+            msg = "=== Estadísticas Globales (JSON) ===\n"
         for param in ["Speed", "CurrentEngineRpm", "Accel", "Brake", "Gear"]:
-            if param in self.stats_json:
-                stat = self.stats_json[param]
+            if param in stats:
+                stat = stats[param]
                 msg += f"\n{param}:\n"
                 msg += f"  Count: {stat['count']}\n"
                 msg += f"  Mean:  {stat['mean']:.2f}\n"
@@ -238,8 +488,13 @@ class TelemetryViewer(QWidget):
                 msg += f"  Min:   {stat['min']}\n"
                 msg += f"  Max:   {stat['max']}\n"
 
-        self.stats_text.setText(msg)
+        sectors = stats.get("Sectors") if lap_stats is not None else None
+        if sectors:
+            msg += "\nSectores (Speed media):\n"
+            for sector, sector_stats in sectors.items():
+                msg += f"  S{int(sector) + 1}: {sector_stats['Speed']['mean']:.2f}\n"
 
+        self.stats_text.setText(msg)
 
 def main():
     app = QApplication(sys.argv)
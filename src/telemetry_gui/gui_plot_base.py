@@ -0,0 +1,203 @@
+# gui_plot_base.py
+from collections import OrderedDict
+import numpy as np
+import matplotlib.ticker as ticker
+from matplotlib.figure import Figure
+from .decimation import DECIMATORS
+
+
+def format_time_m_ss(x, pos):
+    """Formatea x (en segundos) a un string 'm.ss' si x >= 60, o solo segundos si x < 60."""
+    minutes = int(x // 60)
+    seconds = int(x % 60)
+    if minutes == 0:
+        return f"{seconds}"
+    else:
+        return f"{minutes}.{seconds:02d}"
+
+
+def time_values(lap_df, time_col="RelativeTime"):
+    """Columna de tiempo de la vuelta, o el índice de muestra si no existe."""
+    if time_col in lap_df.columns:
+        return lap_df[time_col].to_numpy()
+    return np.arange(len(lap_df))
+
+
+def column_values(lap_df, column):
+    return lap_df[column].to_numpy() if column in lap_df.columns else None
+
+
+class LapPlot:
+    """
+    Gráfico de una vuelta cuya figura se crea una sola vez, con
+    matplotlib.figure.Figure (sin pasar por pyplot, que la retendría para
+    siempre). Los ejes, líneas y textos se crean en setup() y en cada vuelta
+    update() solo cambia sus datos con set_data y reajusta los límites.
+
+    Cada línea dibuja una versión reducida de su serie (unos puntos por píxel,
+    ver decimation.py); la serie completa se guarda y, al hacer zoom, se vuelve
+    a reducir solo el tramo visible.
+
+    show_lap() guarda lo que deja update() (series completas y reducidas,
+    títulos y etiquetas) de las últimas LAP_CACHE_SIZE vueltas: volver a una
+    de ellas no lee sus datos ni repite la reducción.
+    """
+    figsize = (6, 4)
+    tight_layout = None  # rect de tight_layout, si la figura lo necesita
+    COLUMNS = None  # columnas que usa update(), para leer solo esas (None: todas)
+    LAP_CACHE_SIZE = 8
+
+    def __init__(self):
+        if self.tight_layout is not None:
+            self.figure = Figure(figsize=self.figsize, tight_layout={"rect": self.tight_layout})
+        else:
+            self.figure = Figure(figsize=self.figsize)
+        self._series = {}  # clave -> (ejes, línea, texto "sin datos", reducción)
+        self._full_data = {}  # clave -> (x, y, x creciente) a resolución completa
+        self._watched_axes = set()
+        self._rescaling = False
+        self._lap_cache = OrderedDict()  # vuelta -> estado de la figura tras update()
+        self.setup()
+
+    def setup(self):
+        raise NotImplementedError
+
+    def update(self, lap_df, lap_number):
+        raise NotImplementedError
+
+    def show_lap(self, lap_number, load_lap_df):
+        """
+        Muestra una vuelta. La primera vez llama a update() con load_lap_df();
+        si la vuelta está en la caché, restaura sus series sin leer datos.
+        """
+        cached = self._lap_cache.get(lap_number)
+        if cached is None:
+            self.update(load_lap_df(), lap_number)
+            self._lap_cache[lap_number] = self._snapshot()
+            if len(self._lap_cache) > self.LAP_CACHE_SIZE:
+                self._lap_cache.popitem(last=False)
+        else:
+            self._lap_cache.move_to_end(lap_number)
+            self._restore(cached)
+
+    def clear_cache(self):
+        # Otra sesión: los números de vuelta se repiten
+        self._lap_cache.clear()
+
+    def _snapshot(self):
+        series = {key: (line.get_xdata(), line.get_ydata(), text is not None and text.get_visible())
+                  for key, (_, line, text, _) in self._series.items()}
+        labels = list(self.figure.texts)
+        for ax in self.figure.axes:
+            labels += [ax.title, ax.yaxis.label]
+        return dict(self._full_data), series, [(label, label.get_text()) for label in labels]
+
+    def _restore(self, snapshot):
+        full_data, series, labels = snapshot
+        self._full_data = dict(full_data)
+        for key, (x, y, missing) in series.items():
+            _, line, text, _ = self._series[key]
+            line.set_data(x, y)
+            if text is not None:
+                text.set_visible(missing)
+        for label, value in labels:
+            label.set_text(value)
+        self.rescale()
+
+    def add_series(self, ax, key, missing_text=None, step=False, decimate="minmax", **line_kwargs):
+        """
+        Crea una línea vacía (y el aviso a mostrar si falta la columna).
+        decimate: "minmax", "lttb" o None para dibujar todos los puntos.
+        """
+        if step:
+            line_kwargs["drawstyle"] = "steps-post"
+        line, = ax.plot([], [], **line_kwargs)
+        text = None
+        if missing_text is not None:
+            text = ax.text(0.5, 0.5, missing_text, ha='center', va='center',
+                           transform=ax.transAxes, visible=False)
+        self._series[key] = (ax, line, text, decimate)
+        if ax not in self._watched_axes:
+            ax.callbacks.connect("xlim_changed", self._on_view_changed)
+            ax.callbacks.connect("ylim_changed", self._on_view_changed)
+            self._watched_axes.add(ax)
+        return line
+
+    def set_series(self, key, x, y):
+        """Cambia los datos de la línea; con y None la vacía y muestra el aviso."""
+        _, line, text, _ = self._series[key]
+        if y is None:
+            self._full_data.pop(key, None)
+            line.set_data([], [])
+        else:
+            x = np.asarray(x)
+            y = np.asarray(y)
+            self._full_data[key] = (x, y, bool(np.all(x[1:] >= x[:-1])))
+            self._draw_series(key)
+        if text is not None:
+            text.set_visible(y is None)
+
+    def _draw_series(self, key, view=None):
+        """Pone en la línea la serie reducida; con view ((x0, x1), (y0, y1)) solo lo visible."""
+        ax, line, _, decimate = self._series[key]
+        x, y, increasing = self._full_data[key]
+        rows = None  # posiciones de la serie completa que entran en la vista
+        if view is not None and len(x):
+            (x0, x1), (y0, y1) = view
+            if increasing:
+                # Un punto más a cada lado para que la línea llegue a los bordes
+                start = max(int(np.searchsorted(x, x0)) - 1, 0)
+                end = min(int(np.searchsorted(x, x1, side="right")) + 1, len(x))
+                rows = np.arange(start, end)
+            else:
+                # Trazadas (x no creciente): los puntos visibles y sus vecinos
+                visible = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+                near = visible.copy()
+                near[1:] |= visible[:-1]
+                near[:-1] |= visible[1:]
+                rows = np.flatnonzero(near)
+            x, y = x[rows], y[rows]
+
+        selected = None
+        if decimate is not None:
+            selected = DECIMATORS[decimate](x, y, max(int(ax.bbox.width), 100))
+            x, y = x[selected], y[selected]
+        if rows is not None and not increasing and len(rows):
+            # La trazada sale y vuelve a entrar en la vista: se corta la línea entre tramos
+            runs = np.cumsum(np.diff(rows, prepend=rows[0]) > 1)
+            if selected is not None:
+                runs = runs[selected]
+            breaks = np.flatnonzero(np.diff(runs)) + 1
+            if len(breaks):
+                x = np.insert(x.astype(np.float64), breaks, np.nan)
+                y = np.insert(y.astype(np.float64), breaks, np.nan)
+        line.set_data(x, y)
+
+    def _on_view_changed(self, ax):
+        # Zoom o desplazamiento: se reduce de nuevo desde los datos completos
+        if self._rescaling:
+            return
+        view = (sorted(ax.get_xlim()), sorted(ax.get_ylim()))
+        for key, (series_ax, _, _, _) in self._series.items():
+            if series_ax is ax and key in self._full_data:
+                self._draw_series(key, view)
+
+    @staticmethod
+    def format_time_axis(ax):
+        ax.xaxis.set_major_formatter(ticker.FuncFormatter(format_time_m_ss))
+
+    def rescale(self):
+        """Reajusta los límites a los datos nuevos; la leyenda solo se ve si hay líneas con datos."""
+        # Las series ya están reducidas sobre la vuelta completa: no hace falta repetirlo al reajustar
+        self._rescaling = True
+        try:
+            for ax in self.figure.axes:
+                has_data = any(len(line.get_xdata()) for line in ax.lines)
+                if has_data:
+                    ax.relim()
+                    ax.autoscale_view()
+                legend = ax.get_legend()
+                if legend is not None:
+                    legend.set_visible(has_data)
+        finally:
+            self._rescaling = False
@@ -1,5 +1,32 @@
 # gui_track.py
-import matplotlib.pyplot as plt
+from .gui_plot_base import LapPlot, column_values
+
+
+class TrackPlot(LapPlot):
+    """
+    Trazada (track trace) de la vuelta usando las columnas PositionX y PositionZ.
+    """
+    figsize = (6, 6)
+    COLUMNS = ["PositionX", "PositionZ"]
+
+    def setup(self):
+        self.ax = self.figure.add_subplot()
+        self.add_series(self.ax, "Track", "No se encuentran las columnas 'PositionX' y 'PositionZ'",
+                        decimate="lttb", label="Trazada", color="blue")
+        self.ax.set_xlabel("Position X (m)")
+        self.ax.set_ylabel("Position Z (m)")
+        self.ax.legend(loc="best")
+        self.ax.grid(True)
+
+    def update(self, lap_df, lap_number):
+        x = column_values(lap_df, "PositionX")
+        z = column_values(lap_df, "PositionZ")
+        if x is None or z is None:
+            self.set_series("Track", None, None)
+        else:
+            self.set_series("Track", x, z)
+        self.ax.set_title(f"Vuelta {lap_number}: Trazada en el Circuito")
+        self.rescale()
 
 
 def plot_track(lap_df, lap_number):
@@ -11,17 +38,6 @@ def plot_track(lap_df, lap_number):
     :param lap_number: Número de vuelta, para incluir en el título.
     :return: Figura de matplotlib.
     """
-    fig, ax = plt.subplots(figsize=(6, 6))
-
-    if "PositionX" not in lap_df.columns or "PositionZ" not in lap_df.columns:
-        ax.text(0.5, 0.5, "No se encuentran las columnas 'PositionX' y 'PositionZ'",
-                ha='center', va='center')
-        return fig
-
-    ax.plot(lap_df["PositionX"], lap_df["PositionZ"], label="Trazada", color="blue")
-    ax.set_xlabel("Position X (m)")
-    ax.set_ylabel("Position Z (m)")
-    ax.set_title(f"Vuelta {lap_number}: Trazada en el Circuito")
-    ax.legend(loc="best")
-    ax.grid(True)
-    return fig
+    plot = TrackPlot()
+    plot.update(lap_df, lap_number)
+    return plot.figure
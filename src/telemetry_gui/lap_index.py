@@ -0,0 +1,85 @@
+# lap_index.py
+from collections import OrderedDict
+import numpy as np
+
+
+class LapIndex:
+    """
+    Índice de vueltas de una sesión, construido una sola vez al cargar el CSV.
+
+    Con una pasada (argsort estable + searchsorted sobre LapNumber) se obtiene
+    el rango de filas de cada vuelta, su número de muestras y su último
+    LastLap. Las vueltas que se piden se recortan una vez, con TimeSec y
+    RelativeTime ya calculados, y se guardan las últimas LAP_CACHE_SIZE para
+    no repetir el trabajo (cada una es una copia de sus filas).
+    """
+    LAP_CACHE_SIZE = 8
+
+    def __init__(self, df):
+        self.df = df
+        lap_numbers = df["LapNumber"].to_numpy()
+        # Lo normal es que las vueltas vengan en orden: cada una es un rango contiguo de filas
+        if np.all(lap_numbers[1:] >= lap_numbers[:-1]):
+            self._order = None
+            sorted_laps = lap_numbers
+        else:
+            self._order = np.argsort(lap_numbers, kind="stable")
+            sorted_laps = lap_numbers[self._order]
+
+        self.laps = np.unique(sorted_laps)
+        self._starts = np.searchsorted(sorted_laps, self.laps, side="left")
+        self._ends = np.searchsorted(sorted_laps, self.laps, side="right")
+        self.sample_counts = self._ends - self._starts
+        self._positions = {lap: i for i, lap in enumerate(self.laps.tolist())}
+
+        if "LastLap" in df.columns:
+            last_rows = self._ends - 1 if self._order is None else self._order[self._ends - 1]
+            self.last_lap_times = df["LastLap"].to_numpy()[last_rows]
+        else:
+            self.last_lap_times = None
+
+        self.best_lap_time = None
+        if "BestLap" in df.columns:
+            valid_bestlaps = df["BestLap"][df["BestLap"] > 0]
+            if not valid_bestlaps.empty:
+                self.best_lap_time = valid_bestlaps.min()
+
+        self._cache = OrderedDict()  # vuelta -> DataFrame, de la menos a la más reciente
+
+    def __len__(self):
+        return len(self.laps)
+
+    def __contains__(self, lap_number):
+        return lap_number in self._positions
+
+    def rows(self, lap_number):
+        """Posiciones (iloc) de las filas de la vuelta: un slice si son contiguas."""
+        i = self._positions[lap_number]
+        if self._order is None:
+            return slice(self._starts[i], self._ends[i])
+        return self._order[self._starts[i]:self._ends[i]]
+
+    def lap_frame(self, lap_number, columns=None):
+        """
+        DataFrame de la vuelta con RelativeTime, o None si no existe. Con el
+        CSV ya en memoria se devuelven todas las columnas; columns solo lo
+        usa SessionStore para no leer de disco lo que no se dibuja.
+        """
+        lap_df = self._cache.get(lap_number)
+        if lap_df is not None:
+            self._cache.move_to_end(lap_number)
+            return lap_df
+        if lap_number not in self._positions:
+            return None
+
+        lap_df = self.df.iloc[self.rows(lap_number)].copy()
+        # Creamos la columna de tiempo relativo
+        if "TimestampMS" in lap_df.columns:
+            lap_df["TimeSec"] = lap_df["TimestampMS"] / 1000.0
+            lap_df["RelativeTime"] = lap_df["TimeSec"] - lap_df["TimeSec"].iloc[0]
+        else:
+            lap_df["RelativeTime"] = range(len(lap_df))
+        self._cache[lap_number] = lap_df
+        if len(self._cache) > self.LAP_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return lap_df
@@ -0,0 +1,81 @@
+# session_browser.py
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QTableWidget, QTableWidgetItem,
+    QDialogButtonBox, QAbstractItemView
+)
+
+
+def _format_lap_time(seconds):
+    if not seconds or seconds <= 0:
+        return "--:--.---"
+    minutes = int(seconds // 60)
+    return f"{minutes}:{seconds - minutes * 60:06.3f}"
+
+
+class SessionBrowser(QDialog):
+    """
+    Búsqueda de sesiones en el catálogo (SessionCatalog) por coche y
+    circuito. Cada cambio en los filtros repite la consulta; al aceptar,
+    selected_session tiene la fila elegida (con sus rutas).
+    """
+    HEADERS = ["Inicio", "Coche", "Circuito", "Clase / PI", "Vueltas", "Mejor vuelta", "Duración"]
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Sesiones")
+        self.resize(900, 500)
+        self.catalog = catalog
+        self.selected_session = None
+        self._sessions = []
+
+        layout = QVBoxLayout()
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Coche:"))
+        self.car_edit = QLineEdit()
+        self.car_edit.textChanged.connect(self.search)
+        filter_layout.addWidget(self.car_edit)
+        filter_layout.addWidget(QLabel("Circuito:"))
+        self.track_edit = QLineEdit()
+        self.track_edit.textChanged.connect(self.search)
+        filter_layout.addWidget(self.track_edit)
+        layout.addLayout(filter_layout)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.accept())
+        layout.addWidget(self.table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Open | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+        self.search()
+
+    def search(self):
+        self._sessions = self.catalog.find_sessions(self.car_edit.text().strip(), self.track_edit.text().strip())
+        self.table.setRowCount(len(self._sessions))
+        for row, session in enumerate(self._sessions):
+            values = [
+                session["StartTime"],
+                session["CarName"] or str(session["CarOrdinal"]),
+                session["TrackName"] or str(session["TrackOrdinal"]),
+                f"{session['CarClass']} / {session['CarPerformanceIndex']}",
+                str(session["LapCount"]),
+                _format_lap_time(session["BestLap"]),
+                f"{int(session['DurationSec'] // 60)} min",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
+
+    def accept(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return
+        self.selected_session = self._sessions[row]
+        super().accept()
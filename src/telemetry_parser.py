@@ -1,143 +1,104 @@
 # telemetry_parser.py
-import io
 import struct
-from forza_telemetry_data import ForzaTelemetryData
+import numpy as np
+from forza_telemetry_data import ForzaTelemetryData, SLED_FIELDS, DASH_FIELDS, PACKET_FIELDS
+
+TIRE_TEMP_FIELDS = ("TireTempFrontLeft", "TireTempFrontRight", "TireTempRearLeft", "TireTempRearRight")
+
+
+class PacketFormat:
+    """
+    Layout precompilado de un formato de datagrama de Forza.
+
+    El layout es una secuencia de (nombre, formato struct); las entradas con
+    nombre None son bytes de relleno que no se decodifican.
+    """
+
+    def __init__(self, name: str, layout):
+        self.name = name
+        self.struct = struct.Struct("<" + "".join(fmt for _, fmt in layout))
+        self.length = self.struct.size
+
+        names, formats, offsets = [], [], []
+        offset = 0
+        for field_name, fmt in layout:
+            if field_name is not None:
+                names.append(field_name)
+                formats.append("<" + fmt)
+                offsets.append(offset)
+            offset += struct.calcsize("<" + fmt)
+        self.field_names = tuple(names)
+        # nombre -> (offset, formato struct), para leer campos sueltos sin decodificar el paquete
+        self.field_offsets = {n: (o, f[1:]) for n, o, f in zip(names, offsets, formats)}
+        # El mismo layout como dtype estructurado de NumPy, para decodificar bloques de paquetes
+        self.dtype = np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": self.length})
+
+
+# Todos los layouts empiezan por los campos Sled y mantienen el orden de
+# ForzaTelemetryData, así que la tupla decodificada siempre es un prefijo de
+# sus atributos y se puede pasar posicionalmente al constructor.
+# FH4/FH5 meten 12 bytes de relleno entre Sled y Dash y 1 al final, y no traen
+# los campos de FM8 (desgaste de neumáticos y TrackOrdinal): esos se quedan con
+# su valor por defecto, 0, igual que todo el bloque Dash en FM7 Sled.
+FM7_SLED_FORMAT = PacketFormat("FM7 Sled", SLED_FIELDS)
+FM7_DASH_FORMAT = PacketFormat("FM7 Dash", SLED_FIELDS + DASH_FIELDS)
+FH_DASH_FORMAT = PacketFormat("FH4/FH5 Dash", SLED_FIELDS + ((None, "12x"),) + DASH_FIELDS + ((None, "x"),))
+FM8_FORMAT = PacketFormat("FM8", PACKET_FIELDS)
+
+# Registro de formatos indexado por longitud del datagrama
+PACKET_FORMATS = {fmt.length: fmt for fmt in (FM7_SLED_FORMAT, FM7_DASH_FORMAT, FH_DASH_FORMAT, FM8_FORMAT)}
+
+FM8_STRUCT = FM8_FORMAT.struct
+FM8_DTYPE = FM8_FORMAT.dtype
 
 class TelemetryDataParser:
-    FM8_PACKET_LENGTH = 331
+    FM8_PACKET_LENGTH = FM8_FORMAT.length
 
     @staticmethod
-    def parse(packet: bytes) -> ForzaTelemetryData:
-        if len(packet) != TelemetryDataParser.FM8_PACKET_LENGTH:
-            raise ValueError(f"Se esperaban {TelemetryDataParser.FM8_PACKET_LENGTH} bytes para FM8, pero se recibieron {len(packet)}.")
-
-        stream = io.BytesIO(packet)
-        def read(fmt: str):
-            size = struct.calcsize(fmt)
-            return struct.unpack(fmt, stream.read(size))[0]
-
-        data = ForzaTelemetryData()
-        # --- Sección "Sled" ---
-        data.IsRaceOn = read("<i")
-        data.TimestampMS = read("<I")
-        data.EngineMaxRpm = read("<f")
-        data.EngineIdleRpm = read("<f")
-        data.CurrentEngineRpm = read("<f")
-
-        data.AccelerationX = read("<f")
-        data.AccelerationY = read("<f")
-        data.AccelerationZ = read("<f")
-
-        data.VelocityX = read("<f")
-        data.VelocityY = read("<f")
-        data.VelocityZ = read("<f")
-
-        data.AngularVelocityX = read("<f")
-        data.AngularVelocityY = read("<f")
-        data.AngularVelocityZ = read("<f")
-
-        data.Yaw = read("<f")
-        data.Pitch = read("<f")
-        data.Roll = read("<f")
-
-        data.NormalizedSuspensionTravelFrontLeft = read("<f")
-        data.NormalizedSuspensionTravelFrontRight = read("<f")
-        data.NormalizedSuspensionTravelRearLeft = read("<f")
-        data.NormalizedSuspensionTravelRearRight = read("<f")
-
-        data.TireSlipRatioFrontLeft = read("<f")
-        data.TireSlipRatioFrontRight = read("<f")
-        data.TireSlipRatioRearLeft = read("<f")
-        data.TireSlipRatioRearRight = read("<f")
-
-        data.WheelRotationSpeedFrontLeft = read("<f")
-        data.WheelRotationSpeedFrontRight = read("<f")
-        data.WheelRotationSpeedRearLeft = read("<f")
-        data.WheelRotationSpeedRearRight = read("<f")
-
-        data.WheelOnRumbleStripFrontLeft = read("<i")
-        data.WheelOnRumbleStripFrontRight = read("<i")
-        data.WheelOnRumbleStripRearLeft = read("<i")
-        data.WheelOnRumbleStripRearRight = read("<i")
-
-        data.WheelInPuddleDepthFrontLeft = read("<f")
-        data.WheelInPuddleDepthFrontRight = read("<f")
-        data.WheelInPuddleDepthRearLeft = read("<f")
-        data.WheelInPuddleDepthRearRight = read("<f")
-
-        data.SurfaceRumbleFrontLeft = read("<f")
-        data.SurfaceRumbleFrontRight = read("<f")
-        data.SurfaceRumbleRearLeft = read("<f")
-        data.SurfaceRumbleRearRight = read("<f")
-
-        data.TireSlipAngleFrontLeft = read("<f")
-        data.TireSlipAngleFrontRight = read("<f")
-        data.TireSlipAngleRearLeft = read("<f")
-        data.TireSlipAngleRearRight = read("<f")
-
-        data.TireCombinedSlipFrontLeft = read("<f")
-        data.TireCombinedSlipFrontRight = read("<f")
-        data.TireCombinedSlipRearLeft = read("<f")
-        data.TireCombinedSlipRearRight = read("<f")
-
-        data.SuspensionTravelMetersFrontLeft = read("<f")
-        data.SuspensionTravelMetersFrontRight = read("<f")
-        data.SuspensionTravelMetersRearLeft = read("<f")
-        data.SuspensionTravelMetersRearRight = read("<f")
-
-        data.CarOrdinal = read("<i")
-        data.CarClass = read("<i")
-        data.CarPerformanceIndex = read("<i")
-        data.DrivetrainType = read("<i")
-        data.NumCylinders = read("<i")
-
-        # --- Sección "Dash" ---
-        data.PositionX = read("<f")
-        data.PositionY = read("<f")
-        data.PositionZ = read("<f")
-
-        data.Speed = read("<f")
-        # Calculamos SpeedKph y lo asignamos
-        data.SpeedKph = data.Speed * 3.6
-
-        data.Power = read("<f")
-        data.Torque = read("<f")
-
-        data.TireTempFrontLeft = read("<f")
-        data.TireTempFrontRight = read("<f")
-        data.TireTempRearLeft = read("<f")
-        data.TireTempRearRight = read("<f")
-
-        # Calculamos las temperaturas en Celsius y asignamos a los nuevos campos
-        data.TireTempFrontLeftCelsius = (data.TireTempFrontLeft - 32) * (5.0 / 9.0)
-        data.TireTempFrontRightCelsius = (data.TireTempFrontRight - 32) * (5.0 / 9.0)
-        data.TireTempRearLeftCelsius = (data.TireTempRearLeft - 32) * (5.0 / 9.0)
-        data.TireTempRearRightCelsius = (data.TireTempRearRight - 32) * (5.0 / 9.0)
-
-        data.Boost = read("<f")
-        data.Fuel = read("<f")
-        data.DistanceTraveled = read("<f")
-        data.BestLap = read("<f")
-        data.LastLap = read("<f")
-        data.CurrentLap = read("<f")
-        data.CurrentRaceTime = read("<f")
-
-        data.LapNumber = read("<H")
-        data.RacePosition = read("<B")
-        data.Accel = read("<B")
-        data.Brake = read("<B")
-        data.Clutch = read("<B")
-        data.HandBrake = read("<B")
-        data.Gear = read("<B")
-        data.Steer = read("<b")
-        data.NormalizedDrivingLine = read("<b")
-        data.NormalizedAIBrakeDifference = read("<b")
-
-        data.TireWearFrontLeft = read("<f")
-        data.TireWearFrontRight = read("<f")
-        data.TireWearRearLeft = read("<f")
-        data.TireWearRearRight = read("<f")
-
-        data.TrackOrdinal = read("<i")
-
-        return data
+    def parse(packet: bytes):
+        """
+        Decodifica un datagrama de cualquier formato registrado en PACKET_FORMATS
+        con una sola llamada a unpack_from.
+
+        Acepta cualquier objeto con protocolo buffer (bytes, bytearray o
+        memoryview), que se lee directamente sin copias intermedias. Si la
+        longitud no corresponde a ningún formato conocido devuelve None; antes
+        solo se aceptaba FM8 y cualquier otra longitud lanzaba ValueError. El
+        llamador decide cómo contabilizar los paquetes descartados.
+
+        Los campos que el formato no trae valen 0: en FH4/FH5 TrackOrdinal es
+        siempre 0, así que no sirve para identificar el circuito.
+        """
+        packet_format = PACKET_FORMATS.get(len(packet))
+        if packet_format is None:
+            return None
+
+        # SpeedKph y las temperaturas en Celsius son propiedades calculadas bajo demanda
+        return ForzaTelemetryData(*packet_format.struct.unpack_from(packet))
+
+    @staticmethod
+    def parse_many(buffer, packet_length: int = FM8_FORMAT.length) -> dict:
+        """
+        Decodifica un bloque contiguo de N paquetes del mismo formato (p. ej. un
+        fichero de captura o un lote recibido) con un único np.frombuffer.
+
+        Devuelve un dict de columnas NumPy con los mismos nombres que
+        ForzaTelemetryData (salvo CarName/TrackName); las columnas del paquete
+        son vistas sobre el buffer y las derivadas se calculan vectorizadas.
+        """
+        packet_format = PACKET_FORMATS.get(packet_length)
+        if packet_format is None:
+            raise ValueError(f"No hay ningún formato registrado para paquetes de {packet_length} bytes.")
+        if len(buffer) % packet_length != 0:
+            raise ValueError(f"El buffer ({len(buffer)} bytes) no es múltiplo de {packet_length} bytes.")
+
+        packets = np.frombuffer(buffer, dtype=packet_format.dtype)
+        columns = {name: packets[name] for name in packet_format.field_names}
+
+        # Los formatos sin bloque Dash (FM7 Sled) no traen velocidad ni temperaturas
+        if "Speed" in columns:
+            for name in TIRE_TEMP_FIELDS:
+                columns[name + "Celsius"] = (columns[name].astype(np.float64) - 32) * (5.0 / 9.0)
+            columns["SpeedKph"] = columns["Speed"].astype(np.float64) * 3.6
+
+        return columns
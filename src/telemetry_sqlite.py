@@ -0,0 +1,236 @@
+# telemetry_sqlite.py
+"""
+Telemetría en SQLite, como destino opcional además del CSV.
+
+Una base puede guardar una sesión (Telemetry/<sesión>.db) o muchas
+(Telemetry/telemetry.db): cada sesión tiene una fila en Sessions, sus
+muestras van a Samples (las columnas del CSV más SessionId) y Laps lleva,
+por vuelta, filas, primer/último TimestampMS, LastLap y BestLap, así que
+abrir una sesión no recorre sus muestras.
+
+Los índices (SessionId, LapNumber, TimestampMS) y (SessionId, TimestampMS)
+permiten leer una vuelta o una ventana de tiempo sin recorrer la grabación:
+
+    SELECT Speed FROM Samples WHERE SessionId = ? AND LapNumber = ? ORDER BY TimestampMS;
+    SELECT * FROM Samples WHERE SessionId = ? AND TimestampMS >= ? AND TimestampMS < ? ORDER BY TimestampMS;
+
+La base va en modo WAL: el visor puede leer mientras el receptor escribe.
+"""
+import datetime
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from forza_telemetry_data import ForzaTelemetryData, PACKET_FIELDS, CSV_COLUMNS, CSV_DTYPES, CATEGORY_COLUMNS
+from csv_telemetry_writer import CsvTelemetryWriter
+from session_store import _LapColumnsReader
+
+SQLITE_EXTENSION = ".db"
+SHARED_DATABASE_FILENAME = "telemetry.db"
+
+_INTEGER_COLUMNS = {name for name, fmt in PACKET_FIELDS if fmt != "f"}
+_LAP = CSV_COLUMNS.index("LapNumber")
+_TIMESTAMP = CSV_COLUMNS.index("TimestampMS")
+_LAST_LAP = CSV_COLUMNS.index("LastLap")
+_BEST_LAP = CSV_COLUMNS.index("BestLap")
+
+
+def _column_type(name: str) -> str:
+    if name in CATEGORY_COLUMNS:
+        return "TEXT"
+    return "INTEGER" if name in _INTEGER_COLUMNS else "REAL"
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Conexión en modo WAL con el esquema creado."""
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # en WAL sigue siendo consistente ante un corte
+    create_schema(conn)
+    return conn
+
+
+def create_schema(conn):
+    columns = ",\n".join(f"    {name} {_column_type(name)}" for name in CSV_COLUMNS)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Sessions(
+            SessionId INTEGER PRIMARY KEY,
+            CsvPath TEXT UNIQUE,
+            StartTime TEXT
+        );
+    """)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS Samples(\n    SessionId INTEGER NOT NULL,\n{columns}\n);")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Laps(
+            SessionId INTEGER NOT NULL,
+            LapNumber INTEGER NOT NULL,
+            Rows INTEGER,
+            FirstTimestampMS INTEGER,
+            LastTimestampMS INTEGER,
+            LastLap REAL,
+            BestLap REAL,
+            PRIMARY KEY (SessionId, LapNumber)
+        );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS SamplesBySessionLap ON Samples(SessionId, LapNumber, TimestampMS)")
+    conn.execute("CREATE INDEX IF NOT EXISTS SamplesBySessionTime ON Samples(SessionId, TimestampMS)")
+    conn.commit()
+
+
+class SqliteTelemetryWriter(CsvTelemetryWriter):
+    """
+    Mismo hilo, cola y métricas que CsvTelemetryWriter, pero cada lote se
+    guarda en SQLite con un solo executemany y una transacción (más la
+    actualización de Laps). La conexión se abre y se usa solo en el hilo
+    escritor, fuera del event-loop.
+
+    session_key identifica la sesión en la base (la ruta de su CSV); con
+    append=True se siguen añadiendo muestras a la misma sesión.
+    """
+    FLUSH_ROWS = 1024
+
+    _INSERT_SAMPLES = (f"INSERT INTO Samples (SessionId, {', '.join(CSV_COLUMNS)}) "
+                       f"VALUES ({', '.join('?' * (len(CSV_COLUMNS) + 1))})")
+    _UPSERT_LAP = """
+        INSERT INTO Laps (SessionId, LapNumber, Rows, FirstTimestampMS, LastTimestampMS, LastLap, BestLap)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (SessionId, LapNumber) DO UPDATE SET
+            Rows = Rows + excluded.Rows,
+            FirstTimestampMS = MIN(FirstTimestampMS, excluded.FirstTimestampMS),
+            LastTimestampMS = MAX(LastTimestampMS, excluded.LastTimestampMS),
+            LastLap = excluded.LastLap,
+            BestLap = COALESCE(MIN(BestLap, excluded.BestLap), BestLap, excluded.BestLap)
+    """
+
+    def __init__(self, db_path: str, session_key: str, max_queue_size: int = CsvTelemetryWriter.MAX_QUEUE_SIZE,
+                 flush_rows: int = FLUSH_ROWS, flush_interval_s: float = CsvTelemetryWriter.FLUSH_INTERVAL_S,
+                 drop_when_full: bool = True, append: bool = False):
+        super().__init__(db_path, max_queue_size, flush_rows, flush_interval_s, drop_when_full, append)
+        self.session_key = session_key
+        self.session_id = None
+        self._conn = None
+
+    def _format_row(self, data: ForzaTelemetryData):
+        return data.to_csv_values()
+
+    def _open_session(self):
+        self._conn = connect(self.filename)
+        row = self._conn.execute("SELECT SessionId FROM Sessions WHERE CsvPath = ?", (self.session_key,)).fetchone()
+        with self._conn:
+            if row is None:
+                start_time = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+                cursor = self._conn.execute("INSERT INTO Sessions (CsvPath, StartTime) VALUES (?, ?)",
+                                            (self.session_key, start_time))
+                self.session_id = cursor.lastrowid
+            else:
+                self.session_id = row[0]
+                if not self._append:
+                    # Como el CSV abierto con "w": la sesión empieza de cero
+                    self._conn.execute("DELETE FROM Samples WHERE SessionId = ?", (self.session_id,))
+                    self._conn.execute("DELETE FROM Laps WHERE SessionId = ?", (self.session_id,))
+
+    def _write_rows(self, rows):
+        if self._conn is None:
+            self._open_session()
+        session_id = self.session_id
+
+        # Resumen por vuelta del lote
+        laps = {}
+        for row in rows:
+            lap = laps.get(row[_LAP])
+            best_lap = row[_BEST_LAP] if row[_BEST_LAP] > 0 else None
+            if lap is None:
+                laps[row[_LAP]] = [1, row[_TIMESTAMP], row[_TIMESTAMP], row[_LAST_LAP], best_lap]
+                continue
+            lap[0] += 1
+            lap[1] = min(lap[1], row[_TIMESTAMP])
+            lap[2] = max(lap[2], row[_TIMESTAMP])
+            lap[3] = row[_LAST_LAP]
+            if best_lap is not None and (lap[4] is None or best_lap < lap[4]):
+                lap[4] = best_lap
+
+        with self._conn:  # una transacción por lote
+            self._conn.executemany(self._INSERT_SAMPLES, [(session_id,) + row for row in rows])
+            self._conn.executemany(self._UPSERT_LAP,
+                                   [(session_id, lap_number, *lap) for lap_number, lap in laps.items()])
+
+    def _close_output(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def database_path(telemetry_dir: str, csv_filename: str, shared: bool) -> str:
+    """Base compartida del directorio de telemetría, o una por sesión junto a su CSV."""
+    if shared:
+        return os.path.join(telemetry_dir, SHARED_DATABASE_FILENAME)
+    return os.path.splitext(csv_filename)[0] + SQLITE_EXTENSION
+
+
+def list_sessions(db_path: str) -> list:
+    """Sesiones de una base (dicts con SessionId, CsvPath, StartTime, Laps y Rows), la más reciente primero."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute("""
+            SELECT s.SessionId, s.CsvPath, s.StartTime, COUNT(l.LapNumber) AS Laps, COALESCE(SUM(l.Rows), 0) AS Rows
+            FROM Sessions s LEFT JOIN Laps l ON l.SessionId = s.SessionId
+            GROUP BY s.SessionId ORDER BY s.StartTime DESC
+        """)]
+    finally:
+        conn.close()
+
+
+class SqliteSession(_LapColumnsReader):
+    """
+    Lectura de una sesión de una base SQLite con la interfaz de LapIndex para
+    el visor. Al abrir solo se lee Laps; lap_frame lee de una vez las
+    columnas pedidas de la vuelta usando el índice (SessionId, LapNumber, TimestampMS).
+    """
+
+    def __init__(self, db_path: str, session_id: int):
+        super().__init__(db_path)
+        self.session_id = session_id
+        self._conn = sqlite3.connect(db_path, timeout=30.0)
+        self.columns = [row[1] for row in self._conn.execute("PRAGMA table_info(Samples)") if row[1] != "SessionId"]
+        laps = self._conn.execute(
+            "SELECT LapNumber, Rows, LastLap, BestLap FROM Laps WHERE SessionId = ? ORDER BY LapNumber",
+            (session_id,)
+        ).fetchall()
+        self.laps = np.array([lap[0] for lap in laps], dtype=np.int64)
+        self.sample_counts = np.array([lap[1] for lap in laps], dtype=np.int64)
+        self.last_lap_times = np.array([lap[2] for lap in laps], dtype=np.float64) if laps else None
+        best_laps = [lap[3] for lap in laps if lap[3] is not None]
+        self.best_lap_time = min(best_laps) if best_laps else None
+        self._lap_set = set(self.laps.tolist())
+
+    def close(self):
+        self._conn.close()
+
+    def _frame_columns(self, rows, columns: list) -> dict:
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        data = {}
+        for name, column in zip(columns, values):
+            if name in CATEGORY_COLUMNS:
+                data[name] = pd.Categorical(column)
+            else:
+                data[name] = np.array(column, dtype=CSV_DTYPES.get(name, np.float64))
+        return data
+
+    def _load_columns(self, lap_number, columns: list) -> dict:
+        columns = [name for name in columns if name in self.columns]
+        rows = self._conn.execute(
+            f"SELECT {', '.join(columns)} FROM Samples WHERE SessionId = ? AND LapNumber = ? ORDER BY TimestampMS",
+            (self.session_id, lap_number)
+        ).fetchall()
+        return self._frame_columns(rows, columns)
+
+    def time_frame(self, start_ms: int, end_ms: int, columns=None):
+        """Filas con start_ms <= TimestampMS < end_ms (solo las columnas pedidas)."""
+        columns = [name for name in (columns or self.columns) if name in self.columns]
+        rows = self._conn.execute(
+            f"SELECT {', '.join(columns)} FROM Samples "
+            f"WHERE SessionId = ? AND TimestampMS >= ? AND TimestampMS < ? ORDER BY TimestampMS",
+            (self.session_id, start_ms, end_ms)
+        ).fetchall()
+        return pd.DataFrame(self._frame_columns(rows, columns))
@@ -1,103 +1,353 @@
 # telemetry_statistics.py
 import math
+import operator
 import numpy as np
-from dataclasses import fields
-from forza_telemetry_data import ForzaTelemetryData
+from forza_telemetry_data import ForzaTelemetryData, CSV_COLUMNS
+from quantile_sketch import KllSketch
+
+# Campos numéricos de ForzaTelemetryData, resueltos una sola vez
+NUMERIC_COLUMNS = tuple(name for name in CSV_COLUMNS if name not in ("CarName", "TrackName"))
+
+# Extensión del fichero con el estado de los acumuladores que acompaña a cada CSV de sesión
+STATE_EXTENSION = ".state.json"
+
+
+def combine_moments(a, b):
+    """
+    Combina dos conjuntos de momentos (n, mean, M2, M3, M4) con las fórmulas
+    paralelas de Chan/Pébay. mean y M2..M4 pueden ser arrays (un valor por campo).
+    """
+    n_a, mean_a, m2_a, m3_a, m4_a = a
+    n_b, mean_b, m2_b, m3_b, m4_b = b
+    if n_a == 0:
+        return b
+    if n_b == 0:
+        return a
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    delta2 = delta * delta
+    mean = mean_a + delta * (n_b / n)
+    m2 = m2_a + m2_b + delta2 * (n_a * n_b / n)
+    m3 = (m3_a + m3_b + delta * delta2 * (n_a * n_b * (n_a - n_b) / (n * n))
+          + 3.0 * delta * (n_a * m2_b - n_b * m2_a) / n)
+    m4 = (m4_a + m4_b + delta2 * delta2 * (n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b) / (n * n * n))
+          + 6.0 * delta2 * (n_a * n_a * m2_b + n_b * n_b * m2_a) / (n * n)
+          + 4.0 * delta * (n_a * m3_b - n_b * m3_a) / n)
+    return n, mean, m2, m3, m4
+
 
 class TelemetryStatistics:
-    def __init__(self):
-        # Para cada campo numérico de ForzaTelemetryData,
-        # almacenamos acumuladores para los momentos y una lista de valores para percentiles.
-        self.stats = {}
-        for f in fields(ForzaTelemetryData):
-            # Solo para campos numéricos (int y float)
-            self.stats[f.name] = {
-                "count": 0,
-                "mean": 0.0,
-                "M2": 0.0,  # para varianza
-                "M3": 0.0,  # para skewness
-                "M4": 0.0,  # para curtosis
-                "min": None,
-                "max": None,
-                "values": []  # para calcular mediana y percentiles
-            }
+    # Error de rango aproximado de la mediana y los percentiles (1 %)
+    DEFAULT_QUANTILE_ERROR = 0.01
+    # Muestras que se acumulan antes de actualizar momentos y sketches con NumPy
+    BLOCK_SIZE = 64
+    STATE_VERSION = 1
+
+    def __init__(self, quantile_error: float = DEFAULT_QUANTILE_ERROR, block_size: int = BLOCK_SIZE):
+        # Para cada campo numérico de ForzaTelemetryData guardamos los momentos
+        # (mean, M2 para varianza, M3 para skewness, M4 para curtosis), min/max
+        # y un sketch KLL para percentiles. Las muestras se acumulan en un bloque
+        # de block_size filas que se fusiona de golpe con NumPy.
+        sketch_k = KllSketch.k_for_error(quantile_error)
+        num_fields = len(NUMERIC_COLUMNS)
+        self.count = 0
+        self.mean = np.zeros(num_fields)
+        self.m2 = np.zeros(num_fields)
+        self.m3 = np.zeros(num_fields)
+        self.m4 = np.zeros(num_fields)
+        self.min = np.full(num_fields, np.inf)
+        self.max = np.full(num_fields, -np.inf)
+        self.sketches = [KllSketch(sketch_k) for _ in NUMERIC_COLUMNS]
+
+        self._block = np.empty((block_size, num_fields))
+        self._block_len = 0
+        self._row_values = operator.attrgetter(*NUMERIC_COLUMNS)
 
     def update(self, telemetry: ForzaTelemetryData):
-        # Para cada campo numérico, se actualizan los acumuladores usando el algoritmo online extendido
-        for f in fields(ForzaTelemetryData):
-            value = getattr(telemetry, f.name)
-            if isinstance(value, (int, float)):
-                stat = self.stats[f.name]
-                stat["count"] += 1
-                n = stat["count"]
-                x = float(value)
-                stat["values"].append(x)
-                if n == 1:
-                    stat["mean"] = x
-                    stat["min"] = x
-                    stat["max"] = x
-                    stat["M2"] = 0.0
-                    stat["M3"] = 0.0
-                    stat["M4"] = 0.0
-                else:
-                    delta = x - stat["mean"]
-                    delta_n = delta / n
-                    delta_n2 = delta_n * delta_n
-                    term1 = delta * delta_n * (n - 1)
-                    mean_prev = stat["mean"]
-                    stat["mean"] += delta_n
-                    stat["M4"] += (term1 * delta_n2 * (n*n - 3*n + 3) +
-                                   6 * delta_n2 * stat["M2"] - 4 * delta_n * stat["M3"])
-                    stat["M3"] += (term1 * delta_n * (n - 2) - 3 * delta_n * stat["M2"])
-                    stat["M2"] += term1
-                    if x < stat["min"]:
-                        stat["min"] = x
-                    if x > stat["max"]:
-                        stat["max"] = x
+        self._block[self._block_len] = self._row_values(telemetry)
+        self._block_len += 1
+        if self._block_len == len(self._block):
+            self._flush_block()
+
+    def _flush_block(self):
+        if self._block_len == 0:
+            return
+        self._merge_rows(self._block[:self._block_len])
+        self._block_len = 0
+
+    def update_columns(self, columns):
+        """
+        Añade muchas muestras de una vez desde columnas (dict de arrays o
+        DataFrame de pandas con las columnas de NUMERIC_COLUMNS).
+        """
+        self._flush_block()
+        rows = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in NUMERIC_COLUMNS])
+        if len(rows):
+            self._merge_rows(rows)
+
+    def _merge_rows(self, block):
+        n_b = len(block)
+        mean_b = block.mean(axis=0)
+        d = block - mean_b
+        d2 = d * d
+        block_moments = (n_b, mean_b, d2.sum(axis=0), (d2 * d).sum(axis=0), (d2 * d2).sum(axis=0))
+
+        self.count, self.mean, self.m2, self.m3, self.m4 = combine_moments(
+            (self.count, self.mean, self.m2, self.m3, self.m4), block_moments
+        )
+        np.minimum(self.min, block.min(axis=0), out=self.min)
+        np.maximum(self.max, block.max(axis=0), out=self.max)
+        for i, sketch in enumerate(self.sketches):
+            sketch.update_many(block[:, i])
+
+    def merge(self, other: "TelemetryStatistics"):
+        """Incorpora las estadísticas de otra sesión (o de otro proceso)."""
+        self._flush_block()
+        other._flush_block()
+        self.count, self.mean, self.m2, self.m3, self.m4 = combine_moments(
+            (self.count, self.mean, self.m2, self.m3, self.m4),
+            (other.count, other.mean, other.m2, other.m3, other.m4)
+        )
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+
+    def to_state(self) -> dict:
+        """
+        Estado compacto y serializable (JSON) de los acumuladores: momentos,
+        min/max y sketches. Su tamaño no depende de la duración de la sesión.
+        """
+        self._flush_block()
+        return {
+            "version": TelemetryStatistics.STATE_VERSION,
+            "fields": list(NUMERIC_COLUMNS),
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "m3": self.m3.tolist(),
+            "m4": self.m4.tolist(),
+            # Sin muestras min/max valen ±inf, que JSON no admite: se guardan como null
+            "min": self.min.tolist() if self.count else None,
+            "max": self.max.tolist() if self.count else None,
+            "sketches": [sketch.to_dict() for sketch in self.sketches],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TelemetryStatistics":
+        if state.get("version") != cls.STATE_VERSION or state.get("fields") != list(NUMERIC_COLUMNS):
+            raise ValueError("El estado de estadísticas no corresponde a esta versión de ForzaTelemetryData.")
+        stats = cls()
+        stats.count = state["count"]
+        stats.mean = np.array(state["mean"], dtype=np.float64)
+        stats.m2 = np.array(state["m2"], dtype=np.float64)
+        stats.m3 = np.array(state["m3"], dtype=np.float64)
+        stats.m4 = np.array(state["m4"], dtype=np.float64)
+        if state["min"] is not None:
+            stats.min = np.array(state["min"], dtype=np.float64)
+            stats.max = np.array(state["max"], dtype=np.float64)
+        stats.sketches = [KllSketch.from_dict(sketch) for sketch in state["sketches"]]
+        return stats
+
+    def quantile(self, field_name: str, q: float):
+        """Cuantil q (0..1) de un campo en cualquier momento de la sesión."""
+        self._flush_block()
+        return self.sketches[NUMERIC_COLUMNS.index(field_name)].quantile(q)
 
     def get_statistics(self):
         # Para cada campo, se calcula:
         # - varianza y desviación estándar
         # - skewness: (sqrt(n) * M3) / (M2^(3/2))
         # - kurtosis: (n * M4) / (M2^2) - 3
-        # - mediana, percentiles 25 y 75 (usando numpy)
-        result = {}
-        for field_name, stat in self.stats.items():
-            n = stat["count"]
-            mean = stat["mean"]
-            if n > 1 and stat["M2"] != 0:
-                variance = stat["M2"] / (n - 1)
+        # - mediana, percentiles 25 y 75 (aproximados con el sketch KLL)
+        self._flush_block()
+        n = self.count
+        per_field = {}
+        for i, field_name in enumerate(NUMERIC_COLUMNS):
+            m2 = float(self.m2[i])
+            if n > 1 and m2 != 0:
+                variance = m2 / (n - 1)
                 std = math.sqrt(variance)
             else:
                 variance = 0.0
                 std = 0.0
-            if n > 2 and stat["M2"] != 0:
-                skewness = (math.sqrt(n) * stat["M3"]) / (stat["M2"] ** 1.5)
+            if n > 2 and m2 != 0:
+                skewness = (math.sqrt(n) * float(self.m3[i])) / (m2 ** 1.5)
             else:
                 skewness = 0.0
-            if n > 3 and stat["M2"] != 0:
-                kurtosis = (n * stat["M4"]) / (stat["M2"] * stat["M2"]) - 3
+            if n > 3 and m2 != 0:
+                kurtosis = (n * float(self.m4[i])) / (m2 * m2) - 3
             else:
                 kurtosis = 0.0
-            # Calcular mediana y percentiles usando numpy
-            values = stat["values"]
-            if values:
-                median = float(np.percentile(values, 50))
-                p25 = float(np.percentile(values, 25))
-                p75 = float(np.percentile(values, 75))
-            else:
-                median = p25 = p75 = None
+            # Mediana y percentiles desde el sketch (None si no hay muestras)
+            sketch = self.sketches[i]
 
-            result[field_name] = {
+            per_field[field_name] = {
                 "count": n,
-                "mean": mean,
+                "mean": float(self.mean[i]),
                 "std": std,
-                "min": stat["min"],
-                "max": stat["max"],
-                "median": median,
-                "percentile25": p25,
-                "percentile75": p75,
+                "min": float(self.min[i]) if n else None,
+                "max": float(self.max[i]) if n else None,
+                "median": sketch.quantile(0.50),
+                "percentile25": sketch.quantile(0.25),
+                "percentile75": sketch.quantile(0.75),
                 "skewness": skewness,
                 "kurtosis": kurtosis
             }
+
+        # Mismo orden y claves que el CSV; los campos de texto salen vacíos
+        empty = {"count": 0, "mean": 0.0, "std": 0.0, "min": None, "max": None, "median": None,
+                 "percentile25": None, "percentile75": None, "skewness": 0.0, "kurtosis": 0.0}
+        return {name: per_field.get(name, dict(empty)) for name in CSV_COLUMNS}
+
+
+class SessionStatistics:
+    """
+    Estadísticas de la sesión completa y, a la vez, por vuelta (LapNumber) y
+    opcionalmente por sector. El cambio de vuelta es O(1): solo se cambia el
+    acumulador activo. Los sectores se definen dividiendo en `sectors` partes
+    iguales la distancia recorrida en la vuelta anterior, así que la primera
+    vuelta registrada no tiene sectores.
+    """
+
+    def __init__(self, sectors: int = 0, quantile_error: float = TelemetryStatistics.DEFAULT_QUANTILE_ERROR):
+        self.sectors = sectors
+        self._quantile_error = quantile_error
+        self.session = TelemetryStatistics(quantile_error)
+        self.laps = {}  # LapNumber -> TelemetryStatistics
+        self.lap_sectors = {}  # LapNumber -> {sector -> TelemetryStatistics}
+        self._current_lap = None
+        self._current = None
+        self._lap_start_distance = 0.0
+        self._last_distance = 0.0
+        self._lap_length = None
+        # Vueltas terminadas cuyo estado aún no se ha guardado en un checkpoint (ver checkpoint_state)
+        self._unsaved_laps = set()
+
+    def update(self, telemetry: ForzaTelemetryData):
+        self.session.update(telemetry)
+
+        lap = telemetry.LapNumber
+        if lap != self._current_lap:
+            self._switch_lap(lap, telemetry.DistanceTraveled)
+        self._current.update(telemetry)
+        self._last_distance = telemetry.DistanceTraveled
+
+        if self.sectors and self._lap_length and self._lap_length > 0:
+            fraction = (telemetry.DistanceTraveled - self._lap_start_distance) / self._lap_length
+            sector = min(self.sectors - 1, max(0, int(fraction * self.sectors)))
+            sectors = self.lap_sectors.setdefault(lap, {})
+            stats = sectors.get(sector)
+            if stats is None:
+                stats = sectors[sector] = TelemetryStatistics(self._quantile_error)
+            stats.update(telemetry)
+
+    def _switch_lap(self, lap: int, distance: float):
+        if self._current_lap is not None and lap == self._current_lap + 1:
+            self._lap_length = self._last_distance - self._lap_start_distance
+        if self._current_lap is not None:
+            self._unsaved_laps.add(self._current_lap)
+        self._current_lap = lap
+        self._unsaved_laps.discard(lap)
+        self._current = self.laps.get(lap)
+        if self._current is None:
+            self._current = self.laps[lap] = TelemetryStatistics(self._quantile_error)
+        self._lap_start_distance = distance
+
+    def update_columns(self, columns):
+        """
+        Añade muchas muestras consecutivas de una vez (dict de arrays o
+        DataFrame con las columnas de NUMERIC_COLUMNS), repartiéndolas por
+        vuelta. Los sectores no se actualizan por esta vía.
+        """
+        arrays = {name: np.asarray(columns[name], dtype=np.float64) for name in NUMERIC_COLUMNS}
+        laps = arrays["LapNumber"]
+        if not len(laps):
+            return
+        self.session.update_columns(arrays)
+        distance = arrays["DistanceTraveled"]
+        # Tramos consecutivos con la misma vuelta
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(laps)) + 1))
+        ends = np.append(starts[1:], len(laps))
+        for start, end in zip(starts, ends):
+            lap = int(laps[start])
+            if lap != self._current_lap:
+                self._switch_lap(lap, float(distance[start]))
+            self._current.update_columns({name: values[start:end] for name, values in arrays.items()})
+            self._last_distance = float(distance[end - 1])
+
+    def get_statistics(self):
+        """
+        Mismo formato que TelemetryStatistics.get_statistics para la sesión,
+        más una sección "Laps" con las estadísticas de cada vuelta (y "Sectors"
+        dentro de cada vuelta si se han calculado).
+        """
+        result = self.session.get_statistics()
+        laps = {}
+        for lap in sorted(self.laps):
+            lap_result = self.laps[lap].get_statistics()
+            sectors = self.lap_sectors.get(lap)
+            if sectors:
+                lap_result["Sectors"] = {str(sector): sectors[sector].get_statistics() for sector in sorted(sectors)}
+            laps[str(lap)] = lap_result
+        result["Laps"] = laps
         return result
+
+    def _lap_state(self, lap: int):
+        sectors = self.lap_sectors.get(lap, {})
+        return self.laps[lap].to_state(), {str(sector): stats.to_state() for sector, stats in sectors.items()}
+
+    def _state(self, laps) -> dict:
+        # El estado de la sesión va en la raíz para que TelemetryStatistics.from_state lo lea tal cual
+        state = self.session.to_state()
+        state["sectors"] = self.sectors
+        state["laps"] = {}
+        state["lap_sectors"] = {}
+        for lap in laps:
+            state["laps"][str(lap)], sectors_state = self._lap_state(lap)
+            if sectors_state:
+                state["lap_sectors"][str(lap)] = sectors_state
+        state["current_lap"] = self._current_lap
+        state["lap_start_distance"] = self._lap_start_distance
+        state["last_distance"] = self._last_distance
+        state["lap_length"] = self._lap_length
+        return state
+
+    def to_state(self) -> dict:
+        return self._state(self.laps)
+
+    def checkpoint_state(self):
+        """
+        Estado para un checkpoint, en dos partes: el de to_state pero solo con
+        la vuelta actual, y {vuelta: (estado, estado de sus sectores)} de las
+        vueltas terminadas desde el último checkpoint guardado (ver mark_saved).
+        Así cada checkpoint serializa un número fijo de acumuladores, no uno
+        por vuelta de la sesión.
+        """
+        current = [self._current_lap] if self._current_lap is not None else []
+        return self._state(current), {lap: self._lap_state(lap) for lap in self._unsaved_laps}
+
+    def mark_saved(self, laps):
+        """Las vueltas `laps` (de checkpoint_state) ya están guardadas y no se vuelven a serializar."""
+        self._unsaved_laps.difference_update(laps)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "SessionStatistics":
+        """Reconstruye las estadísticas desde to_state (p. ej. un checkpoint) para seguir acumulando."""
+        stats = cls(state.get("sectors", 0))
+        stats.session = TelemetryStatistics.from_state(state)
+        stats.laps = {int(lap): TelemetryStatistics.from_state(lap_state)
+                      for lap, lap_state in state.get("laps", {}).items()}
+        stats.lap_sectors = {
+            int(lap): {int(sector): TelemetryStatistics.from_state(sector_state)
+                       for sector, sector_state in sectors.items()}
+            for lap, sectors in state.get("lap_sectors", {}).items()
+        }
+        stats._current_lap = state.get("current_lap")
+        stats._current = stats.laps.get(stats._current_lap)
+        if stats._current is None:
+            stats._current_lap = None
+        stats._lap_start_distance = state.get("lap_start_distance", 0.0)
+        stats._last_distance = state.get("last_distance", 0.0)
+        stats._lap_length = state.get("lap_length")
+        return stats
@@ -0,0 +1 @@
+# Tests de la telemetría (ejecutar desde src/: python -m pytest tests)
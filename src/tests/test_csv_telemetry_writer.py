@@ -0,0 +1,122 @@
+# test_csv_telemetry_writer.py
+import time
+import pytest
+from csv_telemetry_writer import CsvTelemetryWriter
+from forza_telemetry_data import ForzaTelemetryData
+
+HEADER = ForzaTelemetryData.get_csv_header()
+
+
+def sample(timestamp_ms: int):
+    data = ForzaTelemetryData()
+    data.TimestampMS = timestamp_ms
+    data.Speed = 30.0
+    return data
+
+
+def wait_for(predicate, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        assert time.monotonic() < deadline, "el hilo escritor no llegó al estado esperado"
+        time.sleep(0.01)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_flushes_every_flush_rows(tmp_path):
+    path = str(tmp_path / "session.csv")
+    writer = CsvTelemetryWriter(path, flush_rows=10, flush_interval_s=60.0)
+    writer.start()
+    for row in range(25):
+        writer.write(sample(row))
+    # Dos lotes completos; las 5 filas restantes esperan al intervalo o al cierre
+    wait_for(lambda: writer.rows_written == 20)
+    time.sleep(0.1)
+    assert writer.rows_written == 20 and writer.flushes == 2
+    assert len(read_lines(path)) == 1 + 20
+
+    writer.close()
+    assert writer.rows_written == 25 and writer.flushes == 3
+
+
+def test_flushes_after_flush_interval(tmp_path):
+    path = str(tmp_path / "session.csv")
+    writer = CsvTelemetryWriter(path, flush_rows=1000, flush_interval_s=0.05)
+    writer.start()
+    for row in range(3):
+        writer.write(sample(row))
+    wait_for(lambda: writer.rows_written == 3)
+    assert read_lines(path)[0] == HEADER
+    writer.close()
+    assert writer.rows_written == 3
+
+
+def test_close_drains_the_queue(tmp_path):
+    path = str(tmp_path / "session.csv")
+    writer = CsvTelemetryWriter(path, flush_rows=100000, flush_interval_s=60.0, drop_when_full=False)
+    writer.start()
+    for row in range(5000):
+        writer.write(sample(row))
+    writer.close()
+    lines = read_lines(path)
+    assert len(lines) == 1 + 5000
+    assert writer.rows_written == 5000 and writer.rows_dropped == 0
+    assert lines[-1].split(",")[1] == "4999"
+
+
+class FailingWriter(CsvTelemetryWriter):
+    def _write_rows(self, lines):
+        raise OSError("disco lleno")
+
+
+def test_writer_error_reaches_offline_producer(tmp_path):
+    writer = FailingWriter(str(tmp_path / "session.csv"), max_queue_size=4, flush_rows=1, drop_when_full=False)
+    writer.start()
+    # Con la cola pequeña y el hilo muerto, write() no puede quedarse esperando para siempre
+    with pytest.raises(OSError):
+        for row in range(100):
+            writer.write(sample(row))
+    with pytest.raises(OSError):
+        writer.close()
+
+
+def test_writer_error_drops_live_samples(tmp_path):
+    writer = FailingWriter(str(tmp_path / "session.csv"), flush_rows=1)
+    writer.start()
+    writer.write(sample(0))
+    wait_for(lambda: writer.error is not None)
+    writer.write(sample(1))
+    assert writer.rows_dropped == 1
+    with pytest.raises(OSError):
+        writer.close()
+
+
+def test_append_after_partial_line(tmp_path):
+    path = tmp_path / "session.csv"
+    first, partial = sample(1).to_csv_line(), sample(2).to_csv_line()[:20]
+    path.write_text(HEADER + "\n" + first + "\n" + partial, encoding="utf-8")
+
+    writer = CsvTelemetryWriter(str(path), append=True)
+    writer.start()
+    writer.write(sample(3))
+    writer.close()
+    # La fila cortada queda sola en su línea y no se repite la cabecera
+    assert read_lines(path) == [HEADER, first, partial, sample(3).to_csv_line()]
+
+
+def test_call_after_flush_sees_rows_enqueued_before(tmp_path):
+    path = str(tmp_path / "session.csv")
+    writer = CsvTelemetryWriter(path, flush_rows=1000, flush_interval_s=60.0)
+    writer.start()
+    calls = []
+    for row in range(30):
+        writer.write(sample(row))
+    assert writer.call_after_flush(lambda rows_written: calls.append((rows_written, len(read_lines(path)) - 1)))
+    writer.write(sample(30))
+    writer.close()
+    assert calls == [(30, 30)]
+    assert writer.rows_written == 31
+    assert not writer.call_after_flush(calls.append)
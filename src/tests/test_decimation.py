@@ -0,0 +1,56 @@
+# test_decimation.py
+import numpy as np
+import pytest
+from telemetry_gui.decimation import DECIMATORS, lttb_indices, minmax_indices
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.01, 0.02, n))
+    y = np.cumsum(rng.normal(size=n)).astype(np.float32)
+    if n > 10:
+        y[n // 3] = 1e4  # pico aislado
+        y[-2] = -1e4
+    return x, y
+
+
+@pytest.mark.parametrize("n", [10007, 10000, 999])
+@pytest.mark.parametrize("n_buckets", [1, 7, 100])
+def test_minmax_keeps_bucket_extrema(n, n_buckets):
+    _, y = series(n)
+    selected = minmax_indices(y, n_buckets)
+    assert selected[0] == 0 and selected[-1] == n - 1
+    assert len(selected) <= 2 * n_buckets + 2
+    bucket = -(-n // n_buckets)
+    for start in range(0, n, bucket):
+        inside = selected[(selected >= start) & (selected < start + bucket)]
+        assert y[inside].min() == y[start:start + bucket].min()
+        assert y[inside].max() == y[start:start + bucket].max()
+
+
+@pytest.mark.parametrize("n", [4, 1000, 100003])
+def test_lttb_keeps_first_and_last(n):
+    x, y = series(n)
+    selected = lttb_indices(x, y, 3)
+    assert selected[0] == 0 and selected[-1] == n - 1
+    selected = lttb_indices(x, y, 200)
+    assert selected[0] == 0 and selected[-1] == n - 1
+    assert len(selected) == min(n, 200)
+
+
+@pytest.mark.parametrize("decimate", sorted(DECIMATORS))
+@pytest.mark.parametrize("pixels", [100, 251])
+@pytest.mark.parametrize("n", [0, 1, 2, 150, 199, 200, 201, 202, 503, 100003])
+def test_at_most_two_points_per_pixel(decimate, pixels, n):
+    x, y = series(n)
+    selected = DECIMATORS[decimate](x, y, pixels)
+    assert len(selected) <= 2 * pixels
+    # Puntos de la serie original, en orden y sin repetir
+    assert np.all(np.diff(selected) > 0)
+    if n <= 2 * pixels - 2:
+        # Cabe entera en el presupuesto de cualquiera de los dos métodos
+        assert len(selected) == n
+    elif n:
+        assert selected[0] == 0 and selected[-1] == n - 1
+    if decimate == "minmax" and n:
+        assert y[selected].max() == y.max() and y[selected].min() == y.min()
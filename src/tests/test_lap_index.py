@@ -0,0 +1,55 @@
+# test_lap_index.py
+import numpy as np
+import pandas as pd
+import pytest
+from telemetry_gui.lap_index import LapIndex
+
+
+def session_df(laps):
+    lap_numbers = np.repeat([lap for lap, _ in laps], [count for _, count in laps])
+    rows = len(lap_numbers)
+    return pd.DataFrame({
+        "LapNumber": lap_numbers.astype(np.uint16),
+        "TimestampMS": 1000 + 16 * np.arange(rows, dtype=np.uint32),
+        "Speed": np.arange(rows, dtype=np.float32),
+        "LastLap": 60.0 + lap_numbers,
+        "BestLap": np.where(lap_numbers > 0, 59.5, 0.0),
+    })
+
+
+@pytest.mark.parametrize("laps", [
+    [(0, 5), (1, 7), (2, 1), (3, 4)],  # en orden: cada vuelta es un rango contiguo
+    [(0, 5), (1, 7), (2, 1), (1, 4)],  # se vuelve a la vuelta 1
+])
+def test_laps_and_boundaries(laps):
+    df = session_df(laps)
+    index = LapIndex(df)
+    expected = df.groupby("LapNumber")
+    assert index.laps.tolist() == list(expected.groups)
+    assert len(index) == len(expected)
+    assert index.sample_counts.tolist() == expected.size().tolist()
+    assert index.last_lap_times.tolist() == [60.0 + lap for lap in expected.groups]
+    assert index.best_lap_time == 59.5
+    assert 9 not in index and index.lap_frame(9) is None
+
+    for lap, rows in expected:
+        frame = index.lap_frame(lap)
+        # Primera y última fila de la vuelta, en orden de llegada, sin filas de las vecinas
+        np.testing.assert_array_equal(frame["TimestampMS"], rows["TimestampMS"])
+        assert (frame["LapNumber"] == lap).all()
+        assert frame["RelativeTime"].iloc[0] == 0.0
+        duration_ms = int(rows["TimestampMS"].iloc[-1]) - int(rows["TimestampMS"].iloc[0])
+        assert frame["RelativeTime"].iloc[-1] == pytest.approx(duration_ms / 1000)
+
+
+def test_lap_cache_is_bounded():
+    df = session_df([(lap, 3) for lap in range(3 * LapIndex.LAP_CACHE_SIZE)])
+    index = LapIndex(df)
+    first = index.lap_frame(0)
+    for lap in range(1, len(index)):
+        index.lap_frame(lap)
+        index.lap_frame(0)  # la vuelta más usada no sale de la caché
+    assert len(index._cache) == LapIndex.LAP_CACHE_SIZE
+    assert index.lap_frame(0) is first
+    # Las vueltas expulsadas se vuelven a recortar igual
+    np.testing.assert_array_equal(index.lap_frame(1)["Speed"], df["Speed"][3:6])
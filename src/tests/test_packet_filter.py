@@ -0,0 +1,60 @@
+# test_packet_filter.py
+import struct
+import pytest
+from packet_filter import FieldRule, PacketFilter, default_rules
+from telemetry_parser import FM7_SLED_FORMAT, FM8_FORMAT, TelemetryDataParser
+from tests.test_telemetry_parser import LAYOUTS, make_packet
+
+
+def test_rules_on_missing_fields_are_skipped():
+    # FM7 Sled no trae Speed, Gear ni LapNumber: solo se aplica "race_off"
+    packet = bytearray(make_packet(LAYOUTS[232]))
+    struct.pack_into("<i", packet, FM7_SLED_FORMAT.field_offsets["IsRaceOn"][0], 1)
+    packet_filter = PacketFilter(default_rules(wait_for_lap_zero=True))
+    assert packet_filter.check(packet) is None
+
+    struct.pack_into("<i", packet, 0, 0)
+    assert packet_filter.check(packet) == "race_off"
+    assert packet_filter.rejections == {"race_off": 1, "waiting_lap_zero": 0, "stopped": 0, "gear_11": 0}
+
+
+@pytest.mark.parametrize("length", sorted(LAYOUTS))
+def test_peeked_fields_match_parse(length):
+    # Una regla por campo del formato que solo anota el valor leído en su offset
+    seen = {}
+    names = [name for name, _ in LAYOUTS[length] if name is not None]
+    rules = [FieldRule(name, name, lambda v, name=name: seen.setdefault(name, []).append(v)) for name in names]
+    packet_filter = PacketFilter(rules)
+    for seed in range(5):
+        packet = make_packet(LAYOUTS[length], seed)
+        assert packet_filter.check(packet) is None
+        data = TelemetryDataParser.parse(packet)
+        for name in names:
+            assert seen[name][-1] == getattr(data, name), name
+
+
+def fm8_packet(**values) -> bytearray:
+    packet = bytearray(make_packet(LAYOUTS[331]))
+    fields = {"IsRaceOn": 1, "LapNumber": 0, "Speed": 20.0, "Gear": 3}
+    fields.update(values)
+    for name, value in fields.items():
+        offset, fmt = FM8_FORMAT.field_offsets[name]
+        struct.pack_into("<" + fmt, packet, offset, value)
+    return packet
+
+
+def test_each_rule_counts_its_rejections():
+    packet_filter = PacketFilter(default_rules(wait_for_lap_zero=True))
+    checks = [
+        (fm8_packet(IsRaceOn=0), "race_off"),
+        (fm8_packet(LapNumber=2), "waiting_lap_zero"),
+        (fm8_packet(Speed=0.2), "stopped"),
+        (fm8_packet(), None),  # vuelta 0: abre la puerta
+        (fm8_packet(LapNumber=2), None),
+        (fm8_packet(Gear=11), "gear_11"),
+        (fm8_packet(Speed=0.2, Gear=11), "stopped"),  # gana la primera regla que rechaza
+        (fm8_packet(IsRaceOn=0, Speed=0.0), "race_off"),
+    ]
+    for packet, expected in checks:
+        assert packet_filter.check(packet) == expected
+    assert packet_filter.rejections == {"race_off": 2, "waiting_lap_zero": 1, "stopped": 2, "gear_11": 1}
@@ -0,0 +1,80 @@
+# test_quantile_sketch.py
+import numpy as np
+from quantile_sketch import KllSketch
+
+N = 200000
+ERROR = 0.01
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def uniform_permutation(seed=0):
+    # Los valores son 0..N-1: el rango exacto de un valor v es v / N
+    return np.random.default_rng(seed).permutation(N).astype(np.float64)
+
+
+def max_rank_error(sketch):
+    return max(abs(sketch.quantile(q) / N - q) for q in QUANTILES)
+
+
+def test_exact_before_first_compaction():
+    values = np.random.default_rng(1).normal(size=50)
+    sketch = KllSketch(200)
+    sketch.update_many(values)
+    for q in (0.0, 0.25, 0.5, 0.75, 1.0):
+        assert sketch.quantile(q) == np.percentile(values, q * 100)
+
+
+def test_rank_error_within_bound():
+    sketch = KllSketch(KllSketch.k_for_error(ERROR))
+    sketch.update_many(uniform_permutation())
+    assert sketch.n == N
+    assert max_rank_error(sketch) <= ERROR
+    # La memoria no depende del número de muestras
+    assert sum(len(items) for items in sketch._levels) < 3 * sketch.k
+
+
+def test_update_and_update_many_agree_on_bound():
+    sketch = KllSketch(KllSketch.k_for_error(ERROR))
+    for value in uniform_permutation(2)[:20000]:
+        sketch.update(value)
+    values = np.sort(uniform_permutation(2)[:20000])
+    for q in QUANTILES:
+        rank = np.searchsorted(values, sketch.quantile(q)) / len(values)
+        assert abs(rank - q) <= ERROR
+
+
+def test_merge_matches_single_sketch():
+    k = KllSketch.k_for_error(ERROR)
+    data = uniform_permutation(3)
+    single = KllSketch(k)
+    single.update_many(data)
+
+    parts = [KllSketch(k, seed=i) for i in range(4)]
+    for part, chunk in zip(parts, np.array_split(data, 4)):
+        part.update_many(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.n == single.n == N
+    assert max_rank_error(merged) <= ERROR
+    for q in QUANTILES:
+        assert abs(merged.quantile(q) - single.quantile(q)) / N <= 2 * ERROR
+
+
+def test_merge_with_empty_sketch():
+    sketch = KllSketch(100)
+    sketch.update_many(uniform_permutation(4))
+    before = [sketch.quantile(q) for q in QUANTILES]
+    sketch.merge(KllSketch(100))
+    assert sketch.n == N
+    assert [sketch.quantile(q) for q in QUANTILES] == before
+    assert KllSketch(100).quantile(0.5) is None
+
+
+def test_state_round_trip():
+    sketch = KllSketch(100)
+    sketch.update_many(uniform_permutation(5))
+    restored = KllSketch.from_dict(sketch.to_dict())
+    assert restored.n == sketch.n
+    assert [restored.quantile(q) for q in QUANTILES] == [sketch.quantile(q) for q in QUANTILES]
@@ -0,0 +1,66 @@
+# test_raw_capture.py
+import os
+import pandas as pd
+from capture_regenerate import regenerate_from_capture
+from forza_telemetry_data import ForzaTelemetryData, PACKET_FIELDS
+from raw_capture import CAPTURE_MAGIC, RECORD_HEADER, RawCaptureWriter, read_capture
+from telemetry_parser import FM8_STRUCT
+from tests.test_csv_telemetry_writer import wait_for
+
+ADDR = ("192.168.1.20", 53210)
+
+
+def fm8_packet(row: int) -> bytes:
+    data = ForzaTelemetryData()
+    data.IsRaceOn = 1
+    data.TimestampMS = 5000 + 16 * row
+    data.Speed = 20.0 + row
+    data.Gear = 3
+    return FM8_STRUCT.pack(*(getattr(data, name) for name, _ in PACKET_FIELDS))
+
+
+def test_flushes_after_flush_interval(tmp_path):
+    path = str(tmp_path / "session.fzcap")
+    writer = RawCaptureWriter(path, flush_interval_s=0.05)
+    writer.write(fm8_packet(0), ADDR, 1)
+    # Sin cerrar: el hilo escritor lo vuelca por tiempo
+    wait_for(lambda: os.path.getsize(path) == len(CAPTURE_MAGIC) + RECORD_HEADER.size + 331)
+    writer.close()
+    assert writer.flushes == 1
+
+
+def test_flushes_every_flush_bytes(tmp_path):
+    path = str(tmp_path / "session.fzcap")
+    writer = RawCaptureWriter(path, flush_bytes=4096, flush_interval_s=60.0)
+    for row in range(100):
+        writer.write(fm8_packet(row), ADDR, row)
+    wait_for(lambda: writer.flushes >= 1)
+    writer.close()
+    assert len(list(read_capture(path))) == 100
+
+
+def test_capture_round_trip(tmp_path):
+    capture_path = str(tmp_path / "session.fzcap")
+    writer = RawCaptureWriter(capture_path)
+    records = []
+    for row in range(50):
+        records.append((1_000_000_000 + row * 16_666_667, ADDR, fm8_packet(row)))
+    records.insert(10, (1_100_000_000, ADDR, b"\x00" * 100))  # longitud desconocida: se graba igual
+    for arrival_ns, addr, packet in records:
+        writer.write(packet, addr, arrival_ns)
+    writer.close()
+    assert writer.packets_written == 51
+
+    read_back = [(arrival_ns, addr, bytes(packet)) for arrival_ns, addr, packet in read_capture(capture_path)]
+    assert read_back == records
+
+    # Un registro cortado al final (cierre inesperado) se ignora
+    with open(capture_path, "ab") as f:
+        f.write(RECORD_HEADER.pack(2_000_000_000, 331, bytes(4), 0) + fm8_packet(99)[:40])
+    assert len(list(read_capture(capture_path))) == 51
+
+    csv_path = str(tmp_path / "session.csv")
+    regenerate_from_capture(capture_path, csv_path, {}, {}, write_interval_ms=0)
+    df = pd.read_csv(csv_path)
+    assert df["TimestampMS"].tolist() == [5000 + 16 * row for row in range(50)]
+    assert df["Speed"].tolist() == [20.0 + row for row in range(50)]
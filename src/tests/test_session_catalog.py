@@ -0,0 +1,92 @@
+# test_session_catalog.py
+import json
+import os
+import pytest
+from forza_telemetry_data import ForzaTelemetryData
+from session_catalog import SessionCatalog, summarize_session
+from telemetry_statistics import SessionStatistics, STATE_EXTENSION
+
+CAR_NAMES = {1001: "Toyota Supra", 2002: "Honda Civic"}
+TRACK_NAMES = {30: "Maple Valley", 40: "Suzuka"}
+
+
+def write_session(path, car=1001, track=30, car_class=5, laps=3, rows_per_lap=40, state=False):
+    """CSV de una sesión (y su .state.json si state=True)."""
+    statistics = SessionStatistics()
+    data = ForzaTelemetryData()
+    data.IsRaceOn = 1
+    data.CarClass = car_class
+    data.CarPerformanceIndex = 700 + car_class
+    row = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(ForzaTelemetryData.get_csv_header() + "\n")
+        for lap in range(laps):
+            for i in range(rows_per_lap):
+                # En el menú inicial el juego envía ordinales a 0
+                data.CarOrdinal = car if row > 3 else 0
+                data.TrackOrdinal = track if row > 3 else 0
+                data.LapNumber = lap
+                data.TimestampMS = 10000 + 16 * row
+                data.BestLap = 0.0 if lap == 0 else 62.5 - lap
+                data.Speed = 30.0
+                f.write(data.to_csv_line() + "\n")
+                statistics.update(data)
+                row += 1
+    if state:
+        with open(path.replace(".csv", STATE_EXTENSION), "w", encoding="utf-8") as f:
+            json.dump(statistics.to_state(), f)
+    return path
+
+
+def test_summary_from_state_matches_csv(tmp_path):
+    csv_path = write_session(str(tmp_path / "forza_telemetry_20260101_120000.csv"), laps=4)
+    from_csv = summarize_session(csv_path)
+    write_session(csv_path, laps=4, state=True)
+    from_state = summarize_session(csv_path)
+    for key in ("CarOrdinal", "CarClass", "CarPerformanceIndex", "TrackOrdinal", "LapCount", "BestLap",
+                "DurationSec", "Rows"):
+        assert from_state[key] == pytest.approx(from_csv[key]), key
+    assert from_state["LapCount"] == 4 and from_state["BestLap"] == 59.5
+    assert from_state["StartTime"] == "2026-01-01 12:00:00"
+
+
+def test_rebuild_only_summarizes_new_or_changed_sessions(tmp_path):
+    telemetry_dir = tmp_path / "Telemetry"
+    telemetry_dir.mkdir()
+    first = write_session(str(telemetry_dir / "forza_telemetry_20260101_120000.csv"))
+    second = write_session(str(telemetry_dir / "forza_telemetry_20260102_120000.csv"), state=True)
+    catalog = SessionCatalog(str(tmp_path / "catalog.db"), CAR_NAMES, TRACK_NAMES)
+
+    assert catalog.rebuild(str(telemetry_dir), workers=1) == 2
+    assert catalog.rebuild(str(telemetry_dir), workers=1) == 0
+
+    write_session(first, laps=5)
+    os.remove(second)
+    assert catalog.rebuild(str(telemetry_dir), workers=1) == 1
+    sessions = catalog.find_sessions()
+    assert [session["CsvPath"] for session in sessions] == [os.path.abspath(first)]
+    assert sessions[0]["LapCount"] == 5
+
+
+def test_find_sessions_filters(tmp_path):
+    catalog = SessionCatalog(str(tmp_path / "catalog.db"), CAR_NAMES, TRACK_NAMES)
+    sessions = [
+        ("forza_telemetry_20260101_120000.csv", 1001, 30, 5),
+        ("forza_telemetry_20260102_120000.csv", 1001, 40, 6),
+        ("forza_telemetry_20260103_120000.csv", 2002, 30, 5),
+    ]
+    for filename, car, track, car_class in sessions:
+        catalog.record_session(write_session(str(tmp_path / filename), car, track, car_class))
+
+    def found(**filters):
+        return [os.path.basename(session["CsvPath"]) for session in catalog.find_sessions(**filters)]
+
+    # De la más reciente a la más antigua
+    assert found() == [filename for filename, *_ in reversed(sessions)]
+    assert found(car=1001) == [sessions[1][0], sessions[0][0]]
+    assert found(car="supra", track="Maple") == [sessions[0][0]]
+    assert found(track=30, car_class=5) == [sessions[2][0], sessions[0][0]]
+    assert found(car_class=6) == [sessions[1][0]]
+    assert found(car="Ferrari") == []
+    assert found(limit=1) == [sessions[2][0]]
+    assert catalog.find_sessions(car=2002)[0]["CarName"] == "Honda Civic"
@@ -0,0 +1,152 @@
+# test_session_checkpoint.py
+import json
+import os
+import pytest
+from forza_telemetry_data import ForzaTelemetryData
+from session_checkpoint import (
+    CheckpointWriter, checkpoint_filename, checkpoint_laps_filename, recover_session, remove_checkpoint
+)
+from telemetry_statistics import SessionStatistics
+from udp_receiver import UdpReceiver
+from tests.test_csv_telemetry_writer import wait_for
+from tests.test_raw_capture import fm8_packet
+
+ROWS_PER_LAP = 50
+
+
+def lap_rows(laps):
+    """Muestras consecutivas de las vueltas `laps` (una vuelta puede repetirse)."""
+    data = ForzaTelemetryData()
+    data.IsRaceOn = 1
+    row = 0
+    for lap in laps:
+        for _ in range(ROWS_PER_LAP):
+            data.LapNumber = lap
+            data.TimestampMS = 1000 + 16 * row
+            data.Speed = float(lap * 10 + row % 7)
+            data.DistanceTraveled = float(row)
+            yield data
+            row += 1
+
+
+class Session:
+    """Sesión simulada: CSV, estadísticas y checkpoints como en UdpReceiver."""
+
+    def __init__(self, csv_path, recovered=None):
+        self.csv_path = csv_path
+        if recovered is None:
+            self.statistics, self.rows, laps_bytes = SessionStatistics(), 0, 0
+            with open(csv_path, "w", encoding="utf-8") as f:
+                f.write(ForzaTelemetryData.get_csv_header() + "\n")
+        else:
+            self.statistics, self.rows, laps_bytes = recovered
+        self.writer = CheckpointWriter(csv_path, laps_bytes)
+
+    def add(self, laps):
+        with open(self.csv_path, "a", encoding="utf-8") as f:
+            for data in lap_rows(laps):
+                f.write(data.to_csv_line() + "\n")
+                self.statistics.update(data)
+                self.rows += 1
+
+    def checkpoint(self):
+        state, finished_laps = self.statistics.checkpoint_state()
+        self.writer.write(state, finished_laps, self.rows)
+        self.statistics.mark_saved(finished_laps)
+        return finished_laps
+
+
+def count(stats):
+    return stats.get_statistics()["Speed"]["count"]
+
+
+def assert_same_statistics(recovered, expected):
+    assert count(recovered.session) == count(expected.session)
+    assert sorted(recovered.laps) == sorted(expected.laps)
+    for lap, stats in expected.laps.items():
+        got, want = recovered.laps[lap].get_statistics()["Speed"], stats.get_statistics()["Speed"]
+        assert got["count"] == want["count"]
+        assert got["mean"] == pytest.approx(want["mean"])
+        assert got["max"] == want["max"]
+
+
+def checkpoint_laps(csv_path):
+    with open(checkpoint_filename(csv_path), encoding="utf-8") as f:
+        return sorted(json.load(f)["statistics"]["laps"])
+
+
+def test_checkpoint_does_not_grow_with_finished_laps(tmp_path):
+    session = Session(str(tmp_path / "session.csv"))
+    session.add(range(30))
+    assert sorted(session.checkpoint()) == list(range(29))
+    assert checkpoint_laps(session.csv_path) == ["29"]
+    early = os.path.getsize(checkpoint_filename(session.csv_path))
+
+    session.add(range(30, 240))
+    # Solo se serializan las vueltas terminadas desde el checkpoint anterior
+    assert sorted(session.checkpoint()) == list(range(29, 239))
+    assert session.checkpoint() == {}
+    assert checkpoint_laps(session.csv_path) == ["239"]
+    # Con 8 veces más vueltas el checkpoint solo varía con los sketches de la sesión
+    assert os.path.getsize(checkpoint_filename(session.csv_path)) < 2 * early
+
+
+def test_recover_merges_lap_log_and_csv_tail(tmp_path):
+    session = Session(str(tmp_path / "session.csv"))
+    session.add([0, 1, 2])
+    session.checkpoint()
+    session.add([1, 3])  # se vuelve a la vuelta 1: su último registro es el que vale
+    session.checkpoint()
+    session.add([3, 4])  # filas posteriores al último checkpoint
+
+    recovered, csv_rows, laps_bytes = recover_session(session.csv_path)
+    assert csv_rows == session.rows
+    assert laps_bytes == os.path.getsize(checkpoint_laps_filename(session.csv_path))
+    assert_same_statistics(recovered, session.statistics)
+
+
+def test_lap_records_after_checkpoint_are_ignored(tmp_path):
+    session = Session(str(tmp_path / "session.csv"))
+    session.add([0, 1, 2])
+    session.checkpoint()
+    expected_rows = session.rows
+
+    # Cierre entre el registro de vueltas y el checkpoint: el registro lleva una vuelta de más
+    laps_path = checkpoint_laps_filename(session.csv_path)
+    committed = os.path.getsize(laps_path)
+    with open(laps_path, "a", encoding="utf-8") as f:
+        f.write('{"lap": 2, "statistics": {"truncated')
+
+    recovered = recover_session(session.csv_path)
+    assert recovered[1:] == (expected_rows, committed)
+    assert_same_statistics(recovered[0], session.statistics)
+
+    # Al reanudar se descarta lo que no pertenece a ningún checkpoint
+    resumed = Session(session.csv_path, recovered)
+    resumed.add([3, 4])
+    resumed.checkpoint()
+    statistics, _, _ = recover_session(session.csv_path)
+    assert sorted(statistics.laps) == [0, 1, 2, 3, 4]
+    assert count(statistics.session) == resumed.rows
+
+    remove_checkpoint(session.csv_path)
+    assert not os.path.exists(laps_path)
+    assert recover_session(session.csv_path) is None
+
+
+def test_receiver_checkpoint_counts_flushed_rows(tmp_path):
+    receiver = UdpReceiver({}, {}, telemetry_dir=str(tmp_path), checkpoint_interval_s=3600.0)
+    csv_path = receiver.generate_csv_filename()
+    receiver.begin_session(csv_path, False, write_interval_ms=0)
+    for row in range(100):
+        receiver.process_datagram(fm8_packet(row), row * 0.016)
+    # Las filas siguen en la cola del escritor (menos de FLUSH_ROWS y dentro de FLUSH_INTERVAL_S)
+    receiver.checkpoint()
+    wait_for(lambda: os.path.exists(checkpoint_filename(csv_path)))
+    with open(checkpoint_filename(csv_path), encoding="utf-8") as f:
+        csv_rows = json.load(f)["csv_rows"]
+    with open(csv_path, encoding="utf-8") as f:
+        assert csv_rows == len(f.readlines()) - 1 == 100
+
+    receiver.end_session()
+    assert not os.path.exists(checkpoint_filename(csv_path))
@@ -0,0 +1,155 @@
+# test_session_store.py
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from forza_telemetry_data import ForzaTelemetryData
+from session_store import (
+    STORE_FORMATS, TIME_INDEX_STRIDE, MappedSession, convert_csv, convert_csv_mapped, open_session_store,
+    read_csv_chunks
+)
+
+# Vueltas por tramos: la 1 vuelve a aparecer tras la 2 (p. ej. al rebobinar)
+LAP_RUNS = [(0, TIME_INDEX_STRIDE - 10), (1, TIME_INDEX_STRIDE + 300), (2, 700), (1, 2 * TIME_INDEX_STRIDE)]
+
+
+@pytest.fixture
+def session_csv(tmp_path):
+    """CSV de una sesión interrumpida (la última línea a medias) y las filas completas esperadas."""
+    csv_path = tmp_path / "forza_telemetry_20260101_120000.csv"
+    data = ForzaTelemetryData()
+    data.IsRaceOn = 1
+    data.TrackName = "Maple Valley"
+    row = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        f.write(ForzaTelemetryData.get_csv_header() + "\n")
+        for lap, count in LAP_RUNS:
+            for _ in range(count):
+                data.LapNumber = lap
+                data.TimestampMS = 1000 + 16 * row
+                data.Speed = float(row % 97)
+                data.Gear = row % 7
+                data.LastLap = 60.0 + lap
+                data.BestLap = 59.5 if lap else 0.0
+                data.CarName = "Supra" if row % 2 else "Civic"
+                f.write(data.to_csv_line() + "\n")
+                row += 1
+        f.write(data.to_csv_line()[:25])  # la sesión se cortó a mitad de una fila
+    expected = pd.read_csv(csv_path).dropna(subset=["Speed", "BestLap"])
+    assert len(expected) == row
+    return str(csv_path), expected
+
+
+def test_read_csv_chunks_drops_partial_line(session_csv):
+    csv_path, expected = session_csv
+    chunks = [chunk for chunk, _ in read_csv_chunks(csv_path, TIME_INDEX_STRIDE)]
+    df = pd.concat(chunks, ignore_index=True)
+    assert len(df) == len(expected)
+    assert df["LapNumber"].dtype == np.uint16
+    np.testing.assert_array_equal(df["TimestampMS"], expected["TimestampMS"])
+
+
+
+def test_read_csv_chunks_stops_when_cancelled(session_csv):
+    csv_path, _ = session_csv
+    cancel_event = threading.Event()
+    chunks = []
+    for chunk, _ in read_csv_chunks(csv_path, TIME_INDEX_STRIDE, cancel_event):
+        chunks.append(chunk)
+        cancel_event.set()
+    assert len(chunks) == 1
+
+
+def test_interrupted_session_converts_to_npz(session_csv):
+    csv_path, expected = session_csv
+    session = open_session_store(convert_csv(csv_path))
+    try:
+        by_lap = expected.groupby("LapNumber")
+        assert session.laps.tolist() == [0, 1, 2]
+        assert session.sample_counts.tolist() == by_lap.size().tolist()
+        assert session.best_lap_time == 59.5
+        # La vuelta 1 junta sus dos tramos, en orden de llegada
+        rows = expected[expected["LapNumber"] == 1]
+        frame = session.lap_frame(1, ["Speed", "CarName"])
+        np.testing.assert_array_equal(frame["TimestampMS"], rows["TimestampMS"])
+        np.testing.assert_array_equal(frame["Speed"], rows["Speed"].astype(np.float32))
+        assert frame["CarName"].astype(str).tolist() == rows["CarName"].tolist()
+    finally:
+        session.close()
+
+
+# Bloques de conversión justo sobre la rejilla del índice de tiempo, y desplazados
+@pytest.mark.parametrize("chunk_rows", [TIME_INDEX_STRIDE, TIME_INDEX_STRIDE // 2, TIME_INDEX_STRIDE + 123])
+def test_mapped_round_trip(session_csv, tmp_path, chunk_rows):
+    csv_path, expected = session_csv
+    store_path = convert_csv_mapped(csv_path, str(tmp_path / "session.fzses"), chunk_rows)
+    session = MappedSession(store_path)
+    try:
+        assert session.rows == len(expected)
+        assert session.laps.tolist() == [0, 1, 2]
+        by_lap = expected.groupby("LapNumber")
+        assert session.sample_counts.tolist() == by_lap.size().tolist()
+        assert session.best_lap_time == 59.5
+        assert session.last_lap_times.tolist() == [60.0, 61.0, 62.0]
+
+        # La vuelta 1 junta sus dos tramos, en orden de llegada
+        for lap, rows in by_lap:
+            frame = session.lap_frame(lap, ["Speed", "Gear", "CarName"])
+            np.testing.assert_array_equal(frame["TimestampMS"], rows["TimestampMS"])
+            np.testing.assert_array_equal(frame["Speed"], rows["Speed"].astype(np.float32))
+            np.testing.assert_array_equal(frame["Gear"], rows["Gear"])
+            assert frame["CarName"].astype(str).tolist() == rows["CarName"].tolist()
+        assert session.lap_frame(9) is None
+
+        # Índice de tiempo: en la rejilla, justo antes y después, entre filas y fuera de la sesión
+        timestamps = expected["TimestampMS"].to_numpy()
+        probes = [0, timestamps[0], timestamps[-1], timestamps[-1] + 1]
+        for row in range(0, len(timestamps), TIME_INDEX_STRIDE):
+            probes += [timestamps[row] - 1, timestamps[row], timestamps[row] + 1]
+        for probe in probes:
+            assert session.row_at_time(probe) == np.searchsorted(timestamps, probe, side="left")
+
+        start, end = timestamps[TIME_INDEX_STRIDE - 5], timestamps[2 * TIME_INDEX_STRIDE + 5]
+        window = session.time_frame(start, end, ["TimestampMS", "LapNumber"])
+        inside = expected[(expected["TimestampMS"] >= start) & (expected["TimestampMS"] < end)]
+        np.testing.assert_array_equal(window["TimestampMS"], inside["TimestampMS"])
+        np.testing.assert_array_equal(window["LapNumber"], inside["LapNumber"])
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("store_format", sorted(STORE_FORMATS))
+def test_interrupted_session_converts_to_every_format(session_csv, store_format):
+    csv_path, expected = session_csv
+    session = open_session_store(STORE_FORMATS[store_format](csv_path))
+    try:
+        assert sum(session.sample_counts.tolist()) == len(expected)
+        rows = expected[expected["LapNumber"] == 1]
+        np.testing.assert_array_equal(session.lap_frame(1, ["Speed"])["TimestampMS"], rows["TimestampMS"])
+    finally:
+        session.close()
+
+
+def test_truncated_store_is_rejected(session_csv, tmp_path):
+    csv_path, _ = session_csv
+    store_path = convert_csv_mapped(csv_path, str(tmp_path / "session.fzses"))
+    with open(store_path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 4)
+    with pytest.raises(ValueError):
+        MappedSession(store_path)
+
+
+def test_lap_cache_is_bounded(session_csv, tmp_path):
+    csv_path, _ = session_csv
+    session = MappedSession(convert_csv_mapped(csv_path, str(tmp_path / "session.fzses")))
+    session.LAP_CACHE_SIZE = 2
+    try:
+        speeds = {lap: session.read_column(lap, "Speed") for lap in (0, 1, 2)}
+        assert list(session._cache) == [1, 2]
+        session.read_column(1, "Speed")
+        session.read_column(0, "Speed")
+        assert list(session._cache) == [1, 0]
+        np.testing.assert_array_equal(session.read_column(2, "Speed"), speeds[2])
+        assert list(session._cache) == [0, 2]
+    finally:
+        session.close()
@@ -0,0 +1,107 @@
+# test_telemetry_parser.py
+import io
+import struct
+import numpy as np
+import pytest
+from forza_telemetry_data import ForzaTelemetryData, SLED_FIELDS, DASH_FIELDS, PACKET_FIELDS
+from telemetry_parser import TelemetryDataParser, PACKET_FORMATS
+
+# Layouts documentados de cada juego, por longitud; None marca bytes de relleno
+LAYOUTS = {
+    232: SLED_FIELDS,
+    311: SLED_FIELDS + DASH_FIELDS,
+    324: SLED_FIELDS + ((None, "12x"),) + DASH_FIELDS + ((None, "x"),),
+    331: PACKET_FIELDS,
+}
+INTEGER_RANGES = {"i": (-2 ** 31, 2 ** 31), "I": (0, 2 ** 32), "H": (0, 2 ** 16), "B": (0, 2 ** 8), "b": (-2 ** 7, 2 ** 7)}
+
+
+def make_packet(layout, seed=0) -> bytes:
+    """Paquete con un valor aleatorio (y sin NaN) en cada campo del layout."""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for name, fmt in layout:
+        if name is None:
+            chunks.append(struct.pack("<" + fmt))
+        elif fmt == "f":
+            chunks.append(struct.pack("<f", rng.normal(0.0, 1000.0)))
+        else:
+            low, high = INTEGER_RANGES[fmt]
+            chunks.append(struct.pack("<" + fmt, int(rng.integers(low, high))))
+    return b"".join(chunks)
+
+
+def legacy_parse(packet: bytes, layout=PACKET_FIELDS):
+    # Decodificación campo a campo de las versiones anteriores, como referencia
+    stream = io.BytesIO(packet)
+    data = ForzaTelemetryData()
+    for name, fmt in layout:
+        size = struct.calcsize("<" + fmt)
+        if name is None:
+            stream.read(size)
+        else:
+            setattr(data, name, struct.unpack("<" + fmt, stream.read(size))[0])
+    assert not stream.read()
+    return data
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("length", sorted(LAYOUTS))
+def test_parse_matches_legacy_decode(length, seed):
+    packet = make_packet(LAYOUTS[length], seed)
+    assert len(packet) == length
+    data = TelemetryDataParser.parse(packet)
+    assert data == legacy_parse(packet, LAYOUTS[length])
+    assert data.SpeedKph == data.Speed * 3.6
+
+
+def test_registry_covers_every_layout():
+    assert sorted(PACKET_FORMATS) == sorted(LAYOUTS)
+    assert TelemetryDataParser.FM8_PACKET_LENGTH == 331
+
+
+def test_fh_packets_have_no_track_ordinal():
+    # El relleno de FH4/FH5 no es el bloque de FM8: TrackOrdinal se queda a 0
+    data = TelemetryDataParser.parse(make_packet(LAYOUTS[324]))
+    assert data.TrackOrdinal == 0
+    assert data.TireWearFrontLeft == 0.0
+
+
+@pytest.mark.parametrize("length", [0, 100, 233, 330, 332, 1024])
+def test_parse_unknown_length_returns_none(length):
+    assert TelemetryDataParser.parse(bytes(length)) is None
+
+
+def test_parse_accepts_memoryview():
+    packet = make_packet(PACKET_FIELDS)
+    assert TelemetryDataParser.parse(memoryview(packet)) == TelemetryDataParser.parse(packet)
+
+
+@pytest.mark.parametrize("length", sorted(LAYOUTS))
+def test_parse_many_matches_parse(length):
+    packets = [make_packet(LAYOUTS[length], seed) for seed in range(20)]
+    columns = TelemetryDataParser.parse_many(b"".join(packets), length)
+    for row, packet in enumerate(packets):
+        data = TelemetryDataParser.parse(packet)
+        for name, _ in LAYOUTS[length]:
+            if name is not None:
+                assert columns[name][row] == getattr(data, name), name
+        if length != 232:
+            assert columns["SpeedKph"][row] == pytest.approx(data.SpeedKph)
+            assert columns["TireTempRearLeftCelsius"][row] == pytest.approx(data.TireTempRearLeftCelsius)
+
+
+@pytest.mark.parametrize("size", [1, 330, 332, 2 * 331 - 1])
+def test_parse_many_rejects_partial_packets(size):
+    with pytest.raises(ValueError):
+        TelemetryDataParser.parse_many(bytes(size))
+
+
+def test_parse_many_of_empty_buffer():
+    columns = TelemetryDataParser.parse_many(b"")
+    assert len(columns["Speed"]) == 0
+
+
+def test_parse_many_rejects_unknown_length():
+    with pytest.raises(ValueError):
+        TelemetryDataParser.parse_many(bytes(2 * 330), 330)
@@ -0,0 +1,84 @@
+# test_telemetry_sqlite.py
+import sqlite3
+import numpy as np
+from forza_telemetry_data import ForzaTelemetryData
+from telemetry_sqlite import SqliteSession, SqliteTelemetryWriter, list_sessions
+
+SESSION_KEY = "/telemetry/forza_telemetry_20260101_120000.csv"
+# (vuelta, muestras): la vuelta 1 se reparte entre varios lotes y vuelve a aparecer tras la 2
+LAP_RUNS = [(0, 30), (1, 45), (2, 20), (1, 10)]
+
+
+def samples(lap_runs, first_row=0):
+    row = first_row
+    for lap, count in lap_runs:
+        for _ in range(count):
+            data = ForzaTelemetryData()
+            data.IsRaceOn = 1
+            data.LapNumber = lap
+            data.TimestampMS = 1000 + 16 * row
+            data.Speed = float(row)
+            data.LastLap = 60.0 + lap
+            data.BestLap = 0.0 if lap == 0 else 70.0 - row / 100
+            data.CarName = "Supra"
+            yield data
+            row += 1
+
+
+def write_session(db_path, lap_runs, append=False, first_row=0):
+    writer = SqliteTelemetryWriter(db_path, SESSION_KEY, flush_rows=16, append=append, drop_when_full=False)
+    writer.start()
+    for data in samples(lap_runs, first_row):
+        writer.write(data)
+    writer.close()
+    return writer
+
+
+def test_laps_are_upserted_across_batches(tmp_path):
+    db_path = str(tmp_path / "telemetry.db")
+    writer = write_session(db_path, LAP_RUNS)
+    assert writer.flushes > len(LAP_RUNS)
+
+    rows = list(samples(LAP_RUNS))
+    with sqlite3.connect(db_path) as conn:
+        laps = conn.execute("SELECT LapNumber, Rows, FirstTimestampMS, LastTimestampMS, LastLap, BestLap "
+                            "FROM Laps WHERE SessionId = ? ORDER BY LapNumber", (writer.session_id,)).fetchall()
+    for lap, count, first_ms, last_ms, last_lap, best_lap in laps:
+        lap_rows = [data for data in rows if data.LapNumber == lap]
+        assert count == len(lap_rows)
+        assert (first_ms, last_ms) == (lap_rows[0].TimestampMS, lap_rows[-1].TimestampMS)
+        assert last_lap == 60.0 + lap
+        best_laps = [data.BestLap for data in lap_rows if data.BestLap > 0]
+        assert best_lap == (min(best_laps) if best_laps else None)
+    assert [lap[0] for lap in laps] == [0, 1, 2]
+
+    # Reanudar añade a la misma sesión; sin append, la sesión empieza de cero
+    write_session(db_path, [(2, 5), (3, 7)], append=True, first_row=len(rows))
+    assert list_sessions(db_path)[0]["Rows"] == len(rows) + 12
+    write_session(db_path, [(0, 4)])
+    assert [(s["Laps"], s["Rows"]) for s in list_sessions(db_path)] == [(1, 4)]
+
+
+def test_lap_is_read_in_time_order_through_the_index(tmp_path):
+    db_path = str(tmp_path / "telemetry.db")
+    writer = write_session(db_path, LAP_RUNS)
+    expected = [data for data in samples(LAP_RUNS) if data.LapNumber == 1]
+
+    session = SqliteSession(db_path, writer.session_id)
+    try:
+        assert session.laps.tolist() == [0, 1, 2]
+        assert session.sample_counts.tolist() == [30, 55, 20]
+        frame = session.lap_frame(1, ["Speed", "CarName"])
+        np.testing.assert_array_equal(frame["TimestampMS"], [data.TimestampMS for data in expected])
+        np.testing.assert_array_equal(frame["Speed"], [data.Speed for data in expected])
+        assert frame["RelativeTime"].iloc[0] == 0.0
+        assert set(frame["CarName"].astype(str)) == {"Supra"}
+        assert session.lap_frame(9) is None
+
+        plan = " ".join(row[-1] for row in session._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT Speed FROM Samples WHERE SessionId = ? AND LapNumber = ? "
+            "ORDER BY TimestampMS", (writer.session_id, 1)))
+        assert "SamplesBySessionLap" in plan
+        assert "TEMP B-TREE" not in plan  # el orden lo da el índice
+    finally:
+        session.close()
@@ -0,0 +1,60 @@
+# test_telemetry_statistics.py
+import json
+import numpy as np
+import pytest
+from telemetry_statistics import combine_moments, TelemetryStatistics, SessionStatistics, NUMERIC_COLUMNS
+
+
+def moments(values):
+    # (n, mean, M2, M3, M4) de un bloque, con las sumas de potencias de las desviaciones
+    n = len(values)
+    if n == 0:
+        return 0, np.zeros(values.shape[1:]), 0.0, 0.0, 0.0
+    d = values - values.mean(axis=0)
+    return n, values.mean(axis=0), (d ** 2).sum(axis=0), (d ** 3).sum(axis=0), (d ** 4).sum(axis=0)
+
+
+@pytest.mark.parametrize("sizes", [(1, 1), (10, 1000), (1000, 10), (0, 500), (500, 0), (7, 13, 64, 1, 300)])
+def test_combine_moments_matches_numpy(sizes):
+    rng = np.random.default_rng(sum(sizes))
+    # Dos columnas con escalas y sesgos distintos
+    values = np.column_stack([rng.gamma(2.0, 3.0, sum(sizes)), rng.normal(1e4, 5.0, sum(sizes))])
+    parts = np.split(values, np.cumsum(sizes)[:-1])
+
+    combined = moments(parts[0])
+    for part in parts[1:]:
+        combined = combine_moments(combined, moments(part))
+
+    n, mean, m2, m3, m4 = combined
+    expected_n, expected_mean, expected_m2, expected_m3, expected_m4 = moments(values)
+    assert n == expected_n
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-12)
+    np.testing.assert_allclose(m2, expected_m2, rtol=1e-9)
+    # M3 puede estar cerca de 0: se compara normalizado, como en la asimetría y la curtosis
+    np.testing.assert_allclose(m3 / m2 ** 1.5, expected_m3 / expected_m2 ** 1.5, atol=1e-9)
+    np.testing.assert_allclose(m4 / m2 ** 2, expected_m4 / expected_m2 ** 2, rtol=1e-9)
+
+
+def test_blocks_and_merge_match_numpy():
+    rng = np.random.default_rng(0)
+    columns = {name: rng.normal(i, 1.0 + i % 3, 1000) for i, name in enumerate(NUMERIC_COLUMNS)}
+    first, second = TelemetryStatistics(), TelemetryStatistics()
+    first.update_columns({name: values[:300] for name, values in columns.items()})
+    second.update_columns({name: values[300:] for name, values in columns.items()})
+    first.merge(second)
+
+    stats = first.get_statistics()
+    for name in ("Speed", "CurrentEngineRpm", "Accel"):
+        values = columns[name]
+        assert stats[name]["count"] == len(values)
+        assert stats[name]["mean"] == pytest.approx(values.mean())
+        assert stats[name]["std"] == pytest.approx(values.std(ddof=1))
+        assert stats[name]["min"] == values.min()
+        assert stats[name]["max"] == values.max()
+
+
+def test_empty_state_is_valid_json():
+    state = SessionStatistics().to_state()
+    restored = SessionStatistics.from_state(json.loads(json.dumps(state, allow_nan=False)))
+    assert restored.session.count == 0
+    assert np.all(np.isposinf(restored.session.min))
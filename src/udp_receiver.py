@@ -3,115 +3,491 @@ import os
 import socket
 import asyncio
 import datetime
+import glob
 import time
-import threading
 import json
-from telemetry_parser import TelemetryDataParser
+from concurrent.futures import ThreadPoolExecutor
+from telemetry_parser import TelemetryDataParser, PACKET_FORMATS
+from packet_filter import PacketFilter, default_rules
 from forza_telemetry_data import ForzaTelemetryData
-from telemetry_statistics import TelemetryStatistics
+from telemetry_statistics import SessionStatistics, STATE_EXTENSION
+from csv_telemetry_writer import CsvTelemetryWriter
+from raw_capture import RawCaptureWriter, RAW_CAPTURE_EXTENSION
+from session_checkpoint import (
+    CheckpointWriter, remove_checkpoint, recover_statistics, recover_session, find_interrupted_sessions
+)
+from session_store import STORE_FORMATS
+from telemetry_sqlite import SqliteTelemetryWriter, database_path
+
+
+def read_kernel_drops(sock: socket.socket):
+    """
+    Datagramas que el kernel descartó para este socket por desbordamiento del
+    buffer de recepción (columna "drops" de /proc/net/udp). None si no está
+    disponible (p. ej. fuera de Linux).
+    """
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        with open("/proc/net/udp", "r", encoding="ascii") as f:
+            next(f)
+            for line in f:
+                columns = line.split()
+                if columns[9] == inode:
+                    return int(columns[-1])
+    except (OSError, ValueError, IndexError, StopIteration):
+        pass
+    return None
+
+
+def write_statistics_files(statistics: SessionStatistics, csv_filename: str) -> str:
+    """
+    Escribe el JSON de estadísticas y el estado de los acumuladores de una
+    sesión ya cerrada. Devuelve la ruta del JSON.
+    """
+    stats = statistics.get_statistics()
+    json_filename = csv_filename.replace(".csv", ".json")
+    with open(json_filename, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=4)
+    print(f"Estadísticas guardadas en {json_filename}")
+
+    # Estado de los acumuladores, para poder fusionar sesiones sin releer el CSV
+    state_filename = csv_filename.replace(".csv", STATE_EXTENSION)
+    with open(state_filename, 'w', encoding='utf-8') as f:
+        json.dump(statistics.to_state(), f)
+    return json_filename
+
+
+def write_columnar_store(csv_filename: str, store_format: str):
+    # Copia columnar del CSV ya cerrado, para que el visor la abra sin releer el texto
+    try:
+        store_filename = STORE_FORMATS[store_format](csv_filename)
+        print(f"Sesión columnar guardada en {store_filename}")
+    except Exception as e:
+        print(f"No se pudo guardar la sesión columnar de {csv_filename}: {e}")
+
+
+def record_in_catalog(catalog, csv_filename: str):
+    # Fila del catálogo de sesiones, con las rutas de los ficheros ya escritos
+    try:
+        catalog.record_session(csv_filename)
+    except Exception as e:
+        print(f"No se pudo añadir {csv_filename} al catálogo de sesiones: {e}")
+
+
+def _finalize_session(csv_writer: CsvTelemetryWriter, statistics: SessionStatistics, csv_filename: str,
+                      columnar_store: str = None, catalog=None, sqlite_writer: SqliteTelemetryWriter = None) -> str:
+    # Se ejecuta fuera del event-loop: vacía el CSV (y SQLite) y calcula/escribe las estadísticas.
+    # Un escritor que falló no impide cerrar el otro ni guardar las estadísticas.
+    if sqlite_writer is not None:
+        try:
+            sqlite_writer.close()
+        except Exception as e:
+            print(f"Error en la copia SQLite de {csv_filename}: {e}")
+        metrics = sqlite_writer.get_metrics()
+        print(f"SQLite: {metrics['rows_written']} filas escritas, {metrics['rows_dropped']} descartadas, "
+              f"{metrics['flushes']} transacciones, latencia media {metrics['avg_write_latency_ms']:.2f} ms")
+    if csv_writer is not None:
+        try:
+            csv_writer.close()
+        except Exception as e:
+            print(f"Error al escribir {csv_filename}: {e}")
+        metrics = csv_writer.get_metrics()
+        print(f"CSV: {metrics['rows_written']} filas escritas, {metrics['rows_dropped']} descartadas, "
+              f"cola máx. {metrics['max_queue_depth']}, latencia de escritura "
+              f"media {metrics['avg_write_latency_ms']:.2f} ms / máx. {metrics['max_write_latency_ms']:.2f} ms")
+    json_filename = write_statistics_files(statistics, csv_filename)
+    remove_checkpoint(csv_filename)
+    if columnar_store and os.path.exists(csv_filename):
+        write_columnar_store(csv_filename, columnar_store)
+    if catalog is not None and os.path.exists(csv_filename):
+        record_in_catalog(catalog, csv_filename)
+    return json_filename
+
+
+def _finalize_interrupted_sessions(csv_filenames: list, columnar_store: str = None, catalog=None) -> list:
+    # Cierra, desde su último checkpoint, sesiones que no llegaron a terminar
+    json_filenames = []
+    for csv_filename in csv_filenames:
+        statistics = recover_statistics(csv_filename)
+        if statistics is None:
+            continue
+        json_filenames.append(write_statistics_files(statistics, csv_filename))
+        remove_checkpoint(csv_filename)
+        if columnar_store:
+            write_columnar_store(csv_filename, columnar_store)
+        if catalog is not None:
+            record_in_catalog(catalog, csv_filename)
+    return json_filenames
+
+
+class _TelemetryDatagramProtocol(asyncio.DatagramProtocol):
+    """Alternativa para event-loops sin add_reader (ProactorEventLoop en Windows)."""
+
+    def __init__(self, receiver):
+        self._receiver = receiver
+
+    def datagram_received(self, data, addr):
+        # Un datagrama por aviso: aquí no hay lotes
+        self._receiver.reader_wakeups += 1
+        self._receiver.max_batch = 1
+        now_ns = time.time_ns()
+        self._receiver.handle_datagram(data, addr, now_ns, now_ns / 1e9)
+
 
 class UdpReceiver:
     DEFAULT_PORT = 5300
     WRITE_INTERVAL_MS = 100  # 80 milisegundos (~12.5 Hz)
+    RECV_BUFFER_SIZE = 4 * 1024 * 1024  # SO_RCVBUF solicitado (el kernel puede limitarlo)
+    MAX_DATAGRAM_SIZE = 1024
+    MAX_BATCH = 512  # datagramas leídos como máximo por cada aviso de lectura
+    CHECKPOINT_INTERVAL_S = 30.0  # cada cuánto se guarda el estado de las estadísticas
 
-    def __init__(self, car_name_dict: dict, track_name_dict: dict):
+    def __init__(self, car_name_dict: dict, track_name_dict: dict, telemetry_dir: str = None, port: int = DEFAULT_PORT,
+                 recv_buffer_size: int = RECV_BUFFER_SIZE, sectors: int = 0,
+                 checkpoint_interval_s: float = CHECKPOINT_INTERVAL_S, columnar_store: str = None,
+                 catalog=None, sqlite_sink: str = None):
         self._car_name_dict = car_name_dict
         self._track_name_dict = track_name_dict
-        self._csv_lock = threading.Lock()
+        if telemetry_dir is None:
+            telemetry_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Telemetry")
+        self._telemetry_dir = telemetry_dir
+        self.port = port
+        self._recv_buffer_size = recv_buffer_size
+        self._loop = None
+        self._reader_registered = False
+        self._transport = None
+        self.reader_wakeups = 0  # avisos de lectura del event-loop
+        self.max_batch = 0  # mayor número de datagramas drenados en un solo aviso
+        self.kernel_drops = None
+        self._csv_writer = None  # CsvTelemetryWriter de la sesión en curso
+        self._sqlite_writer = None  # SqliteTelemetryWriter de la sesión en curso (si sqlite_sink)
         self._listening_task = None
+        self._resume_task = None  # lectura del checkpoint de una sesión que se va a reanudar
         self._udp_socket = None
         self._stop_event = asyncio.Event()
         self.is_listening = False
+        self._last_session_filename = None  # CSV de la última sesión empezada (puede no existir aún)
         self._csv_filename = self.generate_csv_filename()
-        self._statistics = TelemetryStatistics()  # Agregador de estadísticas
+        self.sectors = sectors  # sectores por vuelta para las estadísticas (0 = sin sectores)
+        self._statistics = SessionStatistics(sectors)  # Agregador de estadísticas (sesión, vuelta y sector)
+        self.rejected_packets = {}  # longitud de datagrama desconocida -> número de paquetes descartados
+        self.packets_received = 0
+        self._raw_capture = None  # RawCaptureWriter si se graban los paquetes sin procesar
+        self.packet_filter = PacketFilter(default_rules(False))  # reglas previas a la decodificación
+        self.throttled_packets = 0  # paquetes válidos descartados por WRITE_INTERVAL_MS
+        self._write_interval_ms = UdpReceiver.WRITE_INTERVAL_MS
+        self._last_write_time = None
+        self._checkpoint_interval_s = checkpoint_interval_s  # None o 0 = sin checkpoints
+        self._checkpoints_enabled = False
+        self._checkpoint_writer = None  # CheckpointWriter de la sesión en curso
+        self._last_checkpoint_time = None
+        self.checkpoints_written = 0
+        self._csv_rows_base = 0  # filas que ya tenía el CSV al empezar (o reanudar) la sesión
+        # Cierre de sesiones en segundo plano: un solo hilo, así se terminan en orden
+        self._finalize_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-finalize")
+        # Reconstrucción del catálogo en su propio hilo: puede tardar (lee los CSV sin
+        # .state.json) y no debe retrasar los cierres ni los checkpoints
+        self._catalog_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-catalog")
+        self.finalizing = None  # Future del último cierre en segundo plano (devuelve la ruta del JSON)
+        self.on_session_finalized = None  # callback(future) al terminar cada cierre en segundo plano
+        # Al cerrar cada sesión, copia en formato columnar: None, "npz" o "fzses" (ver session_store)
+        self.columnar_store = columnar_store
+        self.catalog = catalog  # SessionCatalog al que se añade cada sesión cerrada (o None)
+        # Copia de las muestras en SQLite (ver telemetry_sqlite): None, "session" (una base por
+        # sesión junto al CSV) o "shared" (Telemetry/telemetry.db para todas)
+        self.sqlite_sink = sqlite_sink
 
     def generate_csv_filename(self) -> str:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        telemetry_dir = os.path.join(base_dir, "Telemetry")
-        os.makedirs(telemetry_dir, exist_ok=True)
+        os.makedirs(self._telemetry_dir, exist_ok=True)
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"forza_telemetry_{timestamp}.csv"
-        return os.path.join(telemetry_dir, filename)
+        # El nombre tiene resolución de un segundo: si se para y se vuelve a empezar
+        # dentro del mismo segundo, se añade un contador para no pisar la sesión
+        # anterior (su CSV, JSON, estado o captura, que pueden no existir aún)
+        base = os.path.join(self._telemetry_dir, f"forza_telemetry_{timestamp}")
+        stem, suffix = base, 1
+        while stem + ".csv" == self._last_session_filename or glob.glob(glob.escape(stem) + ".*"):
+            stem = f"{base}_{suffix}"
+            suffix += 1
+        return stem + ".csv"
 
     def save_to_csv(self, data: ForzaTelemetryData):
-        with self._csv_lock:
-            file_exists = os.path.exists(self._csv_filename)
-            mode = "a" if file_exists else "w"
-            with open(self._csv_filename, mode, newline='', encoding='utf-8') as f:
-                if not file_exists:
-                    header = ForzaTelemetryData.get_csv_header()
-                    f.write(header + "\n")
-                line = data.to_csv_line()
-                f.write(line + "\n")
-
-    async def listen_loop(self, wait_for_lap_zero: bool):
-        loop = asyncio.get_running_loop()
-        last_write_time = time.time()
-        has_started_logging = not wait_for_lap_zero
+        # Solo encola: la escritura a disco la hacen los hilos de CsvTelemetryWriter (y SqliteTelemetryWriter)
+        if self._csv_writer is not None:
+            self._csv_writer.write(data)
+        if self._sqlite_writer is not None:
+            self._sqlite_writer.write(data)
+
+    def begin_session(self, csv_filename: str, wait_for_lap_zero: bool,
+                      write_interval_ms: float = WRITE_INTERVAL_MS, offline: bool = False,
+                      filter_rules: list = None, statistics: SessionStatistics = None, csv_rows: int = 0,
+                      checkpoint_laps_bytes: int = 0):
+        """
+        Prepara CSV, estadísticas y estado de filtrado para una nueva sesión.
+        Con offline=True el escritor de CSV espera en vez de descartar filas
+        y no se guardan checkpoints.
+        filter_rules sustituye a las reglas por defecto de packet_filter.default_rules.
+        Con `statistics` (recuperadas de un checkpoint) se reanuda la sesión:
+        se sigue acumulando sobre ellas y se añaden filas al CSV existente,
+        que ya tiene csv_rows filas, y los checkpoints siguen su registro de
+        vueltas a partir de checkpoint_laps_bytes.
+        """
+        self._csv_filename = csv_filename
+        self._last_session_filename = csv_filename
+        self._csv_writer = CsvTelemetryWriter(self._csv_filename, drop_when_full=not offline,
+                                              append=statistics is not None)
+        self._csv_writer.start()
+        if self.sqlite_sink:
+            db_path = database_path(self._telemetry_dir, csv_filename, self.sqlite_sink == "shared")
+            self._sqlite_writer = SqliteTelemetryWriter(db_path, os.path.abspath(csv_filename),
+                                                        drop_when_full=not offline, append=statistics is not None)
+            self._sqlite_writer.start()
+        self._statistics = statistics if statistics is not None else SessionStatistics(self.sectors)
+        self._csv_rows_base = csv_rows if statistics is not None else 0
+        self._checkpoints_enabled = bool(self._checkpoint_interval_s) and not offline
+        self._checkpoint_writer = CheckpointWriter(csv_filename, checkpoint_laps_bytes)
+        self._last_checkpoint_time = None
+        self.checkpoints_written = 0
+        self.rejected_packets = {}
+        self.packets_received = 0
+        if filter_rules is None:
+            filter_rules = default_rules(wait_for_lap_zero)
+        self.packet_filter = PacketFilter(filter_rules)
+        self.throttled_packets = 0
+        self._write_interval_ms = write_interval_ms
+        self._last_write_time = None
+
+    def process_datagram(self, data_bytes: bytes, now: float):
+        """
+        Filtra, decima y guarda un datagrama recibido en el instante `now` (s).
+        Se usa tanto en la recepción en vivo como al regenerar desde una captura.
+        """
+        self.packets_received += 1
+        if len(data_bytes) not in PACKET_FORMATS:
+            # Formato desconocido: solo se cuenta, sin excepción ni mensaje por paquete
+            length = len(data_bytes)
+            self.rejected_packets[length] = self.rejected_packets.get(length, 0) + 1
+            return
+
+        if self._last_write_time is None:
+            self._last_write_time = now
+
+        # Los filtros y la decimación se deciden leyendo campos sueltos;
+        # solo los paquetes que se van a guardar se decodifican completos.
+        if self.packet_filter.check(data_bytes) is not None:
+            return
+
+        if (now - self._last_write_time) * 1000 < self._write_interval_ms:
+            self.throttled_packets += 1
+            return
 
-        while not self._stop_event.is_set():
+        telemetry_data = TelemetryDataParser.parse(data_bytes)
+        telemetry_data.CarName = self._car_name_dict.get(
+            telemetry_data.CarOrdinal, f"UnknownCar_{telemetry_data.CarOrdinal}"
+        )
+        telemetry_data.TrackName = self._track_name_dict.get(
+            telemetry_data.TrackOrdinal, f"UnknownTrack_{telemetry_data.TrackOrdinal}"
+        )
+        self.save_to_csv(telemetry_data)
+        self._statistics.update(telemetry_data)
+        self._last_write_time = now
+
+        if self._checkpoints_enabled:
+            if self._last_checkpoint_time is None:
+                self._last_checkpoint_time = now
+            elif now - self._last_checkpoint_time >= self._checkpoint_interval_s:
+                self.checkpoint()
+                self._last_checkpoint_time = now
+
+    def checkpoint(self):
+        """
+        Guarda el estado de las estadísticas junto al CSV. Aquí solo se copia
+        el estado de la sesión, de la vuelta actual y de las vueltas terminadas
+        desde el último checkpoint (coste proporcional al número de campos).
+        La escritura a disco la hace el hilo escritor del CSV después de volcar
+        las filas encoladas antes, así que el número de filas del CSV que
+        incluye el estado es el que ese hilo ya ha escrito en ese momento.
+        """
+        if self._csv_writer is None:
+            return
+        state, finished_laps = self._statistics.checkpoint_state()
+        checkpoint_writer, csv_rows_base = self._checkpoint_writer, self._csv_rows_base
+        if not self._csv_writer.call_after_flush(
+                lambda rows_written: checkpoint_writer.write(state, finished_laps, csv_rows_base + rows_written)):
+            # Cola llena o escritor parado: se intentará en el siguiente intervalo
+            return
+        self._statistics.mark_saved(finished_laps)
+        self.checkpoints_written += 1
+
+    def end_session(self, background: bool = False):
+        """
+        Cierra la sesión: informa de descartes, vacía el CSV y escribe las
+        estadísticas. Los acumuladores y el escritor se separan del receptor,
+        así que se puede empezar otra sesión en cuanto esta función vuelve.
+        Con background=True el cierre se hace en un hilo aparte y se devuelve
+        un concurrent.futures.Future con la ruta del JSON; si no, se espera.
+        """
+        for length, count in sorted(self.rejected_packets.items()):
+            print(f"Descartados {count} paquetes de longitud desconocida ({length} bytes).")
+        rejections = ", ".join(f"{name}: {count}" for name, count in self.packet_filter.rejections.items())
+        print(f"Filtrados antes de decodificar: {rejections}; por intervalo de escritura: {self.throttled_packets}.")
+
+        csv_writer, statistics, csv_filename = self._csv_writer, self._statistics, self._csv_filename
+        sqlite_writer = self._sqlite_writer
+        self._csv_writer = None
+        self._sqlite_writer = None
+        self._statistics = SessionStatistics(self.sectors)
+        if not background:
+            return _finalize_session(csv_writer, statistics, csv_filename, self.columnar_store, self.catalog,
+                                     sqlite_writer)
+
+        future = self._finalize_executor.submit(_finalize_session, csv_writer, statistics, csv_filename,
+                                                self.columnar_store, self.catalog, sqlite_writer)
+        future.add_done_callback(self._report_finalized)
+        self.finalizing = future
+        return future
+
+    def recover_interrupted_sessions(self):
+        """
+        Escribe en segundo plano el JSON de las sesiones de telemetry_dir que
+        se quedaron sin cerrar (tienen checkpoint). Devuelve un Future con la
+        lista de JSON generados.
+        """
+        pending = [csv_filename for csv_filename in find_interrupted_sessions(self._telemetry_dir)
+                   if not (self.is_listening and csv_filename == self._csv_filename)]
+        return self._finalize_executor.submit(_finalize_interrupted_sessions, pending, self.columnar_store,
+                                              self.catalog)
+
+    def refresh_catalog(self):
+        """
+        Pone al día el catálogo con las sesiones ya existentes en telemetry_dir,
+        en un hilo propio (los cierres de sesión siguen añadiendo las suyas
+        mientras tanto). Devuelve un Future con el número de sesiones resumidas.
+        """
+        return self._catalog_executor.submit(self.catalog.rebuild, self._telemetry_dir)
+
+    def _report_finalized(self, future):
+        if future.exception() is not None:
+            print(f"Error al cerrar la sesión: {future.exception()}")
+        if self.on_session_finalized is not None:
+            self.on_session_finalized(future)
+
+    def handle_datagram(self, data_bytes: bytes, addr, now_ns: int, now: float):
+        if self._raw_capture is not None:
+            self._raw_capture.write(data_bytes, addr, now_ns)
+        try:
+            self.process_datagram(data_bytes, now)
+        except Exception as ex:
+            print(f"Error en recepción/parsing: {ex}")
+
+    def _drain_socket(self):
+        # Un aviso de lectura drena el socket hasta EAGAIN (o MAX_BATCH), en vez
+        # de reanudar una corrutina y crear un future por cada datagrama.
+        sock = self._udp_socket
+        if sock is None:
+            return
+        self.reader_wakeups += 1
+        batch = 0
+        while batch < UdpReceiver.MAX_BATCH:
             try:
-                data_bytes, addr = await loop.sock_recvfrom(self._udp_socket, 1024)
-                telemetry_data = TelemetryDataParser.parse(data_bytes)
-
-                if telemetry_data.IsRaceOn == 0:
-                    continue
-
-                if wait_for_lap_zero and not has_started_logging:
-                    if telemetry_data.LapNumber == 0:
-                        has_started_logging = True
-                        print("Lap 0 detectada, iniciando grabación de telemetría...")
-                    else:
-                        continue
-
-                if telemetry_data.Speed < 0.5:
-                    continue
-
-                if telemetry_data.Gear == 11:
-                    continue
-
-                now = time.time()
-                if (now - last_write_time) * 1000 >= UdpReceiver.WRITE_INTERVAL_MS:
-                    telemetry_data.CarName = self._car_name_dict.get(
-                        telemetry_data.CarOrdinal, f"UnknownCar_{telemetry_data.CarOrdinal}"
-                    )
-                    telemetry_data.TrackName = self._track_name_dict.get(
-                        telemetry_data.TrackOrdinal, f"UnknownTrack_{telemetry_data.TrackOrdinal}"
-                    )
-                    self.save_to_csv(telemetry_data)
-                    self._statistics.update(telemetry_data)
-                    last_write_time = now
-
-            except asyncio.CancelledError:
-                print("Recepción cancelada, saliendo del bucle de escucha...")
+                data_bytes, addr = sock.recvfrom(UdpReceiver.MAX_DATAGRAM_SIZE)
+            except (BlockingIOError, InterruptedError):
                 break
-            except Exception as ex:
-                print(f"Error en recepción/parsing: {ex}")
+            except OSError as ex:
+                print(f"Error en recepción: {ex}")
+                break
+            batch += 1
+            # Hora de cada datagrama (no una por lote): la usan la captura y la decimación
+            now_ns = time.time_ns()
+            self.handle_datagram(data_bytes, addr, now_ns, now_ns / 1e9)
+        if batch > self.max_batch:
+            self.max_batch = batch
+
+    async def listen_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                loop.add_reader(self._udp_socket, self._drain_socket)
+                self._reader_registered = True
+            except NotImplementedError:
+                self._transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _TelemetryDatagramProtocol(self), sock=self._udp_socket
+                )
+            await self._stop_event.wait()
+        except asyncio.CancelledError:
+            print("Recepción cancelada, saliendo del bucle de escucha...")
 
     def write_statistics_json(self):
-        stats = self._statistics.get_statistics()
-        json_filename = self._csv_filename.replace(".csv", ".json")
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, indent=4)
-        print(f"Estadísticas guardadas en {json_filename}")
-
-    def start_listening(self, wait_for_lap_zero: bool):
-        if self.is_listening:
+        return write_statistics_files(self._statistics, self._csv_filename)
+
+    def start_listening(self, wait_for_lap_zero: bool, record_raw: bool = False, resume_csv: str = None):
+        if self.is_listening or (self._resume_task is not None and not self._resume_task.done()):
             print("La recepción ya está en marcha. Usa 'stop' antes de iniciar de nuevo.")
             return
-        self._csv_filename = self.generate_csv_filename()
-        print(f"Creando un nuevo archivo CSV: {self._csv_filename}")
+        if resume_csv:
+            # El checkpoint y las filas del CSV posteriores se leen fuera del event-loop
+            loop = asyncio.get_running_loop()
+            recovery = loop.run_in_executor(self._finalize_executor, recover_session, resume_csv)
+            self._resume_task = asyncio.create_task(
+                self._resume_listening(recovery, wait_for_lap_zero, record_raw, resume_csv))
+            return
+        self._start_listening(wait_for_lap_zero, record_raw)
+
+    async def _resume_listening(self, recovery, wait_for_lap_zero: bool, record_raw: bool, resume_csv: str):
+        try:
+            recovered = await recovery
+        except Exception as ex:
+            print(f"No se pudo recuperar la sesión {resume_csv}: {ex}")
+            recovered = None
+        self._start_listening(wait_for_lap_zero, record_raw, resume_csv, recovered)
+
+    def _start_listening(self, wait_for_lap_zero: bool, record_raw: bool, resume_csv: str = None, recovered=None):
+        if recovered is not None:
+            statistics, csv_rows, laps_bytes = recovered
+            csv_filename = resume_csv
+            print(f"Reanudando la sesión desde su checkpoint: {csv_filename}")
+            self.begin_session(csv_filename, wait_for_lap_zero, statistics=statistics, csv_rows=csv_rows,
+                               checkpoint_laps_bytes=laps_bytes)
+        else:
+            csv_filename = self.generate_csv_filename()
+            print(f"Creando un nuevo archivo CSV: {csv_filename}")
+            self.begin_session(csv_filename, wait_for_lap_zero)
+
+        if record_raw:
+            capture_filename = csv_filename.replace(".csv", RAW_CAPTURE_EXTENSION)
+            if os.path.exists(capture_filename):
+                # Sesión reanudada: no se sobrescribe la captura anterior
+                capture_filename = self.generate_csv_filename().replace(".csv", RAW_CAPTURE_EXTENSION)
+            self._raw_capture = RawCaptureWriter(capture_filename)
+            print(f"Grabando paquetes sin procesar en {capture_filename}")
 
         self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._udp_socket.bind(("", UdpReceiver.DEFAULT_PORT))
+        try:
+            self._udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._recv_buffer_size)
+        except OSError as ex:
+            print(f"No se pudo ajustar SO_RCVBUF: {ex}")
+        self._udp_socket.bind(("", self.port))
         self._udp_socket.setblocking(False)
+        rcvbuf = self._udp_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        print(f"Buffer de recepción UDP: {rcvbuf} bytes.")
 
+        self._loop = asyncio.get_running_loop()
+        self._reader_registered = False
+        self._transport = None
+        self.reader_wakeups = 0
+        self.max_batch = 0
+        self.kernel_drops = None
         self._stop_event.clear()
         self.is_listening = True
-        self._listening_task = asyncio.create_task(self.listen_loop(wait_for_lap_zero))
-        print(f"Recepción iniciada en el puerto {UdpReceiver.DEFAULT_PORT}.")
+        self._listening_task = asyncio.create_task(self.listen_loop())
+        print(f"Recepción iniciada en el puerto {self.port}.")
 
     def stop_listening(self):
+        if self._resume_task is not None and not self._resume_task.done():
+            # Aún se estaba leyendo el checkpoint: no se llega a empezar
+            self._resume_task.cancel()
+            self._resume_task = None
+            print("Recepción detenida.")
+            return
         if not self.is_listening:
             print("La recepción ya está detenida.")
             return
@@ -120,7 +496,29 @@ class UdpReceiver:
         if self._listening_task:
             self._listening_task.cancel()
         if self._udp_socket:
-            self._udp_socket.close()
+            self.kernel_drops = read_kernel_drops(self._udp_socket)
+            if self._reader_registered:
+                self._loop.remove_reader(self._udp_socket)
+                self._reader_registered = False
+            if self._transport is not None:
+                self._transport.close()  # cierra también el socket
+                self._transport = None
+            else:
+                self._udp_socket.close()
             self._udp_socket = None
         print("Recepción detenida.")
-        self.write_statistics_json()
+        app_drops = self._csv_writer.rows_dropped if self._csv_writer is not None else 0
+        kernel_drops = "n/d" if self.kernel_drops is None else self.kernel_drops
+        print(f"Recibidos {self.packets_received} paquetes en {self.reader_wakeups} lecturas "
+              f"(lote máx. {self.max_batch}); descartes kernel: {kernel_drops}, aplicación: {app_drops}.")
+        if self._raw_capture is not None:
+            try:
+                self._raw_capture.close()
+            except Exception as ex:
+                print(f"Error al cerrar la captura: {ex}")
+            print(f"Captura: {self._raw_capture.packets_written} paquetes en {self._raw_capture.filename}"
+                  f" (descartados: {self._raw_capture.packets_dropped})")
+            self._raw_capture = None
+        # Las estadísticas se finalizan en segundo plano: el event-loop sigue libre
+        # y se puede volver a arrancar la recepción inmediatamente.
+        self.end_session(background=True)